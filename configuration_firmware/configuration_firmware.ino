@@ -43,6 +43,15 @@ long ORB_MAX_POS = 6000;
 long CAPTURE_MIN_POS = 100;
 long CAPTURE_MAX_POS = 6100; 
 
+// Position targets: orb per file (a-h), cart per rank (1-8), capture per slot (1-32)
+long orbTargets[8] = { 4100, 3280, 2500, 1700, 900, 80, 5700, 4950 };
+long cartTargets[8] = { 4500, 3900, 3400, 2750, 2050, 1400, 725, 0 };
+long captureTargets[32] = {
+    2780, 2600, 2420, 2240, 2060, 1880, 1700, 1520, 1300, 1130, 920, 720,
+    550, 380, 200, 0, 6250, 6050, 5850, 5700, 5500, 5300, 5150, 4950,
+    4750, 4580, 4380, 4210, 4020, 3840, 3650, 3480
+};
+
 // ========================== Global State ================================
 String serialInputBuffer = "";
 bool homingInProgress_flag = false;
@@ -53,8 +62,48 @@ enum JoggingActuator { JOG_ACT_NONE, JOG_ACT_CART, JOG_ACT_ORB, JOG_ACT_CAPTURE
 JoggingActuator currentJoggingStepper = JOG_ACT_NONE;
 enum LocationTypeCalib { LOC_CALIB_INVALID, LOC_CALIB_BOARD, LOC_CALIB_CAPTURE };
 
+// Push-mode position streaming ('stream <hz>')
+const unsigned long STREAM_KEYFRAME_INTERVAL_MS = 1000; // Full frame at least this often
+const int STREAM_FIELD_COUNT = 6;
+const char STREAM_FIELD_TAGS[STREAM_FIELD_COUNT] = { 'c', 'o', 'p', 'r', 'g', 'a' };
+unsigned long streamIntervalMs = 0; // 0 = streaming off
+unsigned long lastStreamFrameMs = 0;
+unsigned long lastStreamKeyframeMs = 0;
+bool streamKeyframeDue = true;
+uint16_t streamSeq = 0;
+long lastStreamedValues[STREAM_FIELD_COUNT];
+
+// 'take', 'release' and 'do' run as a list of steps ticked from loop() (see HIGH-LEVEL SEQUENCES)
+enum SeqStepType { SEQ_SAFETY, SEQ_ROTATE, SEQ_MOVE, SEQ_WAIT_STEPPERS, SEQ_GRIP, SEQ_EXTEND, SEQ_RETRACT };
+struct SeqStep {
+    SeqStepType type;
+    const char* state;  // Reported in progress events
+    const char* phase;  // source, take, dest, release
+    long a, b, c;       // Step arguments (see runSeqStep)
+};
+const int SEQ_MAX_STEPS = 24;
+const long SEQ_KEEP = -1;                        // SEQ_MOVE: leave this stepper where it is
+const unsigned long SEQ_MOVE_TIMEOUT_MS = 20000; // SEQ_WAIT_STEPPERS
+const unsigned long SAFETY_HOMING_TIMEOUT_MS = 15000;
+SeqStep seqSteps[SEQ_MAX_STEPS];
+int seqStepCount = 0;
+int seqIndex = 0;
+bool seqActive = false;
+bool seqStepEntered = false;
+bool seqStartedByCommand = false; // Set when the command being processed started a sequence
+const char* seqName = "";
+String seqDoneTag = "";           // Sequence tag answered when the sequence ends
+unsigned long seqStartMs = 0;
+unsigned long seqStepStartMs = 0;
+unsigned long seqSubStartMs = 0;
+int seqSubState = 0;              // SEQ_SAFETY progress
+bool seqCaptureSpeedSaved = false;
+float seqSavedCaptureSpeed = 0;
+float seqSavedCaptureAccel = 0;
+
 // ========================== Setup & Loop ================================
 void setup() {
+    Serial.setRxBufferSize(1024); // 'loadconfig' lines are ~900 chars
     Serial.begin(115200);
     unsigned long setupStartTime = millis();
     while (!Serial && (millis() - setupStartTime < 3000)) { delay(10); }
@@ -93,6 +142,8 @@ void loop() {
         stepperCart.run();
         stepperOrb.run();
     }
+    tickSequence();
+    serviceStream();
 }
 // ========================== SERIAL COMMANDS =============================
 void readSerialCommands() {
@@ -100,7 +151,7 @@ void readSerialCommands() {
         char inChar = (char)Serial.read();
         if (inChar == '\n' || inChar == '\r') {
             if (serialInputBuffer.length() > 0) {
-                processCommand(serialInputBuffer);
+                handleCommandLine(serialInputBuffer);
                 serialInputBuffer = "";
             }
         } else if (isprint(inChar)) {
@@ -108,6 +159,25 @@ void readSerialCommands() {
         }
     }
 }
+// A line may carry a sequence tag: '#<id> <command>'. Everything the command prints
+// comes between 'BEGIN #<id>' and 'DONE #<id>', so the host can match replies to
+// requests exactly. Commands that start a sequence are answered when the sequence ends.
+void handleCommandLine(String line) {
+    line.trim();
+    String seqTag = "";
+    if (line.startsWith("#")) {
+        int space = line.indexOf(' ');
+        if (space == -1) { Serial.println("ERR: Missing command after sequence tag"); return; }
+        seqTag = line.substring(1, space);
+        line = line.substring(space + 1);
+        Serial.println("BEGIN #" + seqTag);
+    }
+    seqStartedByCommand = false;
+    processCommand(line);
+    if (seqTag.length() == 0) return;
+    if (seqStartedByCommand) seqDoneTag = seqTag;
+    else Serial.println("DONE #" + seqTag);
+}
 void processCommand(String cmd) {
     cmd.trim();
     int firstSpace = cmd.indexOf(' ');
@@ -115,12 +185,19 @@ void processCommand(String cmd) {
     command_key.toLowerCase();
     String args = (firstSpace == -1) ? "" : cmd.substring(firstSpace + 1);
 
+    if (seqActive && !allowedDuringSequence(command_key)) {
+        Serial.println("ERR: Busy: '" + String(seqName) + "' sequence running (send 'stop')");
+        return;
+    }
+
     if (command_key.equals("help")) { sendHelp(); }
     else if (command_key.equals("ping")) { Serial.println("ACK: pong"); }
     else if (command_key.equals("getallpos")) { sendAllPositions(); }
     else if (command_key.equals("getpos")) { sendSpecificPosition(args); }
+    else if (command_key.equals("stream")) { setStreamRate(args.toInt()); }
     else if (command_key.equals("homeall")) { startHomingAll(); }
     else if (command_key.equals("sethome")) { setStepperHome(args); }
+    else if (command_key.equals("homecheck")) { homeCheck(args); }
     else if (command_key.equals("gotocart")) { stepperMove(stepperCart, args.toInt(), true); }
     else if (command_key.equals("gotoorb")) { stepperMove(stepperOrb, args.toInt(), false); }
     else if (command_key.equals("gotocapt")) { stepperMove(stepperCapture, args.toInt(), false); }
@@ -135,6 +212,7 @@ void processCommand(String cmd) {
     else if (command_key.equalsIgnoreCase("la_stop")) {commandStopActuator();}
     else if (command_key.equals("jog")) { int secondSpace = args.indexOf(' '); if(secondSpace != -1) { startJog(args.substring(0, secondSpace), args.substring(secondSpace+1).toInt() == 1); } }
     else if (command_key.equals("jogstop")) { stopJog(); }
+    else if (command_key.equals("stop")) { stopEverything(); }
     else if (command_key.equals("take")) { executeTakeSequence(); }
     else if (command_key.equals("release")) { executeReleaseSequence(); }
     else if (command_key.equals("do")) { int secondSpace = args.indexOf(' '); if(secondSpace != -1) { executeDoSequence(args.substring(0, secondSpace), args.substring(secondSpace+1)); } }
@@ -149,13 +227,45 @@ void processCommand(String cmd) {
         } else {
             Serial.println("ERR: Invalid setconfig format. Use: setconfig <key> <value>");
         }
-    } else {
+    }
+    else if (command_key.equals("setconfigs")) { setConfigValues(args); }
+    else if (command_key.equals("dumpconfig")) { dumpConfig(); }
+    else if (command_key.equals("loadconfig")) { loadConfig(args); }
+    else {
         Serial.println("ERR: Unknown command: " + command_key);
     }
 }
 // ========================== CONFIG SETTER ===============================
 void setConfigValue(String key, String value) {
     key.toLowerCase();
+    if (!applyConfigValue(key, value)) { Serial.println("ERR: Unknown config key: " + key); return; }
+    Serial.println("ACK: Config '" + key + "' updated to " + value);
+}
+
+// Batch form: 'setconfigs key=value key=value ...', answered by a single
+// 'ACK: Configs applied=<k1,k2> rejected=<k3>'.
+void setConfigValues(String args) {
+    String applied = "", rejected = "";
+    int start = 0;
+    args.trim();
+    while (start < (int)args.length()) {
+        int end = args.indexOf(' ', start);
+        if (end == -1) end = args.length();
+        String pair = args.substring(start, end);
+        start = end + 1;
+        if (pair.length() == 0) continue;
+        int eq = pair.indexOf('=');
+        String key = (eq == -1) ? pair : pair.substring(0, eq);
+        key.toLowerCase();
+        String& target = (eq != -1 && applyConfigValue(key, pair.substring(eq + 1))) ? applied : rejected;
+        if (target.length() > 0) target += ",";
+        target += key;
+    }
+    Serial.println("ACK: Configs applied=" + applied + " rejected=" + rejected);
+}
+
+// Applies one lower-case key; returns false if the key is unknown. Prints nothing.
+bool applyConfigValue(const String& key, const String& value) {
     float f_val = value.toFloat(); 
     long l_val = value.toInt();   
 
@@ -181,18 +291,133 @@ void setConfigValue(String key, String value) {
     else if (key.equals("orb_max_pos")) { ORB_MAX_POS = l_val; }
     else if (key.equals("capture_min_pos")) { CAPTURE_MIN_POS = l_val; }
     else if (key.equals("capture_max_pos")) { CAPTURE_MAX_POS = l_val; }
-    else { Serial.println("ERR: Unknown config key: " + key); return; }
-    
-    Serial.println("ACK: Config '" + key + "' updated to " + value);
+    else { return false; }
+    return true;
+}
+
+// Applies one lower-case target array key ('orbtargets', ...) from '1,2,3,...'.
+// The value must hold exactly as many items as the array; prints nothing.
+bool applyTargetArray(const String& key, const String& value) {
+    long* target; int count;
+    if (key.equals("orbtargets")) { target = orbTargets; count = 8; }
+    else if (key.equals("carttargets")) { target = cartTargets; count = 8; }
+    else if (key.equals("capturetargets")) { target = captureTargets; count = 32; }
+    else { return false; }
+
+    long parsed[32];
+    int n = 0, start = 0;
+    while (start <= (int)value.length()) {
+        int comma = value.indexOf(',', start);
+        if (comma == -1) comma = value.length();
+        if (n == count || comma == start) return false;
+        parsed[n++] = value.substring(start, comma).toInt();
+        start = comma + 1;
+    }
+    if (n != count) return false;
+    for (int i = 0; i < count; i++) target[i] = parsed[i];
+    return true;
+}
+
+// ========================== BULK CONFIG ==================================
+// 'dumpconfig' replies with one framed line holding every value:
+//   CFG <fletcher16 of payload, 4 hex digits> key=value;key=value;...;orbtargets=v,v,...
+// 'loadconfig <checksum> <payload>' takes the same frame back and applies it.
+uint16_t fletcher16(const String& data) {
+    uint16_t sum1 = 0, sum2 = 0;
+    for (unsigned int i = 0; i < data.length(); i++) {
+        sum1 = (sum1 + (uint8_t)data.charAt(i)) % 255;
+        sum2 = (sum2 + sum1) % 255;
+    }
+    return (sum2 << 8) | sum1;
+}
+
+void appendConfigEntry(String& out, const char* key, const String& value) {
+    if (out.length() > 0) out += ';';
+    out += key; out += '='; out += value;
+}
+
+void appendTargetArray(String& out, const char* key, const long* values, int count) {
+    String joined = "";
+    for (int i = 0; i < count; i++) { if (i > 0) joined += ','; joined += String(values[i]); }
+    appendConfigEntry(out, key, joined);
+}
+
+void dumpConfig() {
+    String payload;
+    payload.reserve(1024);
+    appendConfigEntry(payload, "stepper_speed", String(STEPPER_SPEED, 2));
+    appendConfigEntry(payload, "stepper_accel", String(STEPPER_ACCEL, 2));
+    appendConfigEntry(payload, "gripperopen", String(GRIPPER_OPEN_ANGLE));
+    appendConfigEntry(payload, "gripperclose", String(GRIPPER_CLOSE_ANGLE));
+    appendConfigEntry(payload, "gripper_rot_board", String(GRIPPER_ROT_BOARD));
+    appendConfigEntry(payload, "gripper_rot_capture", String(GRIPPER_ROT_CAPTURE));
+    appendConfigEntry(payload, "cart_capture_pos", String(CART_CAPTURE_POS));
+    appendConfigEntry(payload, "cart_safety_threshold", String(CART_SAFETY_THRESHOLD));
+    appendConfigEntry(payload, "cart_capture_home_threshold", String(CART_CAPTURE_HOME_THRESHOLD));
+    appendConfigEntry(payload, "actuator_travel_time_ms", String(ACTUATOR_TRAVEL_TIME_MS));
+    appendConfigEntry(payload, "homing_speed_capture", String(HOMING_SPEED_CAPTURE, 2));
+    appendConfigEntry(payload, "homing_speed_cart_orb", String(HOMING_SPEED_CART_ORB, 2));
+    appendConfigEntry(payload, "homing_accel", String(HOMING_ACCEL, 2));
+    appendConfigEntry(payload, "manual_jog_cart_speed", String(MANUAL_JOG_CART_SPEED, 2));
+    appendConfigEntry(payload, "manual_jog_orb_speed", String(MANUAL_JOG_ORB_SPEED, 2));
+    appendConfigEntry(payload, "manual_jog_capture_speed", String(MANUAL_JOG_CAPTURE_SPEED, 2));
+    appendConfigEntry(payload, "cart_min_pos", String(CART_MIN_POS));
+    appendConfigEntry(payload, "cart_max_pos", String(CART_MAX_POS));
+    appendConfigEntry(payload, "orb_min_pos", String(ORB_MIN_POS));
+    appendConfigEntry(payload, "orb_max_pos", String(ORB_MAX_POS));
+    appendConfigEntry(payload, "capture_min_pos", String(CAPTURE_MIN_POS));
+    appendConfigEntry(payload, "capture_max_pos", String(CAPTURE_MAX_POS));
+    appendTargetArray(payload, "orbtargets", orbTargets, 8);
+    appendTargetArray(payload, "carttargets", cartTargets, 8);
+    appendTargetArray(payload, "capturetargets", captureTargets, 32);
+
+    char header[12];
+    snprintf(header, sizeof(header), "CFG %04x ", fletcher16(payload));
+    Serial.print(header);
+    Serial.println(payload);
+}
+
+// Answered by 'ACK: Config loaded applied=<k1,k2> rejected=<k3>' or an ERR if the frame is damaged.
+void loadConfig(String args) {
+    args.trim();
+    int space = args.indexOf(' ');
+    if (space == -1) { Serial.println("ERR: Invalid loadconfig format. Use: loadconfig <checksum> <payload>"); return; }
+    String payload = args.substring(space + 1);
+    if (strtol(args.substring(0, space).c_str(), NULL, 16) != fletcher16(payload)) {
+        Serial.println("ERR: Config checksum mismatch");
+        return;
+    }
+
+    String applied = "", rejected = "";
+    int start = 0;
+    while (start < (int)payload.length()) {
+        int end = payload.indexOf(';', start);
+        if (end == -1) end = payload.length();
+        String pair = payload.substring(start, end);
+        start = end + 1;
+        if (pair.length() == 0) continue;
+        int eq = pair.indexOf('=');
+        String key = (eq == -1) ? pair : pair.substring(0, eq);
+        key.toLowerCase();
+        String value = (eq == -1) ? "" : pair.substring(eq + 1);
+        bool ok = eq != -1 && (applyConfigValue(key, value) || applyTargetArray(key, value));
+        String& target = ok ? applied : rejected;
+        if (target.length() > 0) target += ",";
+        target += key;
+    }
+    Serial.println("ACK: Config loaded applied=" + applied + " rejected=" + rejected);
 }
 // ========================== HELPERS ======================================
 void sendHelp() {
     Serial.println("--- Calibration Firmware Help ---");
+    Serial.println("#<id> <command>         - Run command between 'BEGIN #<id>' and 'DONE #<id>'");
     Serial.println("ping                    - Test connection");
     Serial.println("getallpos               - Get current stepper/servo positions & sensor");
     Serial.println("getpos <id>             - Get specific stepper pos (capt, cart, orb)");
+    Serial.println("stream <hz>             - Push position frames at <hz> (1-50, 0 = off)");
     Serial.println("homeall                 - Start homing all steppers");
     Serial.println("sethome <id>            - Set current pos of stepper (capt,cart,orb) to 0");
+    Serial.println("homecheck <id>          - Re-home one stepper, report its pos at the endstop (lost steps)");
     Serial.println("gotocart <pos>          - Move Cart stepper");
     Serial.println("gotoorb <pos>           - Move Orb stepper");
     Serial.println("gotocapt <pos>          - Move Capture stepper");
@@ -209,8 +434,15 @@ void sendHelp() {
     Serial.println("take                    - Execute test Take sequence");
     Serial.println("release                 - Execute test Release sequence");
     Serial.println("do <from_sq> <to_sq>    - Execute test Do sequence (e.g., do a1 capt5)");
+    Serial.println("stop                    - Stop steppers, actuator and any running sequence");
+    Serial.println("  take/release/do report progress as 'EVT: {json}' lines and refuse");
+    Serial.println("  motion commands until they finish (queries and 'stop' still work)");
     Serial.println("getsquarepos <sq>       - Get target stepper values for board square (e.g., a1)");
     Serial.println("getcaptpos <slot_num>   - Get target stepper value for capture slot (1-32)");
+    Serial.println("setconfig <key> <value> - Set one config value");
+    Serial.println("setconfigs k=v k=v ...  - Set many config values, one ACK lists applied/rejected");
+    Serial.println("dumpconfig              - Print all config values and targets as one CFG line");
+    Serial.println("loadconfig <sum> <data> - Apply a CFG line produced by dumpconfig");
     Serial.println("-------------------------------");
 }
 void sendAllPositions() {
@@ -226,6 +458,49 @@ void sendAllPositions() {
     Serial.println("POS: " + output);
 }
 
+// Frame: PS:<seq>[K] c<cart> o<orb> p<capt> r<rot> g<grip> a<sensor>
+// Keyframes ('K') carry every field; other frames only the fields that changed.
+void setStreamRate(int hz) {
+    if (hz <= 0) {
+        streamIntervalMs = 0;
+        Serial.println("ACK: Stream off");
+        return;
+    }
+    hz = constrain(hz, 1, 50);
+    streamIntervalMs = 1000UL / hz;
+    streamKeyframeDue = true;
+    Serial.println("ACK: Stream at " + String(hz) + " Hz");
+}
+
+void serviceStream() {
+    if (streamIntervalMs == 0) return;
+    unsigned long now = millis();
+    if (now - lastStreamFrameMs < streamIntervalMs) return;
+    lastStreamFrameMs = now;
+
+    long values[STREAM_FIELD_COUNT] = {
+        stepperCart.currentPosition(), stepperOrb.currentPosition(), stepperCapture.currentPosition(),
+        servoRotation.read(), servoGripper.read(), digitalRead(ACTUATOR_RETRACTED_SENSE_PIN)
+    };
+    bool keyframe = streamKeyframeDue || (now - lastStreamKeyframeMs >= STREAM_KEYFRAME_INTERVAL_MS);
+
+    char frame[112];
+    int len = snprintf(frame, sizeof(frame), "PS:%u%s", streamSeq, keyframe ? "K" : "");
+    bool anyField = false;
+    for (int i = 0; i < STREAM_FIELD_COUNT; i++) {
+        if (keyframe || values[i] != lastStreamedValues[i]) {
+            len += snprintf(frame + len, sizeof(frame) - len, " %c%ld", STREAM_FIELD_TAGS[i], values[i]);
+            lastStreamedValues[i] = values[i];
+            anyField = true;
+        }
+    }
+    if (!anyField) return; // Nothing changed since the last frame
+
+    Serial.println(frame);
+    streamSeq++;
+    if (keyframe) { lastStreamKeyframeMs = now; streamKeyframeDue = false; }
+}
+
 void sendSpecificPosition(String stepperId) {
     stepperId.toLowerCase();
     long currentPos = 0; // Default
@@ -286,8 +561,6 @@ void enforceCartSafetyRotation(long targetCartPos) {
 }
 
 void enforceCaptureHomedForLowCart(long targetCartPos) {
-    const unsigned long SAFETY_HOMING_TIMEOUT_MS = 15000;
-
   if (targetCartPos < CART_CAPTURE_HOME_THRESHOLD) { 
     if (stepperCapture.currentPosition() != 0) {
       Serial.println("SAFETY: Cart target very low, forcing Capture home.");
@@ -399,6 +672,36 @@ void setStepperHome(String stepperId) {
     }
 }
 
+// Drives one axis back onto its endstop at homing speed and reports the position it had
+// counted when the endstop triggered: 0 unless steps were lost since the last homing.
+// The axis is homed again (position 0) afterwards.
+void homeCheck(String stepperId) {
+    const unsigned long HOMECHECK_TIMEOUT_MS = 15000;
+    stepperId.toLowerCase();
+    AccelStepper* stepper; int endstopPin; float homingSpeed; bool* homedFlag;
+    if (stepperId.equals("capt")) { stepper = &stepperCapture; endstopPin = ENDSTOP_CAPTURE_PIN; homingSpeed = HOMING_SPEED_CAPTURE; homedFlag = &captureHomed_flag; }
+    else if (stepperId.equals("cart")) { stepper = &stepperCart; endstopPin = ENDSTOP_CART_PIN; homingSpeed = HOMING_SPEED_CART_ORB; homedFlag = &cartHomed_flag; }
+    else if (stepperId.equals("orb")) { stepper = &stepperOrb; endstopPin = ENDSTOP_ORB_PIN; homingSpeed = HOMING_SPEED_CART_ORB; homedFlag = &orbHomed_flag; }
+    else { Serial.println("ERR: Unknown stepper ID for homecheck: " + stepperId); return; }
+
+    if (stepper == &stepperCart) { enforceAllSafetyForCart(0); }
+    else if (stepper == &stepperOrb && servoRotation.read() != GRIPPER_ROT_BOARD) { servoRotation.write(GRIPPER_ROT_BOARD); delay(400); }
+
+    float o_sp = stepper->maxSpeed(); float o_ac = stepper->acceleration();
+    stepper->setMaxSpeed(abs(homingSpeed)); stepper->setAcceleration(HOMING_ACCEL);
+    stepper->enableOutputs(); stepper->move(-30000);
+    unsigned long startT = millis();
+    bool found = false; long triggerPos = 0;
+    while (!found && (millis() - startT < HOMECHECK_TIMEOUT_MS)) {
+        if (digitalRead(endstopPin) == LOW) {
+            triggerPos = stepper->currentPosition();
+            stepper->stop(); stepper->setCurrentPosition(0); *homedFlag = true; found = true;
+        } else { stepper->run(); }
+    }
+    stepper->setMaxSpeed(o_sp); stepper->setAcceleration(o_ac);
+    if (!found) { stepper->stop(); Serial.println("ERR: homecheck timeout for " + stepperId); return; }
+    Serial.println("HOMECHECK: " + stepperId + " " + String(triggerPos));
+}
 
 // ========================== JOGGING ======================================
 void startJog(String actuatorId, bool positive) {
@@ -477,43 +780,215 @@ void commandStopActuator() {
 
 }
 // ========================== HIGH-LEVEL SEQUENCES =========================
+// 'take', 'release' and 'do' are built into a list of steps (seqSteps) that tickSequence()
+// works through from loop(), so serial commands, stepper running and position streaming
+// carry on meanwhile. Progress is reported as one line per event:
+//   EVT: {"seq":"do","ev":"start","steps":14,"ms":0}
+//   EVT: {"seq":"do","ev":"state","state":"MOVE_BOARD","phase":"source","step":2,"steps":14,"ms":3}
+//   EVT: {"seq":"do","ev":"done","ms":5230}     (or "error" with "msg", or "stopped")
+// "warn" events (with "msg") don't end the sequence.
+
+bool allowedDuringSequence(const String& command_key) {
+    return command_key.equals("help") || command_key.equals("ping") || command_key.equals("getallpos")
+        || command_key.equals("getpos") || command_key.equals("stream") || command_key.equals("getsquarepos")
+        || command_key.equals("getcaptpos") || command_key.equals("dumpconfig") || command_key.equals("stop");
+}
+
+void emitSeqEvent(const char* ev, const char* state, const char* msg) {
+    StaticJsonDocument<256> doc;
+    doc["seq"] = seqName;
+    doc["ev"] = ev;
+    if (state != nullptr) {
+        doc["state"] = state;
+        doc["phase"] = seqSteps[seqIndex].phase;
+        doc["step"] = seqIndex + 1;
+    }
+    if (state != nullptr || strcmp(ev, "start") == 0) doc["steps"] = seqStepCount;
+    if (msg != nullptr) doc["msg"] = msg;
+    doc["ms"] = millis() - seqStartMs;
+    String output;
+    serializeJson(doc, output);
+    Serial.println("EVT: " + output);
+}
+void emitSeqState(const char* state) { emitSeqEvent("state", state, nullptr); }
+
+void addSeqStep(SeqStepType type, const char* state, const char* phase, long a = 0, long b = 0, long c = 0) {
+    if (seqStepCount >= SEQ_MAX_STEPS) return; // Can't happen with the sequences below
+    seqSteps[seqStepCount++] = { type, state, phase, a, b, c };
+}
+
+// Same motion as the old blocking moves: board squares rotate first (if needed) and move
+// all steppers together; capture slots line up cart/orb at the board angle, then turn the
+// capture wheel, then rotate.
+void addMoveSteps(LocationTypeCalib type, long orbT, long cartT, long captT, int rotT, const char* phase) {
+    addSeqStep(SEQ_SAFETY, "SAFETY", phase, cartT);
+    if (type == LOC_CALIB_BOARD) {
+        addSeqStep(SEQ_ROTATE, "ROTATE", phase, rotT, 400, true);
+        addSeqStep(SEQ_MOVE, "MOVE_BOARD", phase, cartT, orbT, captT);
+        addSeqStep(SEQ_WAIT_STEPPERS, "WAIT_BOARD", phase);
+    } else {
+        addSeqStep(SEQ_ROTATE, "ROTATE_BOARD_ANGLE", phase, GRIPPER_ROT_BOARD, 400, true);
+        addSeqStep(SEQ_MOVE, "MOVE_CART_ORB", phase, cartT, orbT, SEQ_KEEP);
+        addSeqStep(SEQ_WAIT_STEPPERS, "WAIT_CART_ORB", phase);
+        addSeqStep(SEQ_MOVE, "MOVE_CAPTURE", phase, SEQ_KEEP, SEQ_KEEP, captT);
+        addSeqStep(SEQ_WAIT_STEPPERS, "WAIT_CAPTURE", phase);
+        addSeqStep(SEQ_ROTATE, "ROTATE_CAPTURE_ANGLE", phase, rotT, 400, false);
+    }
+}
+void addTakeSteps() {
+    addSeqStep(SEQ_GRIP, "GRIP_OPEN", "take", GRIPPER_OPEN_ANGLE, 300);
+    addSeqStep(SEQ_EXTEND, "EXTEND", "take");
+    addSeqStep(SEQ_GRIP, "GRIP_CLOSE", "take", GRIPPER_CLOSE_ANGLE, 700);
+    addSeqStep(SEQ_RETRACT, "RETRACT", "take", true); // Use sensor for take
+}
+void addReleaseSteps() {
+    addSeqStep(SEQ_EXTEND, "EXTEND", "release");
+    addSeqStep(SEQ_GRIP, "GRIP_OPEN", "release", GRIPPER_OPEN_ANGLE, 300);
+    addSeqStep(SEQ_RETRACT, "RETRACT", "release", false);
+}
+
+void startSequence(const char* name) {
+    seqName = name;
+    seqIndex = 0;
+    seqStepEntered = false;
+    seqActive = true;
+    seqStartedByCommand = true;
+    seqStartMs = millis();
+    emitSeqEvent("start", nullptr, nullptr);
+}
+
+void endSequence(const char* ev, const char* msg) {
+    if (seqCaptureSpeedSaved) {
+        stepperCapture.setMaxSpeed(seqSavedCaptureSpeed); stepperCapture.setAcceleration(seqSavedCaptureAccel);
+        seqCaptureSpeedSaved = false;
+    }
+    seqActive = false;
+    emitSeqEvent(ev, nullptr, msg);
+    if (seqDoneTag.length() > 0) { Serial.println("DONE #" + seqDoneTag); seqDoneTag = ""; }
+}
+
+void stopEverything() {
+    stopJog();
+    stepperCart.stop(); stepperOrb.stop(); stepperCapture.stop();
+    commandStopActuator();
+    if (seqActive) endSequence("stopped", nullptr);
+    Serial.println("ACK: Stopped");
+}
+
+void tickSequence() {
+    while (seqActive) {
+        bool entering = !seqStepEntered;
+        if (entering) { seqStepEntered = true; seqStepStartMs = millis(); }
+        if (!runSeqStep(seqSteps[seqIndex], entering)) return; // Still running (or failed)
+        seqStepEntered = false;
+        if (++seqIndex >= seqStepCount) endSequence("done", nullptr);
+    }
+}
+
+// Returns true once the step is finished; `entering` is true on its first call.
+//   SAFETY a=cart target | ROTATE a=angle b=settle ms c=skip if already there
+//   MOVE a,b,c=cart,orb,capture targets (SEQ_KEEP: don't move) | GRIP a=angle b=settle ms
+//   RETRACT a=check the retracted sensor
+bool runSeqStep(const SeqStep& step, bool entering) {
+    unsigned long elapsed = millis() - seqStepStartMs;
+    switch (step.type) {
+        case SEQ_SAFETY:
+            return runSafetyStep(step.a, entering);
+        case SEQ_ROTATE:
+            if (entering) {
+                if (step.c && servoRotation.read() == step.a) return true;
+                emitSeqState(step.state);
+                servoRotation.write(step.a);
+            }
+            return elapsed >= (unsigned long)step.b;
+        case SEQ_MOVE:
+            emitSeqState(step.state);
+            if (step.a != SEQ_KEEP) stepperCart.moveTo(step.a);
+            if (step.b != SEQ_KEEP) stepperOrb.moveTo(step.b);
+            if (step.c != SEQ_KEEP) stepperCapture.moveTo(step.c);
+            return true;
+        case SEQ_WAIT_STEPPERS:
+            if (entering) emitSeqState(step.state);
+            if (stepperCart.distanceToGo() == 0 && stepperOrb.distanceToGo() == 0 && stepperCapture.distanceToGo() == 0) return true;
+            if (elapsed > SEQ_MOVE_TIMEOUT_MS) {
+                stepperCart.stop(); stepperOrb.stop(); stepperCapture.stop();
+                endSequence("error", "Stepper move timeout");
+            }
+            return false;
+        case SEQ_GRIP:
+            if (entering) { emitSeqState(step.state); servoGripper.write(step.a); }
+            return elapsed >= (unsigned long)step.b;
+        case SEQ_EXTEND:
+            if (entering) { emitSeqState(step.state); digitalWrite(ACTUATOR_IN1_PIN, LOW); digitalWrite(ACTUATOR_IN2_PIN, HIGH); }
+            if (elapsed < ACTUATOR_TRAVEL_TIME_MS) return false;
+            commandStopActuator();
+            return true;
+        case SEQ_RETRACT: {
+            if (entering) { emitSeqState(step.state); digitalWrite(ACTUATOR_IN1_PIN, HIGH); digitalWrite(ACTUATOR_IN2_PIN, LOW); }
+            if (elapsed < ACTUATOR_TRAVEL_TIME_MS) return false;
+            bool sTrig = digitalRead(ACTUATOR_RETRACTED_SENSE_PIN) == HIGH; // Active HIGH
+            commandStopActuator();
+            if (step.a && !sTrig) emitSeqEvent("warn", nullptr, "Timed retract, sensor NOT triggered");
+            return true;
+        }
+    }
+    return true;
+}
 
-void executeTakeSequence() { 
+// enforceAllSafetyForCart() without blocking: home the capture wheel if the cart goes very
+// low, then turn the gripper to the board angle if the cart goes low.
+bool runSafetyStep(long targetCartPos, bool entering) {
+    if (entering) seqSubState = 0;
+    if (seqSubState == 0) {
+        if (targetCartPos < CART_CAPTURE_HOME_THRESHOLD && stepperCapture.currentPosition() != 0) {
+            emitSeqState("SAFETY_HOME_CAPTURE");
+            seqSavedCaptureSpeed = stepperCapture.maxSpeed(); seqSavedCaptureAccel = stepperCapture.acceleration();
+            seqCaptureSpeedSaved = true;
+            stepperCapture.setMaxSpeed(abs(HOMING_SPEED_CAPTURE));
+            stepperCapture.setAcceleration(HOMING_ACCEL);
+            stepperCapture.enableOutputs();
+            stepperCapture.move(-30000);
+            seqSubState = 1;
+        } else {
+            seqSubState = 2;
+        }
+    }
+    if (seqSubState == 1) { // loop() runs the capture stepper towards its endstop
+        if (digitalRead(ENDSTOP_CAPTURE_PIN) == LOW) {
+            stepperCapture.stop(); stepperCapture.setCurrentPosition(0);
+            captureHomed_flag = true;
+            stepperCapture.setMaxSpeed(seqSavedCaptureSpeed); stepperCapture.setAcceleration(seqSavedCaptureAccel);
+            seqCaptureSpeedSaved = false;
+            seqSubState = 2;
+        } else {
+            if (millis() - seqStepStartMs >= SAFETY_HOMING_TIMEOUT_MS) {
+                stepperCapture.stop();
+                endSequence("error", "SAFETY Capture homing timeout");
+            }
+            return false;
+        }
+    }
+    if (seqSubState == 2) {
+        if (targetCartPos >= CART_SAFETY_THRESHOLD || servoRotation.read() == GRIPPER_ROT_BOARD) return true;
+        emitSeqState("SAFETY_ROTATE");
+        servoRotation.write(GRIPPER_ROT_BOARD);
+        seqSubStartMs = millis();
+        seqSubState = 3;
+    }
+    return millis() - seqSubStartMs >= 500;
+}
+
+void executeTakeSequence() {
     Serial.println("ACK: Executing Take Sequence...");
-    servoGripper.write(GRIPPER_OPEN_ANGLE); delay(300);
-    commandExtendActuator(true);
-    servoGripper.write(GRIPPER_CLOSE_ANGLE); delay(700);
-    commandRetractActuator(true, true); // Use sensor for take
-    Serial.println("  Take Sequence Complete.");
+    seqStepCount = 0;
+    addTakeSteps();
+    startSequence("take");
 }
 void executeReleaseSequence() {
     Serial.println("ACK: Executing Release Sequence...");
-    commandExtendActuator(true);
-    servoGripper.write(GRIPPER_OPEN_ANGLE); delay(300);
-    commandRetractActuator(true, false); 
-    Serial.println("  Release Sequence Complete.");
-}
-
-void waitForSteppersBlocking(const String& moveName) { 
-    Serial.print("  Waiting for '"); Serial.print(moveName); Serial.println("' steppers (blocking)...");
-    unsigned long moveStartTime = millis();
-    bool cartMoving = stepperCart.distanceToGo() != 0;
-    bool orbMoving = stepperOrb.distanceToGo() != 0;
-    bool captMoving = stepperCapture.distanceToGo() != 0;
-
-    while (cartMoving || orbMoving || captMoving) {
-        if (cartMoving) { stepperCart.run(); if (stepperCart.distanceToGo() == 0) cartMoving = false; }
-        if (orbMoving)  { stepperOrb.run();  if (stepperOrb.distanceToGo() == 0)  orbMoving = false;  }
-        if (captMoving) { stepperCapture.run(); if (stepperCapture.distanceToGo() == 0) captMoving = false;}
-
-        if (millis() - moveStartTime > 20000) {
-            Serial.println("ERR: Stepper move timeout during 'do' sequence!");
-            stepperCart.stop(); stepperOrb.stop(); stepperCapture.stop();
-            return;
-        }
-        delay(1);
-    }
-    Serial.println("    Steppers arrived.");
+    seqStepCount = 0;
+    addReleaseSteps();
+    startSequence("release");
 }
 
 void executeDoSequence(String fromStr, String toStr) {
@@ -525,49 +1000,12 @@ void executeDoSequence(String fromStr, String toStr) {
     LocationTypeCalib t2 = parseLocationCalib(toStr, o2, c2, p2, r2);
     if (t1 == LOC_CALIB_INVALID || t2 == LOC_CALIB_INVALID) { Serial.println("ERR: Invalid loc in DO"); return; }
 
-    // --- Move to Source ---
-    Serial.println("  1. Moving to Source: " + fromStr);
-    enforceAllSafetyForCart(c1);
-    // Board logic: Rotate first if needed, then move all steppers
-    if (t1 == LOC_CALIB_BOARD) {
-        if (servoRotation.read() != r1) { servoRotation.write(r1); delay(400); }
-        stepperCart.moveTo(c1); stepperOrb.moveTo(o1); stepperCapture.moveTo(p1);
-        waitForSteppersBlocking("Board Source");
-    } 
-    // Capture Zone logic: Move cart/orb, THEN rotate, THEN move capture stepper
-    else { 
-        if (servoRotation.read() != GRIPPER_ROT_BOARD) { servoRotation.write(GRIPPER_ROT_BOARD); delay(400); }
-        stepperCart.moveTo(c1); stepperOrb.moveTo(o1); waitForSteppersBlocking("Cart/Orb to CZ Align (Source)");
-        stepperCapture.moveTo(p1); waitForSteppersBlocking("Capture to Slot (Source)");
-        servoRotation.write(r1); delay(400); // Rotate at the end
-    }
-
-    // --- Perform Take ---
-    Serial.println("  2. Performing Take...");
-    executeTakeSequence(); 
-
-    // --- Move to Destination ---
-    Serial.println("  3. Moving to Dest: " + toStr);
-    enforceAllSafetyForCart(c2);
-    // Rotate first if needed, then move all steppers
-    if (t2 == LOC_CALIB_BOARD) {
-        if (servoRotation.read() != r2) { servoRotation.write(r2); delay(400); }
-        stepperCart.moveTo(c2); stepperOrb.moveTo(o2); stepperCapture.moveTo(p2);
-        waitForSteppersBlocking("Board Destination");
-    } 
-    // Capture Zone logic: Move cart/orb, THEN move capture stepper, THEN rotate
-    else { // LOC_CALIB_CAPTURE
-        if (servoRotation.read() != GRIPPER_ROT_BOARD) { servoRotation.write(GRIPPER_ROT_BOARD); delay(400); }
-        stepperCart.moveTo(c2); stepperOrb.moveTo(o2); waitForSteppersBlocking("Cart/Orb to CZ Align (Dest)");
-        stepperCapture.moveTo(p2); waitForSteppersBlocking("Capture to Slot (Dest)");
-        servoRotation.write(r2); delay(400); // Rotate at the end
-    }
-
-    // --- Perform Release ---
-    Serial.println("  4. Performing Release...");
-    executeReleaseSequence(); // This is blocking
-
-    Serial.println("  Do Sequence Complete.");
+    seqStepCount = 0;
+    addMoveSteps(t1, o1, c1, p1, r1, "source");
+    addTakeSteps();
+    addMoveSteps(t2, o2, c2, p2, r2, "dest");
+    addReleaseSteps();
+    startSequence("do");
 }
 // ========================== CALIBRATION PARSERS ==========================
 
@@ -575,36 +1013,16 @@ bool getTargetsForSquareInternal(String square, long &orbTarget, long &cartTarge
   square.trim(); square.toLowerCase();
   if (square.length() != 2) { Serial.println("ERR: Square fmt (e.g. a1)"); return false; }
   char o = square.charAt(0); char c = square.charAt(1);
-  switch(o){
-    case 'a': orbTarget = 4100; break; case 'b': orbTarget = 3280; break; case 'c': orbTarget = 2500; break;
-    case 'd': orbTarget = 1700; break; case 'e': orbTarget = 900;  break; case 'f': orbTarget = 80;   break;
-    case 'g': orbTarget = 5700; break; case 'h': orbTarget = 4950; break;
-    default: Serial.println("ERR: Invalid file"); return false;
-  }
-  switch(c){
-    case '1': cartTarget = 4500; break; case '2': cartTarget = 3900; break; case '3': cartTarget = 3400; break;
-    case '4': cartTarget = 2750; break; case '5': cartTarget = 2050; break; case '6': cartTarget = 1400; break;
-    case '7': cartTarget = 725;  break; case '8': cartTarget = 0;   break;
-    default: Serial.println("ERR: Invalid rank"); return false;
-  }
+  if (o < 'a' || o > 'h') { Serial.println("ERR: Invalid file"); return false; }
+  if (c < '1' || c > '8') { Serial.println("ERR: Invalid rank"); return false; }
+  orbTarget = orbTargets[o - 'a'];
+  cartTarget = cartTargets[c - '1'];
   return true;
 }
 
 bool getTargetForCaptureInternal(int slot, long &val) {
-  switch(slot){
-    case 1: val = 2780; break; case 2: val = 2600; break; case 3: val = 2420; break;
-    case 4: val = 2240; break; case 5: val = 2060; break; case 6: val = 1880; break;
-    case 7: val = 1700; break; case 8: val = 1520; break; case 9: val = 1300; break;
-    case 10: val = 1130; break; case 11: val = 920; break; case 12: val = 720; break;
-    case 13: val = 550; break; case 14: val = 380; break; case 15: val = 200; break;
-    case 16: val = 0; break; case 17: val = 6250; break; case 18: val = 6050; break;
-    case 19: val = 5850; break; case 20: val = 5700; break; case 21: val = 5500; break;
-    case 22: val = 5300; break; case 23: val = 5150; break; case 24: val = 4950; break;
-    case 25: val = 4750; break; case 26: val = 4580; break; case 27: val = 4380; break;
-    case 28: val = 4210; break; case 29: val = 4020; break; case 30: val = 3840; break;
-    case 31: val = 3650; break; case 32: val = 3480; break;
-    default: Serial.println("ERR: Invalid slot num"); return false;
-  }
+  if (slot < 1 || slot > 32) { Serial.println("ERR: Invalid slot num"); return false; }
+  val = captureTargets[slot - 1];
   return true;
 }
 
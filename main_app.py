@@ -1,29 +1,67 @@
 import sys
+import time
+
+# --- Startup timeline (python main_app.py --startup-timeline) ---
+STARTUP_TIMELINE = "--startup-timeline" in sys.argv
+_startup_marks = [("process start", time.perf_counter())]
+
+def mark_startup(label):
+    if STARTUP_TIMELINE:
+        _startup_marks.append((label, time.perf_counter()))
+
+def print_startup_timeline():
+    start, previous = _startup_marks[0][1], _startup_marks[0][1]
+    print("Startup timeline:")
+    for label, at in _startup_marks[1:]:
+        print(f"  {(at - start) * 1000:7.1f} ms  (+{(at - previous) * 1000:6.1f})  {label}")
+        previous = at
+
+import importlib
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, QTabWidget,
                              QMessageBox, QFileDialog, QPushButton, QHBoxLayout)
 from PyQt5.QtCore import QTimer, pyqtSignal 
 
-# Import custom modules
-from ui.board_tab import BoardTabWidget
-from ui.capture_tab import CaptureTabWidget
-from ui.servo_tab import ServoTabWidget
-from ui.stepper_tab import StepperTabWidget
-from ui.actuator_tab import ActuatorTabWidget
-from ui.network_tab import NetworkTabWidget
-from ui.test_tab import TestTabWidget
+# Import custom modules (the tab modules are imported when their tab is first shown)
 from ui.bottom_toolbox import BottomToolbox
-from ui.dialogs import ConfigOutputDialog
-from utils.config_parser import load_config_values, generate_config_h_string, DEFAULT_CONFIG_VALUES
+from ui.dialogs import ConfigOutputDialog, report_config_push
+from utils.config_parser import (load_config_values, ConfigHeaderRenderer, DEFAULT_CONFIG_VALUES,
+                                 enable_parse_cache_file, DEFAULT_PARSE_CACHE_FILE)
 from utils.serial_handler import SerialHandler
 
+mark_startup("Qt and app modules imported")
+
 # Global Configuration Dictionary - The single source of truth for all config values.
 CONFIG_VALUES = {}
 
+# Tabs in display order: (title, module, class, MainWindow attribute, method to call when
+# the config changes, takes the serial handler). Each is built the first time it's shown.
+TAB_SPECS = (
+    ("Board Config", "ui.board_tab", "BoardTabWidget", "board_tab_widget", "update_board_info_box", True),
+    ("Capture Zone", "ui.capture_tab", "CaptureTabWidget", "capture_tab_widget", "load_fields_from_config", True),
+    ("Servos", "ui.servo_tab", "ServoTabWidget", "servo_tab_widget", "load_fields_from_config", True),
+    ("Steppers", "ui.stepper_tab", "StepperTabWidget", "stepper_tab_widget", "load_fields_from_config", True),
+    ("Linear Actuator", "ui.actuator_tab", "ActuatorTabWidget", "actuator_tab_widget", "load_fields_from_config", True),
+    ("Network Config", "ui.network_tab", "NetworkTabWidget", "network_tab_widget", "load_fields_from_config", False),
+    ("Test Moves", "ui.test_tab", "TestTabWidget", "test_tab_widget", None, True),
+    ("Telemetry", "ui.telemetry_tab", "TelemetryTabWidget", "telemetry_tab_widget", None, True),
+)
+
+
+class LazyTabPage(QWidget):
+    """Placeholder page of the tab widget; the real tab is put inside it on first show."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.tab_widget = None
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+
+
 class MainWindow(QMainWindow):
 
     config_updated_signal = pyqtSignal()
 
-    def __init__(self):
+    def __init__(self, parse_cache_file=DEFAULT_PARSE_CACHE_FILE):
         super().__init__()
         self.setWindowTitle("Mat@ir Configuration Tool")
         self.setGeometry(100, 100, 1000, 750) 
@@ -33,6 +71,9 @@ class MainWindow(QMainWindow):
         CONFIG_VALUES.clear()
         CONFIG_VALUES.update(DEFAULT_CONFIG_VALUES.copy())
 
+        # Keeps the formatted header between dialogs, only edited values are re-formatted
+        self.config_h_renderer = ConfigHeaderRenderer()
+
         # --- Setup Main UI Layout ---
         self.central_widget = QWidget()
         self.setCentralWidget(self.central_widget)
@@ -43,7 +84,10 @@ class MainWindow(QMainWindow):
 
         # --- Final step: Attempt to load a default config file and populate UI ---
         # This happens after all widgets have been created and signals connected.
+        # Parsed files are cached on disk, an unchanged config.h is not parsed again.
+        enable_parse_cache_file(parse_cache_file)
         self.load_config_from_file("config.h", silent_if_not_found=True)
+        mark_startup("config.h loaded")
 
     def init_ui_components(self):
         """Creates and organizes all UI widgets."""
@@ -57,45 +101,53 @@ class MainWindow(QMainWindow):
         self.load_config_button.setToolTip("Open a file dialog to load a config.h file.")
         self.load_config_button.clicked.connect(self.prompt_load_config_file)
         top_bar_layout.addWidget(self.load_config_button)
+        self.read_device_config_button = QPushButton("Read Config from ESP32")
+        self.read_device_config_button.setToolTip("Load every config value and position target from the ESP32 in one transfer.")
+        self.read_device_config_button.clicked.connect(self.download_config_from_device)
+        top_bar_layout.addWidget(self.read_device_config_button)
+        self.write_device_config_button = QPushButton("Write Config to ESP32")
+        self.write_device_config_button.setToolTip("Send every config value and position target to the ESP32 in one transfer.")
+        self.write_device_config_button.clicked.connect(self.upload_config_to_device)
+        top_bar_layout.addWidget(self.write_device_config_button)
         self.main_layout.addLayout(top_bar_layout)
 
         self.tabs = QTabWidget()
         self.main_layout.addWidget(self.tabs)
 
-        # --- Initialize and Add Tabs ---
+        # --- Add Tabs ---
         # Each tab is given a reference to the global CONFIG_VALUES and the serial_handler
-        self.board_tab_widget = BoardTabWidget(CONFIG_VALUES, self.serial_handler, self)
-        self.tabs.addTab(self.board_tab_widget, "Board Config")
-
-        self.capture_tab_widget = CaptureTabWidget(CONFIG_VALUES, self.serial_handler, self)
-        self.tabs.addTab(self.capture_tab_widget, "Capture Zone")
-
-        self.servo_tab_widget = ServoTabWidget(CONFIG_VALUES, self.serial_handler, self)
-        self.tabs.addTab(self.servo_tab_widget, "Servos")
-
-        self.stepper_tab_widget = StepperTabWidget(CONFIG_VALUES, self.serial_handler, self)
-        self.tabs.addTab(self.stepper_tab_widget, "Steppers")
-
-        self.actuator_tab_widget = ActuatorTabWidget(CONFIG_VALUES, self.serial_handler, self)
-        self.tabs.addTab(self.actuator_tab_widget, "Linear Actuator")
-        
-        self.network_tab_widget = NetworkTabWidget(CONFIG_VALUES, self)
-        self.tabs.addTab(self.network_tab_widget, "Network Config")
-
-        self.test_tab_widget = TestTabWidget(CONFIG_VALUES, self.serial_handler, self)
-        self.tabs.addTab(self.test_tab_widget, "Test Moves")
+        for title, _module, _class, attribute, _refresh, _serial in TAB_SPECS:
+            setattr(self, attribute, None)
+            self.tabs.addTab(LazyTabPage(), title)
+        self.tabs.currentChanged.connect(self.ensure_tab_built)
+        self.ensure_tab_built(self.tabs.currentIndex())
 
         # --- Initialize Bottom Toolbox ---
         self.bottom_toolbox_widget = BottomToolbox(CONFIG_VALUES, self.serial_handler, self.show_generated_config, self)
         self.main_layout.addWidget(self.bottom_toolbox_widget)
 
-        # --- Connect the config update signal to each tab's refresh method ---
-        self.config_updated_signal.connect(self.board_tab_widget.update_board_info_box)
-        self.config_updated_signal.connect(self.capture_tab_widget.load_fields_from_config)
-        self.config_updated_signal.connect(self.servo_tab_widget.load_fields_from_config)
-        self.config_updated_signal.connect(self.stepper_tab_widget.load_fields_from_config)
-        self.config_updated_signal.connect(self.actuator_tab_widget.load_fields_from_config)
-        self.config_updated_signal.connect(self.network_tab_widget.load_fields_from_config)
+    def ensure_tab_built(self, index):
+        """Builds the tab at `index` if it hasn't been shown yet."""
+        page = self.tabs.widget(index)
+        if page is None or page.tab_widget is not None:
+            return
+        title, module_name, class_name, attribute, refresh_method, uses_serial = TAB_SPECS[index]
+        tab_class = getattr(importlib.import_module(module_name), class_name)
+        if uses_serial:
+            tab = tab_class(CONFIG_VALUES, self.serial_handler, page)
+        else:
+            tab = tab_class(CONFIG_VALUES, page)
+        page.layout().addWidget(tab)
+        page.tab_widget = tab
+        setattr(self, attribute, tab)
+        # Refresh the tab's fields whenever the config changes
+        if refresh_method:
+            self.config_updated_signal.connect(getattr(tab, refresh_method))
+        mark_startup(f"'{title}' tab built")
+
+    def build_all_tabs(self):
+        for index in range(self.tabs.count()):
+            self.ensure_tab_built(index)
 
     def load_config_from_file(self, file_path, silent_if_not_found=False):
         """Loads config from a file, updates the global CONFIG_VALUES, and emits a signal."""
@@ -130,10 +182,39 @@ class MainWindow(QMainWindow):
         if file_path:
             self.load_config_from_file(file_path)
 
+    def download_config_from_device(self):
+        """Replaces the app's values with the ESP32's current config and position targets."""
+        if not self.serial_handler.is_connected():
+            QMessageBox.warning(self, "Not Connected", "Connect to the ESP32 first.")
+            return
+        self.serial_handler.download_config().add_done_callback(self._on_config_downloaded)
+
+    def _on_config_downloaded(self, future):
+        global CONFIG_VALUES
+        if not future.ok:
+            QMessageBox.warning(self, "Read Failed", f"Could not read the config from the ESP32:\n{future.error}")
+            return
+        CONFIG_VALUES.update(future.values) # In-place, tabs hold references
+        self.config_updated_signal.emit()
+        QMessageBox.information(self, "Config Read", f"Loaded {len(future.values)} values from the ESP32.")
+
+    def upload_config_to_device(self):
+        """Sends all of the app's config values and position targets to the ESP32."""
+        global CONFIG_VALUES
+        if not self.serial_handler.is_connected():
+            QMessageBox.warning(self, "Not Connected", "Connect to the ESP32 first.")
+            return
+        try:
+            future = self.serial_handler.upload_config(CONFIG_VALUES)
+        except ValueError as e:
+            QMessageBox.warning(self, "Config Error", f"Cannot send the config: {e}")
+            return
+        report_config_push(self, future, "ESP32 config")
+
     def show_generated_config(self):
         """Generates the config.h content and shows it in a dialog."""
         global CONFIG_VALUES
-        config_h_content = generate_config_h_string(CONFIG_VALUES)
+        config_h_content = self.config_h_renderer.render(CONFIG_VALUES)
         dialog = ConfigOutputDialog(config_h_content, self)
         dialog.exec_()
 
@@ -141,10 +222,25 @@ class MainWindow(QMainWindow):
         """Ensures serial port is closed when application exits."""
         if self.serial_handler.is_connected():
             self.serial_handler.disconnect_serial()
+        self.serial_handler.wait_for_port_scan()
         event.accept()
 
 if __name__ == '__main__':
     app = QApplication(sys.argv)
+    mark_startup("QApplication created")
     main_win = MainWindow()
+    mark_startup("main window created")
+    if "--sim" in sys.argv:
+        # Serve the simulated firmware on a pseudo-terminal and offer it as a port
+        from utils.firmware_sim import PtySimulator
+        simulator = PtySimulator()
+        simulator.start()
+        main_win.serial_handler.add_extra_port(simulator.port_name, "Firmware simulator")
+        app.aboutToQuit.connect(simulator.stop)
+        print(f"Firmware simulator running on {simulator.port_name}")
     main_win.show()
+    mark_startup("main window shown")
+    if STARTUP_TIMELINE:
+        # Runs once the event loop has processed the first show/paint events
+        QTimer.singleShot(0, lambda: (mark_startup("event loop running"), print_startup_timeline()))
     sys.exit(app.exec_())
\ No newline at end of file
@@ -0,0 +1,71 @@
+from utils.command_futures import CommandTracker
+from utils.firmware_sim import FirmwareSimulator, SimulatorLink
+
+
+def test_unknown_command_error_of_an_untracked_command_is_not_attributed():
+    tracker = CommandTracker()
+    ping, _ = tracker.create("ping", 0.0)
+    tracker.feed("ERR: Unknown command: stream", 0.1) # e.g. 'stream 25' sent with send_command
+    assert not ping.done
+    tracker.feed("ACK: pong", 0.2)
+    assert ping.ok and ping.lines == [(0.2, "ACK: pong")]
+
+def test_unknown_command_error_fails_its_own_command():
+    tracker = CommandTracker()
+    stream, _ = tracker.create("stream 25", 0.0)
+    tracker.feed("ERR: Unknown command: stream", 0.1)
+    assert stream.done and not stream.ok and stream.error == "Unknown command: stream"
+
+def test_other_errors_fail_the_oldest_command():
+    tracker = CommandTracker()
+    goto, _ = tracker.create("gotocart 100", 0.0)
+    ping, _ = tracker.create("ping", 0.0)
+    tracker.feed("ERR: Steppers not homed.", 0.1)
+    assert not goto.ok and goto.error == "Steppers not homed."
+    assert not ping.done
+
+
+# --- With sequence tags ---
+def tagged_tracker():
+    tracker = CommandTracker()
+    tracker.sequence_ids = True
+    return tracker
+
+def test_untracked_error_before_a_tagged_reply_is_not_attributed():
+    tracker = tagged_tracker()
+    position, wire_text = tracker.create("getallpos", 0.0)
+    assert wire_text == "#1 getallpos"
+    tracker.feed("ERR: Steppers not homed.", 0.1) # An untagged 'gotocart' sent just before
+    for line in ("BEGIN #1", "POS: {}", "DONE #1"):
+        tracker.feed(line, 0.2)
+    assert position.ok and position.reply == "POS: {}"
+    assert position.lines == [(0.2, "POS: {}")]
+
+def test_lines_between_tagged_replies_are_not_attributed():
+    tracker = tagged_tracker()
+    ping, _ = tracker.create("ping", 0.0)
+    goto, _ = tracker.create("gotocart 100", 0.0)
+    assert tracker.feed("BEGIN #1", 0.1)
+    tracker.feed("ACK: pong", 0.1)
+    assert tracker.feed("DONE #1", 0.1)
+    tracker.feed("ERR: Capture homing timeout!", 0.2) # Printed from loop(), not by a command
+    for line in ("BEGIN #2", "ACK: Stepper moving to 100", "DONE #2"):
+        tracker.feed(line, 0.3)
+    assert ping.ok and goto.ok
+    assert [line for _, line in goto.lines] == ["ACK: Stepper moving to 100"]
+
+def test_tagged_error_inside_its_markers_fails_it():
+    tracker = tagged_tracker()
+    goto, _ = tracker.create("gotocart 100", 0.0)
+    for line in ("BEGIN #1", "ERR: Steppers not homed.", "DONE #1"):
+        tracker.feed(line, 0.1)
+    assert not goto.ok and goto.error == "Steppers not homed."
+
+def test_untracked_error_against_the_simulator():
+    link = SimulatorLink(FirmwareSimulator())
+    link.simulator.take_output()
+    link.tracker.sequence_ids = True
+    link.simulator.feed("getpos wheel\n") # Sent with plain send_command, answered with an ERR
+    position = link.send_command_async("getallpos")
+    link.run()
+    assert position.ok and position.reply.startswith("POS: ")
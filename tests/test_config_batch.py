@@ -0,0 +1,68 @@
+import json
+import os
+
+import pytest
+
+from utils.config_batch import build_all, collect_robots
+from utils.config_parser import layer_config_values, parse_config_file, write_config_h
+
+
+def write_manifest(tmp_path, manifest):
+    path = tmp_path / "fleet.json"
+    path.write_text(json.dumps(manifest))
+    return str(path)
+
+def errors(results):
+    return {robot: error for robot, _, error in results if error}
+
+
+def test_manifest_builds_each_robot(tmp_path):
+    source = write_manifest(tmp_path, {"robots": {"alpha": {}, "beta": {"STEPPER_SPEED": 900}}})
+    results = build_all(collect_robots(source), str(tmp_path / "out"), jobs=1)
+    assert not errors(results)
+    assert all(os.path.isfile(path) for _, path, _ in results)
+
+@pytest.mark.parametrize("robot", ["../escape", "/tmp/abs", "a/b", "..", "."])
+def test_robot_names_outside_out_dir_fail(tmp_path, robot):
+    source = write_manifest(tmp_path, {"robots": {robot: {}, "ok": {}}})
+    out_dir = tmp_path / "out"
+    results = build_all(collect_robots(source), str(out_dir), jobs=1)
+    assert list(errors(results)) == [robot]
+    assert errors(results)[robot].startswith("invalid robot name")
+    assert sorted(os.listdir(out_dir)) == ["ok"]
+    assert not (tmp_path / "escape").exists()
+
+def test_dotted_robot_names_are_allowed(tmp_path):
+    source = write_manifest(tmp_path, {"robots": {"x..y": {}, "v1.2": {}}})
+    results = build_all(collect_robots(source), str(tmp_path / "out"), jobs=1)
+    assert not errors(results)
+    assert sorted(os.listdir(tmp_path / "out")) == ["v1.2", "x..y"]
+
+@pytest.mark.parametrize("entry", [[1, 2], 5, None, True])
+def test_bad_robot_entry_is_a_per_robot_failure(tmp_path, entry):
+    source = write_manifest(tmp_path, {"robots": {"bad": entry, "ok": {}}})
+    results = build_all(collect_robots(source), str(tmp_path / "out"), jobs=1)
+    assert list(errors(results)) == ["bad"]
+
+@pytest.mark.parametrize("manifest", [[], {"robots": []}, {"robots": {}, "defaults": "x"}])
+def test_malformed_manifest_is_rejected(tmp_path, manifest):
+    with pytest.raises(ValueError):
+        collect_robots(write_manifest(tmp_path, manifest))
+
+
+# --- <robot>.h sources ---
+def test_header_source_keeps_its_orb_id(tmp_path):
+    source_dir = tmp_path / "robots"
+    source_dir.mkdir()
+    write_config_h(layer_config_values({"ORB_ID": "ORB LYON", "STEPPER_SPEED": 900}), str(source_dir / "lyon.h"))
+    results = build_all(collect_robots(str(source_dir)), str(tmp_path / "out"), jobs=1)
+    assert not errors(results)
+    built = parse_config_file(results[0][1])
+    assert built["ORB_ID"] == "ORB LYON" and built["STEPPER_SPEED"] == 900
+
+def test_header_keys_the_template_drops_fail_the_robot(tmp_path):
+    source_dir = tmp_path / "robots"
+    source_dir.mkdir()
+    (source_dir / "old.h").write_text('const int STEPPER_SPEED = 900;\nconst int LEGACY_OFFSET = 12;\n')
+    results = build_all(collect_robots(str(source_dir)), str(tmp_path / "out"), jobs=1)
+    assert "LEGACY_OFFSET" in errors(results)["old"]
@@ -0,0 +1,111 @@
+import pytest
+
+from utils.config_parser import DEFAULT_CONFIG_VALUES
+from utils.config_sync import (DeviceConfigSync, FIRMWARE_CONFIG_KEYS, FIRMWARE_TARGET_ARRAYS,
+                               decode_config_blob, encode_config_blob, fletcher16)
+from utils.firmware_sim import FirmwareSimulator, SimulatorLink
+
+# dumpconfig/loadconfig against the firmware simulator, and the DeviceConfigSync calls
+# behind the main window's Read/Write Config buttons.
+
+FIRMWARE_RX_BUFFER = 1024 # Serial.setRxBufferSize() in the firmware's setup()
+
+
+def config_values(**changes):
+    values = {key: list(value) if isinstance(value, list) else value for key, value in DEFAULT_CONFIG_VALUES.items()}
+    values.update(changes)
+    return values
+
+def send(simulator, line):
+    simulator.take_output()
+    simulator.feed(line + "\n")
+    return [text for _, text in simulator.take_output()]
+
+def dump(simulator):
+    lines = send(simulator, "dumpconfig")
+    assert len(lines) == 1 and lines[0].startswith("CFG ")
+    return lines[0]
+
+
+def test_dump_load_round_trip():
+    simulator = FirmwareSimulator()
+    values = decode_config_blob(dump(simulator))
+    values["STEPPER_SPEED"] = 5500
+    values["captureTargets"][3] = 1234
+
+    reply = send(simulator, "loadconfig " + encode_config_blob(values))
+    assert reply[0].startswith("ACK: Config loaded") and reply[0].endswith("rejected=")
+    assert decode_config_blob(dump(simulator)) == values
+    assert simulator.config["stepper_speed"] == 5500
+    assert simulator.targets["capturetargets"][3] == 1234
+
+def test_dump_covers_every_key_and_target():
+    values = decode_config_blob(dump(FirmwareSimulator()))
+    assert set(FIRMWARE_CONFIG_KEYS) <= set(values)
+    for key, length in FIRMWARE_TARGET_ARRAYS.items():
+        assert len(values[key]) == length
+
+def test_loadconfig_rejects_checksum_mismatch():
+    simulator = FirmwareSimulator()
+    checksum, payload = encode_config_blob(config_values(STEPPER_SPEED=7777)).split(" ", 1)
+    wrong = f"{(int(checksum, 16) + 1) & 0xffff:04x}"
+    assert send(simulator, f"loadconfig {wrong} {payload}") == ["ERR: Config checksum mismatch"]
+    assert simulator.config["stepper_speed"] != 7777
+
+def test_loadconfig_rejects_truncated_line():
+    simulator = FirmwareSimulator()
+    blob = encode_config_blob(config_values(STEPPER_SPEED=7777))
+    assert send(simulator, "loadconfig " + blob[:len(blob) // 2]) == ["ERR: Config checksum mismatch"]
+    assert send(simulator, "loadconfig " + blob.split(" ")[0]) == \
+        ["ERR: Invalid loadconfig format. Use: loadconfig <checksum> <payload>"]
+    assert simulator.config["stepper_speed"] != 7777
+
+def test_decode_rejects_damaged_dumps():
+    line = dump(FirmwareSimulator())
+    with pytest.raises(ValueError):
+        decode_config_blob(line[:-10]) # Truncated
+    checksum, payload = line[len("CFG "):].split(" ", 1)
+    oversized = payload + ",1" # One capture target too many (captureTargets is last)
+    with pytest.raises(ValueError, match="captureTargets"):
+        decode_config_blob(f"CFG {fletcher16(oversized):04x} {oversized}")
+
+def test_encode_rejects_wrong_target_count_and_fits_rx_buffer():
+    with pytest.raises(ValueError):
+        encode_config_blob(config_values(captureTargets=[0] * 33))
+    assert len("loadconfig " + encode_config_blob(config_values())) < FIRMWARE_RX_BUFFER
+
+
+# --- Read/Write Config (main_app -> SerialHandler -> DeviceConfigSync) ---
+def test_upload_then_download_through_device_config_sync():
+    link = SimulatorLink()
+    link.simulator.take_output()
+    sync = DeviceConfigSync(link.send_command_async)
+    values = config_values(STEPPER_ACCEL=9000, orbTargets=[100, 200, 300, 400, 500, 600, 700, 800])
+
+    upload = sync.upload(values)
+    link.run()
+    assert upload.ok, upload.error
+    assert not upload.rejected
+    assert link.simulator.targets["orbtargets"] == values["orbTargets"]
+
+    download = DeviceConfigSync(link.send_command_async).download()
+    link.run()
+    assert download.ok, download.error
+    for key in list(FIRMWARE_CONFIG_KEYS) + list(FIRMWARE_TARGET_ARRAYS):
+        assert download.values[key] == values[key], key
+
+def test_download_records_known_values_so_push_sends_nothing():
+    link = SimulatorLink()
+    sync = DeviceConfigSync(link.send_command_async)
+    download = sync.download()
+    link.run()
+    assert download.ok
+    push = sync.push(download.values)
+    assert push.ok and push.reply == "Nothing to send"
+
+def test_download_fails_on_damaged_dump():
+    link = SimulatorLink()
+    link.simulator._cmd_dumpconfig = lambda: link.simulator._println("CFG 0000 stepper_speed=1")
+    download = DeviceConfigSync(link.send_command_async).download()
+    link.run()
+    assert not download.ok and "checksum" in download.error
@@ -0,0 +1,54 @@
+import pytest
+
+from utils.firmware_sim import FirmwareSimulator, SimulatorLink
+from utils.move_profiler import PHASES, MoveProfiler, MoveTiming
+
+# Phase timing of 'do' moves from the lines the firmware prints while they run.
+
+
+class RecordedMove:
+    """The parts of a command future MoveTiming reads."""
+
+    def __init__(self, lines, sent_at=0.0, ok=True, error=None):
+        self.lines = lines
+        self.sent_at = sent_at
+        self.ok = ok
+        self.error = error
+        self.latency_s = lines[-1][0] - sent_at if ok else None
+
+def event(received_at, ev, phase=None, state=None):
+    fields = f'"seq":"do","ev":"{ev}"'
+    if phase:
+        fields += f',"state":"{state}","phase":"{phase}","step":1'
+    return received_at, "EVT: {" + fields + "}"
+
+def profile(link, moves):
+    profiler = MoveProfiler(link.send_command_async)
+    profiler.start(moves)
+    link.run()
+    return profiler.results
+
+
+def test_skipped_rotation_phases_add_up_to_the_move():
+    simulator = FirmwareSimulator(stall_limits={})
+    simulator.place(1500, 900, 0, simulator.config["gripper_rot_board"]) # No ROTATE for the source
+    link = SimulatorLink(simulator)
+    timing, = profile(link, [("e2", "e4")])
+    assert timing.ok
+    assert all(timing.phases[phase] > 0 for phase in PHASES)
+    assert sum(timing.phases.values()) == pytest.approx(timing.total_s)
+
+def test_skipped_steps_are_charged_to_their_phase():
+    # Source starts with a skipped ROTATE and dest prints nothing: the time before the first
+    # source line is the source phase's, and dest gets 0 s rather than take's end
+    lines = [event(0.1, "start"), event(0.6, "state", "source", "MOVE_BOARD"),
+             event(1.0, "state", "take", "GRIP_OPEN"), event(3.0, "state", "release", "EXTEND"),
+             event(4.5, "done")]
+    timing = MoveTiming("e2", "e2", RecordedMove(lines))
+    assert timing.phases == pytest.approx({"source": 1.0, "take": 2.0, "dest": 0.0, "release": 1.5})
+
+def test_failed_move_leaves_unfinished_phases_unset():
+    lines = [event(0.1, "start"), event(0.2, "state", "source", "MOVE_BOARD"),
+             event(1.0, "state", "take", "GRIP_OPEN"), (2.0, "ERR: Stepper move timeout")]
+    timing = MoveTiming("e2", "e4", RecordedMove(lines, ok=False, error="Stepper move timeout"))
+    assert timing.phases == {"source": pytest.approx(1.0), "take": None, "dest": None, "release": None}
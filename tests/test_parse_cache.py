@@ -0,0 +1,38 @@
+import json
+
+import pytest
+
+from utils import config_parser
+
+
+@pytest.fixture
+def config_h(tmp_path):
+    path = tmp_path / "config.h"
+    path.write_text("const uint16_t STEPPER_SPEED = 4321;\n")
+    config_parser.clear_parse_cache()
+    yield str(path)
+    config_parser.clear_parse_cache()
+    config_parser._parse_cache_file = None
+
+def write_cache(tmp_path, entries):
+    cache_file = tmp_path / "cache.json"
+    cache_file.write_text(json.dumps(entries))
+    return str(cache_file)
+
+
+@pytest.mark.parametrize("entry", [
+    {"values": {"STEPPER_SPEED": 1}},                               # Older format, no mtime/size/sha1
+    {"mtime": "x", "size": 1, "sha1": "0", "values": {}},           # Hand-edited types
+    {"mtime": 1, "size": 1, "sha1": "0", "values": [1]},
+    [1, 2, 3],
+])
+def test_malformed_cache_entries_are_dropped(tmp_path, config_h, entry):
+    config_parser.enable_parse_cache_file(write_cache(tmp_path, {config_h: entry}))
+    assert config_parser.load_config_values(config_h)["STEPPER_SPEED"] == 4321
+
+def test_valid_cache_entry_is_used(tmp_path, config_h):
+    config_parser.parse_config_file(config_h)
+    entry = dict(config_parser._parse_cache[config_h], values={"STEPPER_SPEED": 1111})
+    config_parser.clear_parse_cache()
+    config_parser.enable_parse_cache_file(write_cache(tmp_path, {config_h: entry}))
+    assert config_parser.parse_config_file(config_h)["STEPPER_SPEED"] == 1111
@@ -0,0 +1,203 @@
+import pytest
+
+from utils.command_futures import CommandTracker
+from utils.firmware_sim import FirmwareSimulator, SimulatorLink
+from utils.message_bus import Progress, parse_line
+
+# 'take', 'release' and 'do' as a step machine ticked from loop(): progress events,
+# commands while a sequence runs, 'stop', and how the host attributes the lines.
+
+TAKE_STATES = ["GRIP_OPEN", "EXTEND", "GRIP_CLOSE", "RETRACT"]
+RELEASE_STATES = ["EXTEND", "GRIP_OPEN", "RETRACT"]
+
+
+def homed_simulator(cart=1500, orb=900, capt=0, rot=180):
+    simulator = FirmwareSimulator(stall_limits={})
+    simulator.place(cart, orb, capt, rot)
+    simulator.take_output()
+    return simulator
+
+def run_until_idle(simulator, limit_ms=60000):
+    lines = []
+    while simulator.seq_active and limit_ms > 0:
+        simulator.advance(10)
+        limit_ms -= 10
+        lines += [text for _, text in simulator.take_output()]
+    return lines
+
+def run_command(simulator, line):
+    simulator.feed(line + "\n")
+    lines = [text for _, text in simulator.take_output()]
+    return lines + run_until_idle(simulator)
+
+def events(lines):
+    return [event for event in map(parse_line, lines) if isinstance(event, Progress)]
+
+def states(lines, phase=None):
+    return [e.state for e in events(lines) if e.event == "state" and (phase is None or e.phase == phase)]
+
+
+# --- Event order ---
+def test_take_events():
+    lines = run_command(homed_simulator(), "take")
+    assert lines[0] == "ACK: Executing Take Sequence..."
+    take = events(lines)
+    assert [e.event for e in take] == ["start"] + ["state"] * 4 + ["done"]
+    assert states(lines, "take") == TAKE_STATES
+    assert [e.step for e in take[1:-1]] == [1, 2, 3, 4]
+    assert all(e.sequence == "take" and e.steps == 4 for e in take[:-1])
+    assert take[-1].elapsed_ms == 300 + 650 + 700 + 650
+
+def test_release_events():
+    lines = run_command(homed_simulator(), "release")
+    assert [e.event for e in events(lines)] == ["start"] + ["state"] * 3 + ["done"]
+    assert states(lines, "release") == RELEASE_STATES
+
+def test_do_board_to_board_events():
+    simulator = homed_simulator()
+    lines = run_command(simulator, "do e2 e4")
+    do = events(lines)
+    assert do[0].event == "start" and do[-1].event == "done"
+    assert states(lines) == ["MOVE_BOARD", "WAIT_BOARD"] + TAKE_STATES + ["MOVE_BOARD", "WAIT_BOARD"] + RELEASE_STATES
+    phases = [e.phase for e in do if e.event == "state"]
+    assert phases == sorted(phases, key=["source", "take", "dest", "release"].index)
+    elapsed = [e.elapsed_ms for e in do]
+    assert elapsed == sorted(elapsed)
+    assert simulator.cart.current_position() == simulator.targets["carttargets"][3] # Rank 4
+    assert simulator.orb.current_position() == simulator.targets["orbtargets"][4] # File e
+
+def test_do_board_to_capture_events():
+    simulator = homed_simulator()
+    lines = run_command(simulator, "do e2 capt5")
+    assert states(lines, "dest") == ["MOVE_CART_ORB", "WAIT_CART_ORB", "MOVE_CAPTURE", "WAIT_CAPTURE",
+                                     "ROTATE_CAPTURE_ANGLE"]
+    assert events(lines)[-1].event == "done"
+    assert simulator.capture.current_position() == simulator.targets["capturetargets"][4]
+    assert simulator.rot_servo == simulator.config["gripper_rot_capture"]
+
+def test_do_from_capture_rotates_to_board_angle_first():
+    simulator = homed_simulator()
+    run_command(simulator, "do e2 capt5")
+    lines = run_command(simulator, "do capt5 e4")
+    assert states(lines, "source")[0] == "ROTATE_BOARD_ANGLE"
+    assert events(lines)[-1].event == "done"
+
+def test_do_rejects_bad_locations_without_starting():
+    simulator = homed_simulator()
+    lines = run_command(simulator, "do e2 z9")
+    assert "ERR: Invalid loc in DO" in lines
+    assert not events(lines) and not simulator.seq_active
+
+
+# --- Commands while a sequence runs ---
+def test_motion_commands_are_busy_but_queries_answer():
+    simulator = homed_simulator()
+    simulator.feed("do e2 e4\n")
+    simulator.advance(500)
+    simulator.take_output()
+    for command in ("gotocart 100", "homeall", "take", "do e4 e2", "servorot 90", "setconfig stepper_speed 1"):
+        simulator.feed(command + "\n")
+        assert [text for _, text in simulator.take_output()] == \
+            ["ERR: Busy: 'do' sequence running (send 'stop')"], command
+    simulator.feed("getallpos\n")
+    reply = [text for _, text in simulator.take_output()]
+    assert len(reply) == 1 and reply[0].startswith("POS: ")
+    assert events(run_until_idle(simulator))[-1].event == "done"
+
+def test_stop_ends_the_sequence():
+    simulator = homed_simulator()
+    simulator.feed("do e2 e4\n")
+    simulator.advance(1800) # In the take
+    simulator.take_output()
+    simulator.feed("stop\n")
+    lines = [text for _, text in simulator.take_output()]
+    assert events(lines)[-1].event == "stopped"
+    assert lines[-1] == "ACK: Stopped"
+    assert not simulator.seq_active and simulator.actuator_direction == 0
+    simulator.advance(2000)
+    assert not events([text for _, text in simulator.take_output()]) # Nothing more from the sequence
+    assert not any(stepper.is_moving() for stepper in simulator.steppers.values())
+
+
+# --- Safety steps and timeouts ---
+def test_safety_homes_capture_wheel_before_a_low_cart_move():
+    simulator = homed_simulator(cart=2250, capt=2000, rot=62) # Parked at a capture slot
+    speed = simulator.capture.max_speed
+    lines = run_command(simulator, "do a8 e4") # Rank 8: the cart goes below both thresholds
+    source = states(lines, "source")
+    assert source[:2] == ["SAFETY_HOME_CAPTURE", "SAFETY_ROTATE"]
+    assert events(lines)[-1].event == "done"
+    assert simulator.capture.current_position() == 0 and simulator.homed["capt"]
+    assert simulator.capture.max_speed == speed # Homing speed restored
+
+def test_stepper_timeout_ends_with_error_event():
+    simulator = homed_simulator()
+    simulator.cart.max_speed = 50.0 # e2 -> a8 now takes minutes
+    lines = run_command(simulator, "do e2 a8")
+    final = events(lines)[-1]
+    assert final.event == "error" and final.message == "Stepper move timeout"
+    assert 20000 <= final.elapsed_ms <= 20100
+    assert not simulator.seq_active
+
+
+# --- Sequence tags ---
+def test_tagged_done_arrives_when_the_sequence_ends():
+    simulator = homed_simulator()
+    simulator.feed("#7 do e2 e4\n#8 getallpos\n")
+    lines = [text for _, text in simulator.take_output()]
+    assert "DONE #8" in lines and "DONE #7" not in lines
+    lines = run_until_idle(simulator)
+    assert lines[-1] == "DONE #7"
+    assert parse_line(lines[-2]).event == "done"
+
+def test_tagged_done_is_immediate_when_nothing_starts():
+    simulator = FirmwareSimulator() # Not homed
+    simulator.take_output()
+    simulator.feed("#3 do e2 e4\n")
+    assert [text for _, text in simulator.take_output()][-2:] == ["ERR: Steppers not homed.", "DONE #3"]
+
+
+# --- Host side: CommandTracker attribution ---
+@pytest.mark.parametrize("tagged", [True, False])
+def test_tracker_attribution(tagged):
+    link = SimulatorLink(homed_simulator())
+    link.tracker.sequence_ids = tagged
+    do = link.send_command_async("do e2 capt5")
+    busy = link.send_command_async("gotocart 100")
+    position = link.send_command_async("getallpos")
+    link.run()
+
+    assert do.ok and do.background
+    assert parse_line(do.reply).event == "done"
+    assert all(line.startswith(("ACK: Executing", "EVT:")) for _, line in do.lines)
+    assert not busy.ok and busy.error.startswith("Busy")
+    assert position.ok and position.reply.startswith("POS: ")
+    assert position.finished_at < do.finished_at
+
+@pytest.mark.parametrize("tagged", [True, False])
+def test_tracker_fails_a_stopped_sequence(tagged):
+    link = SimulatorLink(homed_simulator())
+    link.tracker.sequence_ids = tagged
+    do = link.send_command_async("do e2 e4")
+    link.advance(1000)
+    stop = link.send_command_async("stop")
+    link.run()
+    assert stop.ok and stop.reply == "ACK: Stopped"
+    assert not do.ok and do.error == "stopped"
+
+def test_tracker_keeps_legacy_blocking_replies():
+    """Firmware without progress events: the reply lines all belong to the oldest command."""
+    tracker = CommandTracker()
+    do, _ = tracker.create("do e2 e4", 0.0)
+    ping, _ = tracker.create("ping", 0.0)
+    for line in ("ACK: Executing Do Sequence: e2 -> e4", "  1. Moving to Source: e2", "  Do Sequence Complete.", "ACK: pong"):
+        tracker.feed(line, 1.0)
+    assert do.ok and do.reply == "  Do Sequence Complete." and not do.background
+    assert ping.ok
+
+def test_progress_without_a_tracked_sequence_is_ignored():
+    tracker = CommandTracker()
+    ping, _ = tracker.create("ping", 0.0)
+    tracker.feed('EVT: {"seq":"do","ev":"start","steps":15,"ms":0}', 0.1) # A 'do' sent untracked
+    tracker.feed("ACK: pong", 0.2)
+    assert ping.ok and not ping.background and len(ping.lines) == 1
@@ -0,0 +1,44 @@
+import os
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import pytest
+from PyQt5.QtWidgets import QApplication, QMessageBox
+
+from utils.serial_handler import SerialHandler
+
+
+class BrokenPort:
+    """An open port whose writes fail, like a USB adapter that was just unplugged."""
+    is_open = True
+
+    def write(self, data):
+        raise OSError("device disconnected")
+
+    def close(self):
+        self.is_open = False
+
+
+@pytest.fixture
+def handler(monkeypatch):
+    app = QApplication.instance() or QApplication([])
+    monkeypatch.setattr(QMessageBox, "warning", staticmethod(lambda *args, **kwargs: None))
+    handler = SerialHandler()
+    handler.serial_connection = BrokenPort()
+    yield handler
+    handler.deleteLater()
+
+
+def test_write_error_disconnects_and_fails_pending_futures(handler):
+    pending = handler.send_command_async("ping")
+    assert not handler.is_connected()
+    assert pending.done and not pending.ok
+
+def test_futures_failed_on_disconnect_may_send_again(handler):
+    resent = []
+    pending, _ = handler.command_tracker.create("setconfigs stepper_speed=1", 0.0) # Already written
+    pending.add_done_callback(lambda future: resent.append(handler.send_command_async("setconfigs stepper_speed=1")))
+
+    assert not handler.send_command("ping") # Write fails -> disconnect -> callback -> send
+    assert pending.error == "disconnected"
+    assert len(resent) == 1 and resent[0].error == "not sent"
@@ -0,0 +1,72 @@
+from PyQt5.QtCore import QObject, pyqtSignal
+
+from utils.command_futures import CommandTracker
+from utils.message_bus import MessageBus
+from utils.telemetry_poller import TelemetryPoller
+
+
+class RecordingHandler(QObject):
+    """The parts of SerialHandler the poller uses, writing into a list instead of a port."""
+    data_received = pyqtSignal(str)
+
+    def __init__(self):
+        super().__init__()
+        self.message_bus = MessageBus()
+        self.command_tracker = CommandTracker()
+        self.sent = []
+        self.telemetry_poller = TelemetryPoller(self)
+
+    def is_connected(self):
+        return False # Keeps the poll timer and its requests out of the way
+
+    def send_command(self, command):
+        self.sent.append(command)
+        self.telemetry_poller.note_command(command)
+        return True
+
+    def send_command_async(self, command, timeout_s=None):
+        future, wire_text = self.command_tracker.create(command, 0.0, timeout_s)
+        self.sent.append(wire_text)
+        self.telemetry_poller.note_command(command, future)
+        return future
+
+    def receive(self, line):
+        self.command_tracker.feed(line, 0.0)
+        self.data_received.emit(line)
+        self.message_bus.dispatch(line)
+
+
+def test_error_of_an_earlier_command_does_not_end_an_untracked_sequence():
+    handler = RecordingHandler()
+    handler.send_command("gotocart 99999")
+    handler.send_command("take")
+    handler.receive("ERR: Unknown config key: x") # Reply to something sent before the sequence
+    assert handler.telemetry_poller.blocking_end_markers is not None
+    handler.receive("  Take Sequence Complete.")
+    assert handler.telemetry_poller.blocking_end_markers is None
+
+def test_own_validation_error_ends_an_untracked_sequence():
+    handler = RecordingHandler()
+    handler.send_command("do e2 z9")
+    handler.receive("ERR: Invalid loc in DO")
+    assert handler.telemetry_poller.blocking_end_markers is None
+
+def test_tracked_sequence_ends_with_its_future():
+    handler = RecordingHandler()
+    earlier = handler.send_command_async("setconfig x 1")
+    do = handler.send_command_async("do e2 e4")
+    handler.receive("ERR: Unknown config key: x")
+    assert not earlier.ok and not do.done
+    assert handler.telemetry_poller.blocking_end_markers is not None
+    handler.receive("ERR: Steppers not homed.")
+    assert not do.ok
+    assert handler.telemetry_poller.blocking_end_markers is None
+
+def test_tracked_sequence_timeout_keeps_waiting():
+    handler = RecordingHandler()
+    do = handler.send_command_async("la_ext_timed")
+    handler.command_tracker.expire(10.0)
+    assert do.error == "timeout"
+    assert handler.telemetry_poller.blocking_end_markers is not None
+    handler.receive("Extend (timed) complete")
+    assert handler.telemetry_poller.blocking_end_markers is None
@@ -1,8 +1,9 @@
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit,
                              QPushButton, QGroupBox, QMessageBox, QSizePolicy, QGridLayout)
 from PyQt5.QtGui import QFont
-from PyQt5.QtCore import Qt, QTimer
-import json
+from PyQt5.QtCore import Qt
+from ui.dialogs import report_config_push
+from utils.message_bus import Pos, Ack
 
 class ActuatorTabWidget(QWidget):
     def __init__(self, config_values_ref, serial_handler_ref, parent=None):
@@ -88,10 +89,9 @@ class ActuatorTabWidget(QWidget):
         self.load_fields_from_config()
 
         if self.serial_handler:
-            self.serial_handler.data_received.connect(self.parse_esp32_response)
-            self.status_update_timer = QTimer(self)
-            self.status_update_timer.timeout.connect(self.request_all_statuses)
-            self.serial_handler.connection_status_changed.connect(self.handle_connection_change_for_timer)
+            self.serial_handler.message_bus.subscribe(Pos, self.on_pos_message)
+            self.serial_handler.message_bus.subscribe(Ack, self.on_ack_message)
+            self.serial_handler.connection_status_changed.connect(self.handle_connection_change)
 
     def load_fields_from_config(self):
         print("ActuatorTab: Loading fields from config.")
@@ -104,8 +104,8 @@ class ActuatorTabWidget(QWidget):
                 # Update Python dictionary
                 self.config_values["ACTUATOR_TRAVEL_TIME_MS"] = travel_time
                 # Send update to ESP32
-                self.serial_handler.send_command(f"setconfig actuator_travel_time_ms {travel_time}")
-                QMessageBox.information(self, "Success", "Actuator travel time updated .")
+                push = self.serial_handler.push_config(self.config_values, ["ACTUATOR_TRAVEL_TIME_MS"])
+                report_config_push(self, push, "Actuator travel time")
             else:
                 QMessageBox.warning(self, "Input Error", "Travel time must be a positive number.")
         except ValueError:
@@ -120,32 +120,23 @@ class ActuatorTabWidget(QWidget):
         self.serial_handler.send_command("la_stop")
 
     def request_all_statuses(self):
-        if self.serial_handler.is_connected():
-            self.serial_handler.send_command("getallpos") 
-
-    def handle_connection_change_for_timer(self, connected, port_name):
-        if connected:
-            self.status_update_timer.start(3000)
-            self.request_all_statuses() # Get initial status
-        else:
-            self.status_update_timer.stop()
+        self.serial_handler.telemetry_poller.request_now()
+
+    def handle_connection_change(self, connected, port_name):
+        # Polling itself is owned by the serial handler's telemetry poller
+        if not connected:
             self.retracted_sensor_display.setText("N/A")
             self.retracted_sensor_display.setStyleSheet("") # Reset color
 
-    def parse_esp32_response(self, line):
-        if line.startswith("POS:"):
-            try:
-                json_data = json.loads(line[4:])
-                if "actuatorSensor" in json_data:
-                    sensor_state = json_data["actuatorSensor"]
-                    if sensor_state == 1: 
-                        self.retracted_sensor_display.setText("RETRACTED")
-                        self.retracted_sensor_display.setStyleSheet("color: green; font-weight: bold;")
-                    else:
-                        self.retracted_sensor_display.setText("NOT RETRACTED")
-                        self.retracted_sensor_display.setStyleSheet("color: orange; font-weight: bold;")
-            except json.JSONDecodeError:
-                print(f"ActuatorTab: Error decoding POS JSON: {line}")
-        elif line.startswith("ACK:"):
-            if "Actuator" in line:
-                self.request_all_statuses() 
\ No newline at end of file
+    def on_pos_message(self, pos):
+        if pos.actuator_sensor is not None:
+            if pos.actuator_sensor == 1: 
+                self.retracted_sensor_display.setText("RETRACTED")
+                self.retracted_sensor_display.setStyleSheet("color: green; font-weight: bold;")
+            else:
+                self.retracted_sensor_display.setText("NOT RETRACTED")
+                self.retracted_sensor_display.setStyleSheet("color: orange; font-weight: bold;")
+
+    def on_ack_message(self, ack):
+        if "Actuator" in ack.text:
+            self.request_all_statuses()
@@ -1,22 +1,189 @@
-from PyQt5.QtWidgets import (QWidget, QHBoxLayout, QGridLayout, QLabel, QLineEdit,
-                             QPushButton, QFrame, QGroupBox, QMessageBox, QVBoxLayout,
+from PyQt5.QtWidgets import (QWidget, QHBoxLayout, QLabel, QLineEdit,
+                             QPushButton, QGroupBox, QMessageBox, QVBoxLayout,
                              QSizePolicy)
-from PyQt5.QtGui import QFont
-from PyQt5.QtCore import Qt
-import json
-
-class ChessSquareButton(QPushButton):
-    def __init__(self, text, x, y, is_label=False, parent=None):
-        super().__init__(text, parent)
-        self.x = x
-        self.y = y
-        self.is_label = is_label
-        self.setMinimumSize(50, 50)
-        self.setFont(QFont("Arial", 10))
+from PyQt5.QtGui import QFont, QPainter, QColor, QPen, QBrush, QPixmap
+from PyQt5.QtCore import Qt, QRectF, QPointF, pyqtSignal
+import math
+from ui.live_position import LivePositionFeed
+
+FILES = ['A', 'B', 'C', 'D', 'E', 'F', 'G', 'H']
+RANKS = ['8', '7', '6', '5', '4', '3', '2', '1'] # Top row first
+
+
+class ChessBoardWidget(QWidget):
+    """
+    The 8x8 board, painted in one widget: squares (and optionally the file/rank labels)
+    are drawn once into a pixmap per widget size; selection, hover and the live gripper
+    marker are painted on top. x is the file index (0 = A), y the row from the top
+    (0 = rank 8); -1 on the other axis for a file/rank label.
+    """
+    element_clicked = pyqtSignal(str, int, int, bool) # text, x, y, is_label
+    CELL_MIN_SIZE = 50
+
+    def __init__(self, show_labels=True, parent=None):
+        super().__init__(parent)
+        self.show_labels = show_labels
+        self.cells = 9 if show_labels else 8
+        self.setMinimumSize(self.cells * self.CELL_MIN_SIZE, self.cells * self.CELL_MIN_SIZE)
+        self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
+        self.setMouseTracking(True)
+        self.selected = None # (x, y, is_label)
+        self.hovered = None
+        self.live_position = None # (file, row) in fractional cell units, see set_live_position()
+        self.square_colors = {} # (x, y) -> QColor tint, see set_square_colors()
+        self._background = None
+
+    # --- Geometry ---
+    def _geometry(self):
+        """(cell size, left, top) of the board area, centred in the widget."""
+        cell = min(self.width(), self.height()) / self.cells
+        return cell, (self.width() - cell * self.cells) / 2, (self.height() - cell * self.cells) / 2
+
+    def _cell_rect(self, x, y):
+        cell, left, top = self._geometry()
+        offset = 1 if self.show_labels else 0
+        return QRectF(left + (x + offset) * cell, top + (y + offset) * cell, cell - 1, cell - 1)
+
+    def _element_at(self, pos):
+        cell, left, top = self._geometry()
+        if cell <= 0:
+            return None
+        col = math.floor((pos.x() - left) / cell)
+        row = math.floor((pos.y() - top) / cell)
+        if not (0 <= col < self.cells and 0 <= row < self.cells):
+            return None
+        if not self.show_labels:
+            return (col, row, False)
+        if col == 0 and row == 0:
+            return None # Empty corner
+        return (col - 1, row - 1, col == 0 or row == 0)
+
+    @staticmethod
+    def element_text(x, y, is_label):
+        if is_label:
+            return FILES[x] if x != -1 else RANKS[y]
+        return FILES[x] + RANKS[y]
+
+    # --- Painting ---
+    def _render_background(self):
+        ratio = self.devicePixelRatioF()
+        pixmap = QPixmap(int(self.width() * ratio), int(self.height() * ratio))
+        pixmap.setDevicePixelRatio(ratio)
+        pixmap.fill(Qt.transparent)
+        painter = QPainter(pixmap)
+        painter.setFont(QFont("Arial", 10))
+        for y in range(8):
+            for x in range(8):
+                rect = self._cell_rect(x, y)
+                light = (x + y) % 2 == 0
+                painter.fillRect(rect, QColor("#FFEBCD") if light else QColor("#8B4513"))
+                painter.setPen(Qt.black if light else Qt.white)
+                painter.drawText(rect, Qt.AlignCenter, FILES[x] + RANKS[y])
+        if self.show_labels:
+            painter.setPen(QPen(Qt.gray, 1))
+            painter.setBrush(QBrush(QColor("lightgray")))
+            for i in range(8):
+                for rect, text in ((self._cell_rect(i, -1), FILES[i]), (self._cell_rect(-1, i), RANKS[i])):
+                    painter.drawRect(rect)
+                    painter.setPen(Qt.black)
+                    painter.drawText(rect, Qt.AlignCenter, text)
+                    painter.setPen(QPen(Qt.gray, 1))
+        painter.end()
+        return pixmap
+
+    def _element_rects(self, element):
+        """Cells an element covers: one square, or a whole file/rank for a label."""
+        x, y, is_label = element
         if not is_label:
-            if (x + y) % 2 == 0: self.setStyleSheet("background-color: #FFEBCD; color: black;")
-            else: self.setStyleSheet("background-color: #8B4513; color: white;")
-        else: self.setStyleSheet("background-color: lightgray; border: 1px solid gray;")
+            return [self._cell_rect(x, y)]
+        if x != -1:
+            return [self._cell_rect(x, -1)] + [self._cell_rect(x, row) for row in range(8)]
+        return [self._cell_rect(-1, y)] + [self._cell_rect(col, y) for col in range(8)]
+
+    def paintEvent(self, event):
+        if self._background is None or self._background.size() != self.size() * self.devicePixelRatioF():
+            self._background = self._render_background()
+        painter = QPainter(self)
+        painter.drawPixmap(0, 0, self._background)
+        for (x, y), color in self.square_colors.items():
+            painter.fillRect(self._cell_rect(x, y), color)
+        if self.hovered is not None and self.hovered != self.selected:
+            painter.fillRect(self._element_rects(self.hovered)[0], QColor(255, 255, 255, 90))
+        if self.selected is not None:
+            painter.setRenderHint(QPainter.Antialiasing)
+            painter.setPen(QPen(QColor("#3498db"), 3))
+            painter.setBrush(QColor(52, 152, 219, 60))
+            for rect in self._element_rects(self.selected):
+                painter.drawRect(rect.adjusted(1.5, 1.5, -1.5, -1.5))
+        if self.live_position is not None:
+            self._paint_live_position(painter)
+
+    def _paint_live_position(self, painter):
+        cell, left, top = self._geometry()
+        offset = 1.5 if self.show_labels else 0.5 # To the centre of the cell
+        file_pos, row_pos = self.live_position
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setPen(QPen(QColor("#e74c3c"), 2))
+        if file_pos is not None and row_pos is not None:
+            painter.setBrush(QColor(231, 76, 60, 120))
+            center = QPointF(left + (file_pos + offset) * cell, top + (row_pos + offset) * cell)
+            painter.drawEllipse(center, cell * 0.3, cell * 0.3)
+        elif file_pos is not None: # Only the orb is known: mark the file
+            x = left + (file_pos + offset) * cell
+            painter.drawLine(QPointF(x, top + (offset - 0.5) * cell), QPointF(x, top + self.cells * cell))
+        elif row_pos is not None: # Only the cart is known: mark the rank
+            y = top + (row_pos + offset) * cell
+            painter.drawLine(QPointF(left + (offset - 0.5) * cell, y), QPointF(left + self.cells * cell, y))
+
+    def resizeEvent(self, event):
+        self._background = None
+        super().resizeEvent(event)
+
+    # --- Interaction ---
+    def mousePressEvent(self, event):
+        element = self._element_at(event.pos())
+        if element is not None:
+            self.set_selected(element)
+            self.element_clicked.emit(self.element_text(*element), *element)
+
+    def mouseMoveEvent(self, event):
+        element = self._element_at(event.pos())
+        if element != self.hovered:
+            self._update_element(self.hovered)
+            self.hovered = element
+            self._update_element(element)
+
+    def leaveEvent(self, event):
+        self._update_element(self.hovered)
+        self.hovered = None
+
+    def _update_element(self, element):
+        """Schedules a repaint of just the cells an element covers."""
+        if element is not None:
+            for rect in self._element_rects(element):
+                self.update(rect.toAlignedRect().adjusted(-2, -2, 2, 2))
+
+    def set_selected(self, element):
+        """Selects (x, y, is_label), or clears the selection with None."""
+        self._update_element(self.selected)
+        self.selected = element
+        self._update_element(element)
+
+    def set_square_colors(self, square_colors):
+        """Tints squares, {(x, y): QColor} (use a translucent colour to keep the labels readable); {} clears."""
+        self.square_colors = dict(square_colors)
+        self.update()
+
+    def set_live_position(self, file_pos, row_pos):
+        """
+        Moves the gripper marker to fractional cell coordinates (file 0-7 from A, row 0-7
+        from rank 8); either may be None when unknown, both None hides the marker.
+        """
+        live_position = None if file_pos is None and row_pos is None else (file_pos, row_pos)
+        if live_position != self.live_position:
+            self.live_position = live_position
+            self.update()
+
 
 class BoardTabWidget(QWidget):
     def __init__(self, config_values_ref, serial_handler_ref, parent=None):
@@ -25,27 +192,9 @@ class BoardTabWidget(QWidget):
         self.serial_handler = serial_handler_ref
 
         layout = QHBoxLayout(self)
-        board_grid_widget = QFrame()
-        board_grid_widget.setFrameShape(QFrame.StyledPanel)
-        grid_layout = QGridLayout(board_grid_widget)
-        grid_layout.setSpacing(1)
-        files = ['A', 'B', 'C', 'D', 'E', 'F', 'G', 'H']
-        ranks = ['8', '7', '6', '5', '4', '3', '2', '1']
-
-        for i, file_char in enumerate(files):
-            label_btn = ChessSquareButton(file_char, i, -1, is_label=True)
-            label_btn.clicked.connect(self.on_board_element_click)
-            grid_layout.addWidget(label_btn, 0, i + 1)
-        for r, rank_char in enumerate(ranks):
-            rank_label_btn = ChessSquareButton(rank_char, -1, r, is_label=True)
-            rank_label_btn.clicked.connect(self.on_board_element_click)
-            grid_layout.addWidget(rank_label_btn, r + 1, 0)
-            for f, file_char in enumerate(files):
-                square_name = file_char + rank_char
-                square_btn = ChessSquareButton(square_name, f, r)
-                square_btn.clicked.connect(self.on_board_element_click)
-                grid_layout.addWidget(square_btn, r + 1, f + 1)
-        layout.addWidget(board_grid_widget, 2)
+        self.board_widget = ChessBoardWidget(show_labels=True)
+        self.board_widget.element_clicked.connect(self.on_board_element_click)
+        layout.addWidget(self.board_widget, 2)
 
         # --- Info Box ---
         self.info_box = QGroupBox("Selected Element Info")
@@ -146,24 +295,22 @@ class BoardTabWidget(QWidget):
         self.current_selected_x = -1 # File index (0-7 for A-H)
         self.current_selected_y = -1 # Rank index from top (0 for '8', 7 for '1')
         
-        self.update_board_info_box() 
+        # Live gripper marker on the board, from POS/SPOS telemetry
+        self.live_position = LivePositionFeed(self.serial_handler, self.config_values, board_widget=self.board_widget, parent=self)
 
-        if self.serial_handler:
-            self.serial_handler.data_received.connect(self.parse_esp32_response)
+        self.update_board_info_box() 
 
-    def on_board_element_click(self):
-        # ... (same as before) ...
-        sender = self.sender()
-        self.current_selected_square_text = sender.text()
-        self.current_selected_is_label = sender.is_label
-        self.current_selected_x = sender.x
-        self.current_selected_y = sender.y
+    def on_board_element_click(self, text, x, y, is_label):
+        self.current_selected_square_text = text
+        self.current_selected_is_label = is_label
+        self.current_selected_x = x
+        self.current_selected_y = y
         self.update_board_info_box()
-        if not sender.is_label:
+        if not is_label:
             self.get_esp_target_for_square()
 
     def update_board_info_box(self):
-  
+        self.live_position.apply() # Targets may have changed
         orb_targets = self.config_values.get("orbTargets", [0]*8)
         cart_targets = self.config_values.get("cartTargets", [0]*8)
 
@@ -263,23 +410,6 @@ class BoardTabWidget(QWidget):
         if self.current_selected_square_text and not self.current_selected_is_label:
             self.serial_handler.send_command(f"getsquarepos {self.current_selected_square_text.lower()}")
 
-    def parse_esp32_response(self, line):
-        return
-        #print(f"BoardTab received: {line}") 
-        if line.startswith("SQPOS:"):
-            try:
-                json_data = json.loads(line[6:])
-                square = json_data.get("square", "??").upper() 
-                orb_val = json_data.get("orb", "N/A")
-                cart_val = json_data.get("cart", "N/A")
-
-             
-                if self.current_selected_square_text == square and not self.current_selected_is_label:
-                    self.selected_square_info_orb_val.setText(str(orb_val))
-                    self.selected_square_info_cart_val.setText(str(cart_val))
-                    print(f"Updated info box for {square} from ESP32 response.")
-            except json.JSONDecodeError:
-                print(f"BoardTab: Error decoding SQPOS JSON: {line}")
    
         
 def load_fields_from_config(self):
@@ -1,12 +1,24 @@
 from PyQt5.QtWidgets import (QWidget, QHBoxLayout, QVBoxLayout, QGridLayout, QLabel, QLineEdit,
                              QPushButton, QFrame, QGroupBox, QMessageBox, QSizePolicy)
-from PyQt5.QtGui import QFont, QPainter, QColor, QPen, QBrush
-from PyQt5.QtCore import Qt, QRectF, pyqtSignal
+from PyQt5.QtGui import QFont, QPainter, QColor, QPen, QBrush, QPainterPath, QPixmap
+from PyQt5.QtCore import Qt, QRectF, QTimer, pyqtSignal
+import bisect
 import math
-import json
+from ui.dialogs import report_config_push
+from ui.live_position import LivePositionFeed
+from utils import motion_planner
+from utils.message_bus import Pos, parse_line
+from utils.motion_estimator import GripperState
 
 class CircularCaptureWidget(QWidget):
+    """
+    The 32 capture slots as a wheel (slot 1 starts at 3 o'clock, counter-clockwise).
+    The wheel itself is rendered once per widget size into a pixmap; only the hovered
+    and selected slices are painted over it.
+    """
     slot_clicked = pyqtSignal(int)
+    PADDING = 10
+
     def __init__(self, parent=None):
         super().__init__(parent)
         self.num_slots = 32
@@ -14,57 +26,130 @@ class CircularCaptureWidget(QWidget):
         self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
         self.selected_slot = -1
         self.hovered_slot = -1
+        self.live_slot = None # Fractional slot index (0 = slot 1) under the gripper, see set_live_slot()
+        self.slot_colors = {} # Slot number -> QColor, see set_slot_colors()
         self.setMouseTracking(True)
+        angle_step = 360.0 / self.num_slots
+        self._slot_start_angles = [i * angle_step for i in range(self.num_slots)] # For bisect hit-testing
+        self._slot_label_dirs = [(math.cos(math.radians((i + 0.5) * angle_step)), -math.sin(math.radians((i + 0.5) * angle_step)))
+                                 for i in range(self.num_slots)]
+        self._cached_size = None # Size the geometry and pixmap below were built for
+        self._background = None
+        self._slot_paths = []
+        self._slot_label_rects = []
+
+    # --- Cached geometry and static layer ---
+    def _wheel_rect(self):
+        rect = self.rect(); diameter = min(rect.width(), rect.height()) - 2 * self.PADDING
+        return QRectF((rect.width() - diameter) / 2, (rect.height() - diameter) / 2, diameter, diameter)
+
+    def _ensure_cache(self):
+        if self._cached_size == self.size():
+            return self._background is not None
+        self._cached_size = self.size()
+        self._background = None
+        ellipse_rect = self._wheel_rect()
+        if ellipse_rect.width() <= 0:
+            return False
+        center = ellipse_rect.center(); text_radius = ellipse_rect.width() / 2 * 0.75
+        angle_step = 360.0 / self.num_slots
+        self._slot_paths = []
+        self._slot_label_rects = []
+        for i, (dir_x, dir_y) in enumerate(self._slot_label_dirs):
+            path = QPainterPath(center)
+            path.arcTo(ellipse_rect, i * angle_step, angle_step)
+            path.closeSubpath()
+            self._slot_paths.append(path)
+            text_x = center.x() + text_radius * dir_x; text_y = center.y() + text_radius * dir_y
+            self._slot_label_rects.append(QRectF(text_x - 10, text_y - 7, 20, 14))
+
+        ratio = self.devicePixelRatioF()
+        self._background = QPixmap(int(self.width() * ratio), int(self.height() * ratio))
+        self._background.setDevicePixelRatio(ratio)
+        self._background.fill(Qt.transparent)
+        painter = QPainter(self._background); painter.setRenderHint(QPainter.Antialiasing)
+        painter.setPen(QPen(Qt.darkGray, 1)); painter.setBrush(QBrush(QColor("#ecf0f1")))
+        for path in self._slot_paths:
+            painter.drawPath(path)
+        painter.setPen(Qt.black); painter.setFont(QFont("Arial", 8))
+        for i, text_rect in enumerate(self._slot_label_rects):
+            painter.drawText(text_rect, Qt.AlignCenter, str(i + 1))
+        painter.setBrush(Qt.NoBrush); painter.setPen(QPen(Qt.black, 2)); painter.drawEllipse(ellipse_rect)
+        painter.end()
+        return True
 
     def paintEvent(self, event):
+        if not self._ensure_cache():
+            return
+        painter = QPainter(self)
+        painter.drawPixmap(0, 0, self._background)
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setFont(QFont("Arial", 8))
+        highlighted = list(self.slot_colors.items()) + [(self.selected_slot, "#3498db")]
+        if self.hovered_slot != self.selected_slot:
+            highlighted.append((self.hovered_slot, "#bdc3c7"))
+        for slot_number, color in highlighted:
+            if 1 <= slot_number <= self.num_slots:
+                painter.setPen(QPen(Qt.darkGray, 1)); painter.setBrush(QBrush(QColor(color)))
+                painter.drawPath(self._slot_paths[slot_number - 1])
+                painter.setPen(Qt.black)
+                painter.drawText(self._slot_label_rects[slot_number - 1], Qt.AlignCenter, str(slot_number))
+        painter.setBrush(Qt.NoBrush); painter.setPen(QPen(Qt.black, 2)); painter.drawEllipse(self._wheel_rect()) # Outline over the slices
+        if self.live_slot is not None:
+            painter.setPen(QPen(QColor("#e74c3c"), 2)); painter.setBrush(QColor(231, 76, 60, 120))
+            painter.drawEllipse(self._live_marker_rect(self.live_slot))
+
+    def _live_marker_rect(self, slot_index):
+        ellipse_rect = self._wheel_rect(); center = ellipse_rect.center()
+        angle = math.radians((slot_index + 0.5) * 360.0 / self.num_slots)
+        marker_radius = ellipse_rect.width() / 2 * 0.9; size = max(6.0, ellipse_rect.width() * 0.03)
+        x = center.x() + marker_radius * math.cos(angle); y = center.y() - marker_radius * math.sin(angle)
+        return QRectF(x - size / 2, y - size / 2, size, size)
+
+    def set_live_slot(self, slot_index):
+        """Moves the gripper marker to a fractional slot index (0 = slot 1), or hides it with None."""
+        if slot_index == self.live_slot:
+            return
+        for index in (self.live_slot, slot_index):
+            if index is not None:
+                self.update(self._live_marker_rect(index).toAlignedRect().adjusted(-3, -3, 3, 3))
+        self.live_slot = slot_index
 
-        painter = QPainter(self); painter.setRenderHint(QPainter.Antialiasing)
-        rect = self.rect(); side = min(rect.width(), rect.height()); padding = 10
-        diameter = side - 2 * padding
-        if diameter <= 0: return
-        ellipse_rect = QRectF((rect.width() - diameter) / 2, (rect.height() - diameter) / 2, diameter, diameter)
-        center = ellipse_rect.center(); radius = diameter / 2
-        angle_step = 360.0 / self.num_slots
-        for i in range(self.num_slots):
-            slot_number = i + 1; start_angle = i * angle_step
-            painter.setPen(QPen(Qt.darkGray, 1))
-            if slot_number == self.selected_slot: painter.setBrush(QBrush(QColor("#3498db")))
-            elif slot_number == self.hovered_slot: painter.setBrush(QBrush(QColor("#bdc3c7")))
-            else: painter.setBrush(QBrush(QColor("#ecf0f1")))
-            painter.drawPie(ellipse_rect, int(start_angle * 16), int(angle_step * 16))
-            text_angle_rad = math.radians(start_angle + angle_step / 2)
-            text_radius = radius * 0.75
-            text_x = center.x() + text_radius * math.cos(text_angle_rad)
-            text_y = center.y() - text_radius * math.sin(text_angle_rad)
-            painter.setPen(Qt.black); painter.setFont(QFont("Arial", 8))
-            text_rect = QRectF(text_x - 10, text_y - 7, 20, 14)
-            painter.drawText(text_rect, Qt.AlignCenter, str(slot_number))
-        painter.setBrush(Qt.NoBrush); painter.setPen(QPen(Qt.black, 2)); painter.drawEllipse(ellipse_rect)
+    def set_slot_colors(self, slot_colors):
+        """Fills slices, {slot number: QColor}; {} clears."""
+        self.slot_colors = dict(slot_colors)
+        self.update()
+
+    def _update_slot(self, slot_number):
+        """Schedules a repaint of one slice only."""
+        if 1 <= slot_number <= self.num_slots and self._ensure_cache():
+            self.update(self._slot_paths[slot_number - 1].boundingRect().toAlignedRect().adjusted(-2, -2, 2, 2))
 
     def mousePressEvent(self, event): 
         slot = self._get_slot_at_pos(event.pos())
-        if slot != -1: self.selected_slot = slot; self.slot_clicked.emit(slot); self.update()
+        if slot != -1: self.update_selected_slot_display(slot); self.slot_clicked.emit(slot)
 
     def mouseMoveEvent(self, event): 
         slot = self._get_slot_at_pos(event.pos())
-        if slot != self.hovered_slot: self.hovered_slot = slot; self.update()
+        if slot != self.hovered_slot:
+            self._update_slot(self.hovered_slot); self.hovered_slot = slot; self._update_slot(slot)
 
     def leaveEvent(self, event):
-        self.hovered_slot = -1; self.update()
+        self._update_slot(self.hovered_slot); self.hovered_slot = -1
 
     def _get_slot_at_pos(self, pos): 
-        rect = self.rect(); side = min(rect.width(), rect.height()); padding = 10; diameter = side - 2 * padding
+        rect = self.rect(); diameter = min(rect.width(), rect.height()) - 2 * self.PADDING
         if diameter <= 0: return -1
-        center_x = rect.width()/2; center_y = rect.height()/2; radius = diameter / 2
-        dx = pos.x() - center_x; dy = pos.y() - center_y
-        dist = math.sqrt(dx*dx + dy*dy)
-        if dist > radius or dist < radius * 0.1: return -1
-        angle_deg = math.degrees(math.atan2(-dy, dx));
-        if angle_deg < 0: angle_deg += 360
-        return math.floor(angle_deg / (360.0 / self.num_slots)) + 1
+        radius = diameter / 2
+        dx = pos.x() - rect.width() / 2; dy = pos.y() - rect.height() / 2
+        dist_sq = dx * dx + dy * dy
+        if dist_sq > radius * radius or dist_sq < (radius * 0.1) ** 2: return -1
+        angle_deg = math.degrees(math.atan2(-dy, dx)) % 360.0
+        return bisect.bisect_right(self._slot_start_angles, angle_deg)
 
     def update_selected_slot_display(self, slot_number):
-        self.selected_slot = slot_number; self.update()
+        if slot_number != self.selected_slot:
+            self._update_slot(self.selected_slot); self.selected_slot = slot_number; self._update_slot(slot_number)
 
 
 class CaptureTabWidget(QWidget):
@@ -147,17 +232,17 @@ class CaptureTabWidget(QWidget):
         main_layout.addWidget(self.info_box, 1)
 
         self.current_selected_slot_number = -1
+        # Live gripper marker on the wheel, from POS/SPOS telemetry
+        self.live_position = LivePositionFeed(self.serial_handler, self.config_values, capture_widget=self.circular_capture_widget, parent=self)
         self.load_fields_from_config() # Load initial values
 
-        if self.serial_handler:
-            self.serial_handler.data_received.connect(self.parse_esp32_response)
-
     def load_fields_from_config(self):
         print(f"CaptureTab: Loading fields from config.")
         self.cart_capture_pos_val.setText(str(self.config_values.get("CART_CAPTURE_POS", 0)))
         self.gripper_rot_capture_val.setText(str(self.config_values.get("GRIPPER_ROT_CAPTURE", 0)))
         # Re-trigger info display for the currently selected slot
         self.on_capture_slot_click(self.current_selected_slot_number)
+        self.live_position.apply() # Targets may have changed
 
     def on_capture_slot_click(self, slot_number):
         if slot_number == -1: # Deselect
@@ -201,10 +286,8 @@ class CaptureTabWidget(QWidget):
             self.config_values["GRIPPER_ROT_CAPTURE"] = rot_angle
             
             # Send updates to ESP32
-            self.serial_handler.send_command(f"setconfig cart_capture_pos {cart_pos}")
-            self.serial_handler.send_command(f"setconfig gripper_rot_capture {rot_angle}")
-
-            QMessageBox.information(self, "Update", "Dropoff settings updated .")
+            push = self.serial_handler.push_config(self.config_values, ["CART_CAPTURE_POS", "GRIPPER_ROT_CAPTURE"])
+            report_config_push(self, push, "Dropoff settings")
         except ValueError:
             QMessageBox.warning(self, "Input Error", "Invalid number for dropoff settings.")
 
@@ -239,28 +322,39 @@ class CaptureTabWidget(QWidget):
             QMessageBox.warning(self, "Input Error", "Dropoff position/angle are not valid numbers.")
             return
 
-        # Order: Cart -> Capture -> Rotate
-        self.serial_handler.send_command(f"gotocart {cart_pos}")
-        
+        capt_pos = None
         if move_capture_stepper and self.current_selected_slot_number != -1:
             slot_pos_str = self.slot_pos_val.text()
             if slot_pos_str.isdigit():
-                self.serial_handler.send_command(f"gotocapt {slot_pos_str}")
+                capt_pos = int(slot_pos_str)
             else:
                 QMessageBox.warning(self, "Go To Error", "Slot position input is invalid.")
                 return # Stop sequence if slot pos is bad
-        
-        self.serial_handler.send_command(f"servorot {rot_angle}")
-
-    def parse_esp32_response(self, line):
-        return
-        if line.startswith("CAPTPOS:"):
-            try:
-                json_data = json.loads(line[8:])
-                slot = json_data.get("slot", -1)
-                capt_val = json_data.get("capture", "N/A")
-                if self.current_selected_slot_number == slot:
-                    self.slot_pos_val.setText(str(capt_val))
-                    print(f"Updated info box for Capture Slot {slot} from ESP32.")
-            except json.JSONDecodeError:
-                print(f"CaptureTab: Error decoding CAPTPOS JSON: {line}")
\ No newline at end of file
+
+        if not self.serial_handler.is_connected():
+            QMessageBox.warning(self, "Serial Error", "Not connected to ESP32.")
+            return
+        # Cart, capture and rotation overlap where the safety rules allow: planned from the
+        # current positions and checked in the simulator before anything is sent
+        self.serial_handler.send_command_async("getallpos").add_done_callback(
+            lambda future: self.send_dropoff_plan(future, cart_pos, rot_angle, capt_pos))
+
+    def send_dropoff_plan(self, future, cart_pos, rot_angle, capt_pos):
+        pos = parse_line(future.reply) if future.ok else None
+        if not isinstance(pos, Pos):
+            QMessageBox.warning(self, "Go To Error", f"Could not read the current positions: {future.error or future.reply}")
+            return
+        state = motion_planner.state_from_positions(vars(pos))
+        target = GripperState(state.orb, cart_pos, state.capt if capt_pos is None else capt_pos, rot_angle)
+        try:
+            plan = motion_planner.MotionPlanner(self.config_values).plan_to(state, target)
+        except ValueError as e:
+            QMessageBox.warning(self, "Go To Error", str(e))
+            return
+        result = motion_planner.check_and_send(plan, self.config_values, self.serial_handler.send_command_async,
+                                               lambda seconds, callback: QTimer.singleShot(int(seconds * 1000), callback))
+        if not result.ok():
+            QMessageBox.critical(self, "Go To Error", "The planned move breaks a safety rule in the simulator, nothing was sent:\n"
+                                 + "\n".join(text for _, text in result.violations))
+            return
+        print(f"CaptureTab: Planned move to the capture zone ({plan.finish_s:.2f} s):\n{plan.describe()}")
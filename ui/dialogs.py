@@ -2,6 +2,19 @@ from PyQt5.QtWidgets import QDialog, QVBoxLayout, QHBoxLayout, QTextEdit, QPushB
 from PyQt5.QtGui import QFont
 from PyQt5.QtCore import Qt
 
+
+def report_config_push(parent, future, what):
+    """Shows the outcome of SerialHandler.push_config() once the ESP32 has answered."""
+    def on_done(f):
+        if f.rejected or not f.ok:
+            rejected = ", ".join(f.rejected) if f.rejected else f.error
+            QMessageBox.warning(parent, "ESP32 Config Error", f"{what} updated in app, but the ESP32 did not accept:\n{rejected}")
+        elif f.applied:
+            QMessageBox.information(parent, "Success", f"{what} updated (ESP32 acknowledged {len(f.applied)} value(s)).")
+        else:
+            QMessageBox.information(parent, "Success", f"{what} updated ({f.reply}).")
+    future.add_done_callback(on_done)
+
 class ConfigOutputDialog(QDialog):
     def __init__(self, text_content, parent=None):
         super().__init__(parent)
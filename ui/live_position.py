@@ -0,0 +1,69 @@
+from PyQt5.QtCore import QObject, QTimer
+from PyQt5.QtGui import QGuiApplication
+from utils.geometry import board_cell_position, capture_slot_position
+from utils.message_bus import Pos, SPos
+
+DEFAULT_REFRESH_HZ = 60
+
+
+def frame_interval_ms():
+    """One display frame, from the primary screen's refresh rate."""
+    screen = QGuiApplication.primaryScreen()
+    refresh_hz = screen.refreshRate() if screen is not None else 0
+    return max(1, int(1000 / (refresh_hz if refresh_hz > 0 else DEFAULT_REFRESH_HZ)))
+
+
+class LivePositionFeed(QObject):
+    """
+    Shows the gripper's live position on a ChessBoardWidget and/or CircularCaptureWidget.
+    POS/SPOS telemetry only records the latest stepper positions; the widgets are updated
+    at most once per display frame, however fast the telemetry arrives.
+    """
+    STEPPER_FIELDS = {"cart": "cart_pos", "orb": "orb_pos", "capt": "capt_pos"} # SPOS id -> attribute
+
+    def __init__(self, serial_handler, config_values, board_widget=None, capture_widget=None, parent=None):
+        super().__init__(parent)
+        self.config_values = config_values
+        self.board_widget = board_widget
+        self.capture_widget = capture_widget
+        self.cart_pos = self.orb_pos = self.capt_pos = None
+
+        self.frame_timer = QTimer(self)
+        self.frame_timer.setSingleShot(True)
+        self.frame_timer.setInterval(frame_interval_ms())
+        self.frame_timer.timeout.connect(self.apply)
+
+        serial_handler.message_bus.subscribe(Pos, self.on_pos_message)
+        serial_handler.message_bus.subscribe(SPos, self.on_spos_message)
+        serial_handler.connection_status_changed.connect(self.handle_connection_change)
+
+    def on_pos_message(self, pos):
+        for field in ("cart_pos", "orb_pos", "capt_pos"):
+            value = getattr(pos, field)
+            if value is not None:
+                setattr(self, field, value)
+        self._schedule()
+
+    def on_spos_message(self, spos):
+        field = self.STEPPER_FIELDS.get(spos.stepper_id)
+        if field:
+            setattr(self, field, spos.position)
+            self._schedule()
+
+    def handle_connection_change(self, connected, port_name):
+        if not connected:
+            self.cart_pos = self.orb_pos = self.capt_pos = None
+            self._schedule()
+
+    def _schedule(self):
+        if not self.frame_timer.isActive():
+            self.frame_timer.start()
+
+    def apply(self):
+        """Pushes the latest positions to the widgets (also call it after the targets change)."""
+        if self.board_widget is not None:
+            self.board_widget.set_live_position(*board_cell_position(
+                self.orb_pos, self.cart_pos, self.config_values.get("orbTargets", []), self.config_values.get("cartTargets", [])))
+        if self.capture_widget is not None:
+            self.capture_widget.set_live_slot(
+                capture_slot_position(self.capt_pos, self.config_values.get("captureTargets", [])))
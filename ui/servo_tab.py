@@ -2,8 +2,8 @@
 from PyQt5.QtWidgets import (QWidget, QHBoxLayout, QVBoxLayout, QGridLayout, QLabel, QLineEdit,
                              QPushButton, QGroupBox, QMessageBox, QSlider, QSizePolicy, QScrollArea)
 from PyQt5.QtGui import QFont
-from PyQt5.QtCore import Qt, QTimer
-import json
+from PyQt5.QtCore import Qt
+from ui.dialogs import report_config_push
 
 
 class ServoControlWidget(QGroupBox):
@@ -80,6 +80,7 @@ class ServoControlWidget(QGroupBox):
         if self.parent_tab_widget: self.parent_tab_widget.request_all_positions_from_tab()
     def update_current_angle_display(self, angle):
         self.current_angle_display.setText(str(angle))
+        if angle == "N/A": return # Disconnected, keep the last target
         if not self.target_angle_input.hasFocus() and not self.angle_slider.isSliderDown():
              self.target_angle_input.setText(str(angle)); self.angle_slider.setValue(int(angle))
 
@@ -152,10 +153,7 @@ class ServoTabWidget(QWidget):
         self.load_fields_from_config()
 
         if self.serial_handler:
-            self.serial_handler.data_received.connect(self.parse_esp32_response)
-            self.angle_update_timer = QTimer(self)
-            self.angle_update_timer.timeout.connect(self.request_all_positions_from_tab)
-            self.serial_handler.connection_status_changed.connect(self.handle_connection_change_for_timer)
+            self.serial_handler.connection_status_changed.connect(self.handle_connection_change)
 
 
     def send_configured_preset_angle(self, config_key, command_prefix):
@@ -184,34 +182,22 @@ class ServoTabWidget(QWidget):
 
     def update_all_servo_configs(self):
         try:
-            for key, line_edit_widget in self.config_fields.items():
-                value = int(line_edit_widget.text())
-                self.config_values[key] = value
-                esp32_key = key.lower()
-                self.serial_handler.send_command(f"setconfig {esp32_key} {value}")
-            QMessageBox.information(self, "Success", "Servo configs updated .")
+            values = {key: int(line_edit_widget.text()) for key, line_edit_widget in self.config_fields.items()}
         except ValueError:
             QMessageBox.warning(self, "Input Error", "Invalid number in a config field.")
+            self.load_fields_from_config()
+            return
+        self.config_values.update(values)
         self.load_fields_from_config()
+        # MANUAL_JOG_SERVO_INCREMENT is app-only; push_config skips keys the firmware doesn't know
+        report_config_push(self, self.serial_handler.push_config(self.config_values, values.keys()), "Servo configs")
 
-    def handle_connection_change_for_timer(self, connected, port_name):
-        if connected:
-            self.angle_update_timer.start(2500)
-            self.request_all_positions_from_tab()
-        else:
-            self.angle_update_timer.stop()
+    def handle_connection_change(self, connected, port_name):
+        # Polling itself is owned by the serial handler's telemetry poller
+        if not connected:
             self.rotation_servo_control.update_current_angle_display("N/A")
             self.gripper_servo_control.update_current_angle_display("N/A")
 
     def request_all_positions_from_tab(self):
-        if self.serial_handler.is_connected():
-            self.serial_handler.send_command("getallpos")
-
-    def parse_esp32_response(self, line):
-        return
-        if line.startswith("POS:"):
-            try:
-                json_data = json.loads(line[4:])
-                if "rotServo" in json_data: self.rotation_servo_control.update_current_angle_display(json_data["rotServo"])
-                if "gripServo" in json_data: self.gripper_servo_control.update_current_angle_display(json_data["gripServo"])
-            except (json.JSONDecodeError, ValueError) as e: print(f"ServoTab: Error parsing POS JSON: {line} - {e}")
\ No newline at end of file
+        self.serial_handler.telemetry_poller.request_now()
+
@@ -1,11 +1,14 @@
 # --- START OF FILE esp32_config_tool/ui/stepper_tab.py ---
 from PyQt5.QtWidgets import (QWidget, QHBoxLayout, QVBoxLayout, QGridLayout, QLabel, QLineEdit,
-                             QPushButton, QGroupBox, QMessageBox, QSizePolicy, QScrollArea)
+                             QPushButton, QGroupBox, QMessageBox, QSizePolicy, QScrollArea, QSpinBox,
+                             QPlainTextEdit)
 from PyQt5.QtGui import QFont
 from PyQt5.QtCore import Qt, QTimer
-import json
 # Import the defaults to use them safely
 from utils.config_parser import DEFAULT_CONFIG_VALUES
+from ui.dialogs import report_config_push
+from utils.message_bus import Pos, SPos, Ack
+from utils import speed_tuner
 
 class StepperControlWidget(QGroupBox):
     # This class from the previous answer is correct and needs no changes.
@@ -137,15 +140,47 @@ class StepperTabWidget(QWidget):
         self.update_stepper_configs_button = QPushButton("Update All Stepper Configs (App & ESP32)")
         self.update_stepper_configs_button.clicked.connect(self.update_all_stepper_configs)
         main_layout.addWidget(self.update_stepper_configs_button, 0, Qt.AlignLeft)
+
+        # --- Speed/acceleration auto-tune ---
+        tune_group = QGroupBox("Auto-Tune Speed && Acceleration")
+        tune_layout = QVBoxLayout(tune_group)
+        tune_help = QLabel("Tries speed/acceleration pairs, fastest first, on all three axes between their outermost "
+                           "targets, and re-homes each axis with 'homecheck' to catch lost steps. The fastest pair "
+                           "that loses no steps becomes the Default Max Speed/Acceleration. Keep the robot clear while it runs.")
+        tune_help.setWordWrap(True)
+        tune_layout.addWidget(tune_help)
+        tune_grid = QGridLayout()
+        self.tune_speeds_input = QLineEdit(", ".join(map(str, speed_tuner.TUNE_SPEEDS)))
+        self.tune_accels_input = QLineEdit(", ".join(map(str, speed_tuner.TUNE_ACCELS)))
+        self.tune_cycles_spin = QSpinBox()
+        self.tune_cycles_spin.setRange(1, 20)
+        self.tune_cycles_spin.setValue(speed_tuner.TUNE_CYCLES)
+        tune_grid.addWidget(QLabel("Speeds to try:"), 0, 0)
+        tune_grid.addWidget(self.tune_speeds_input, 0, 1)
+        tune_grid.addWidget(QLabel("Accelerations to try:"), 1, 0)
+        tune_grid.addWidget(self.tune_accels_input, 1, 1)
+        tune_grid.addWidget(QLabel("Round trips per axis:"), 2, 0)
+        tune_grid.addWidget(self.tune_cycles_spin, 2, 1, Qt.AlignLeft)
+        tune_layout.addLayout(tune_grid)
+        self.tune_button = QPushButton("Start Auto-Tune")
+        self.tune_button.clicked.connect(self.toggle_auto_tune)
+        tune_layout.addWidget(self.tune_button, 0, Qt.AlignLeft)
+        self.tune_status_label = QLabel("Idle.")
+        tune_layout.addWidget(self.tune_status_label)
+        self.tune_log = QPlainTextEdit()
+        self.tune_log.setReadOnly(True)
+        self.tune_log.setFont(QFont("Courier", 9))
+        self.tune_log.setMinimumHeight(150)
+        tune_layout.addWidget(self.tune_log)
+        main_layout.addWidget(tune_group)
+        self.tuner = None
         main_layout.addStretch()
 
         if self.serial_handler:
-            self.serial_handler.data_received.connect(self.parse_esp32_response)
-            self.pos_update_timer = QTimer(self)
-            self.pos_update_timer.timeout.connect(self.request_all_positions)
-            self.serial_handler.connection_status_changed.connect(self.handle_connection_change_for_timer)
-            if self.serial_handler.is_connected():
-                self.handle_connection_change_for_timer(True, "") # Manually trigger once if already connected
+            self.serial_handler.message_bus.subscribe(Pos, self.on_pos_message)
+            self.serial_handler.message_bus.subscribe(SPos, self.on_spos_message)
+            self.serial_handler.message_bus.subscribe(Ack, self.on_ack_message)
+            self.serial_handler.connection_status_changed.connect(self.handle_connection_change)
 
 
     def add_config_row(self, layout, label_text, config_key, row_idx):
@@ -167,47 +202,85 @@ class StepperTabWidget(QWidget):
 
     def update_all_stepper_configs(self):
         try:
-            for key, line_edit_widget in self.config_fields.items():
-                value = int(line_edit_widget.text())
-                self.config_values[key] = value
-                esp32_key = key.lower()
-                self.serial_handler.send_command(f"setconfig {esp32_key} {value}")
-            QMessageBox.information(self, "Success", "Stepper configs updated .")
+            values = {key: int(line_edit_widget.text()) for key, line_edit_widget in self.config_fields.items()}
         except ValueError:
             QMessageBox.warning(self, "Input Error", "Invalid number in one of the config fields.")
+            self.load_fields_from_config()
+            return
+        self.config_values.update(values)
         self.load_fields_from_config()
+        # Only the values the ESP32 doesn't already have are sent, in a single batch
+        report_config_push(self, self.serial_handler.push_config(self.config_values, values.keys()), "Stepper configs")
 
-    def handle_connection_change_for_timer(self, connected, port_name):
-        if connected:
-            self.pos_update_timer.start(2000)
-            self.request_all_positions()
-        else:
-            self.pos_update_timer.stop()
+    # --- Auto-tune ---
+    def toggle_auto_tune(self):
+        if self.tuner is not None and self.tuner.running:
+            self.tuner.stop()
+            self.tune_button.setEnabled(False) # Until the command in progress finishes
+            self.tune_status_label.setText("Stopping...")
+            return
+        if not self.serial_handler.is_connected():
+            QMessageBox.warning(self, "Serial Error", "Not connected to ESP32.")
+            return
+        try:
+            speeds = tuple(int(v) for v in self.tune_speeds_input.text().split(","))
+            accels = tuple(int(v) for v in self.tune_accels_input.text().split(","))
+        except ValueError:
+            QMessageBox.warning(self, "Input Error", "Speeds and accelerations must be comma-separated numbers.")
+            return
+        reply = QMessageBox.question(self, "Auto-Tune",
+                                     "All three steppers will move over their full calibrated range and re-home "
+                                     "repeatedly. Make sure nothing is in the way.\n\nStart?",
+                                     QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
+        if reply != QMessageBox.Yes:
+            return
+        self.tuner = speed_tuner.SpeedTuner(
+            self.serial_handler.send_command_async,
+            lambda values: self.serial_handler.push_config(values, values.keys()),
+            lambda seconds, callback: QTimer.singleShot(int(seconds * 1000), callback),
+            self.config_values, speeds, accels, self.tune_cycles_spin.value())
+        self.tune_log.clear()
+        self.tune_button.setText("Stop Auto-Tune")
+        self.tuner.start(self.on_auto_tune_progress, self.on_auto_tune_finished)
+
+    def on_auto_tune_progress(self, text):
+        self.tune_status_label.setText(text)
+        self.tune_log.appendPlainText(text)
+
+    def on_auto_tune_finished(self, best, results, reason):
+        self.tune_button.setText("Start Auto-Tune")
+        self.tune_button.setEnabled(True)
+        if best is None:
+            self.tune_status_label.setText(f"Auto-tune finished ({reason}); speed and acceleration unchanged.")
+            return
+        self.config_values["STEPPER_SPEED"] = best.speed
+        self.config_values["STEPPER_ACCEL"] = best.accel
+        self.load_fields_from_config()
+        self.tune_status_label.setText(f"Best: speed {best.speed}, accel {best.accel} ({len(results)} pairs tested).")
+        QMessageBox.information(self, "Auto-Tune",
+                                f"Fastest pair without lost steps:\nSpeed {best.speed}, acceleration {best.accel}.\n\n"
+                                "Saved in the app and on the ESP32.")
+
+    def handle_connection_change(self, connected, port_name):
+        # Polling itself is owned by the serial handler's telemetry poller
+        if not connected:
             self.capture_stepper_control.update_current_position_display("N/A")
             self.cart_stepper_control.update_current_position_display("N/A")
             self.orb_stepper_control.update_current_position_display("N/A")
 
     def request_all_positions(self):
-        if self.serial_handler.is_connected():
-            self.serial_handler.send_command("getallpos")
-
-    def parse_esp32_response(self, line):
-        if line.startswith("POS:"):
-            try:
-                json_data = json.loads(line[4:])
-                if "captPos" in json_data: self.capture_stepper_control.update_current_position_display(json_data["captPos"])
-                if "cartPos" in json_data: self.cart_stepper_control.update_current_position_display(json_data["cartPos"])
-                if "orbPos" in json_data: self.orb_stepper_control.update_current_position_display(json_data["orbPos"])
-            except json.JSONDecodeError: print(f"StepperTab: Error POS JSON: {line}")
-        elif line.startswith("SPOS:"):
-            parts = line.split(" ")
-            if len(parts) == 3:
-                stepper_id_resp, pos_str = parts[1], parts[2]
-                try:
-                    pos = int(pos_str)
-                    if stepper_id_resp == "capt": self.capture_stepper_control.update_current_position_display(pos)
-                    elif stepper_id_resp == "cart": self.cart_stepper_control.update_current_position_display(pos)
-                    elif stepper_id_resp == "orb": self.orb_stepper_control.update_current_position_display(pos)
-                except ValueError: print(f"StepperTab: Error parsing SPOS position: {line}")
-        elif line.startswith("ACK: sethome"):
-            self.request_all_positions()
\ No newline at end of file
+        self.serial_handler.telemetry_poller.request_now()
+
+    def on_pos_message(self, pos):
+        if pos.capt_pos is not None: self.capture_stepper_control.update_current_position_display(pos.capt_pos)
+        if pos.cart_pos is not None: self.cart_stepper_control.update_current_position_display(pos.cart_pos)
+        if pos.orb_pos is not None: self.orb_stepper_control.update_current_position_display(pos.orb_pos)
+
+    def on_spos_message(self, spos):
+        if spos.stepper_id == "capt": self.capture_stepper_control.update_current_position_display(spos.position)
+        elif spos.stepper_id == "cart": self.cart_stepper_control.update_current_position_display(spos.position)
+        elif spos.stepper_id == "orb": self.orb_stepper_control.update_current_position_display(spos.position)
+
+    def on_ack_message(self, ack):
+        if ack.text.startswith("sethome"):
+            self.request_all_positions()
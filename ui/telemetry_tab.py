@@ -0,0 +1,166 @@
+from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QGroupBox,
+                             QComboBox, QCheckBox, QFileDialog, QMessageBox, QSizePolicy)
+from PyQt5.QtGui import QPainter, QColor, QPen, QFont, QPolygonF
+from PyQt5.QtCore import Qt, QTimer, QPointF, QRectF
+from utils.telemetry_recorder import decimate_min_max
+
+PLOT_REFRESH_MS = 100
+TIME_WINDOWS = (("Last 10 s", 10), ("Last 30 s", 30), ("Last 60 s", 60), ("Last 5 min", 300), ("Everything", None))
+
+
+class TelemetryPlotWidget(QWidget):
+    """A painted time-series plot of some recorder channels, decimated to the widget width."""
+
+    MARGIN_LEFT, MARGIN_RIGHT, MARGIN_TOP, MARGIN_BOTTOM = 55, 10, 10, 22
+
+    def __init__(self, channels, parent=None):
+        super().__init__(parent)
+        self.channels = channels # [(channel name, label, color)]
+        self.series = {}         # channel -> [(t, value)] already decimated
+        self.t_range = (0.0, 1.0)
+        self.setMinimumHeight(180)
+        self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
+
+    def set_data(self, recorder, since):
+        buckets = max(1, self.width() - self.MARGIN_LEFT - self.MARGIN_RIGHT)
+        self.series = {}
+        for name, _label, _color in self.channels:
+            times, values = recorder.series(name, since)
+            self.series[name] = decimate_min_max(times, values, buckets)
+        end = recorder.latest_time()
+        self.t_range = ((since if since is not None else 0.0), max(end, (since or 0.0) + 1e-3))
+        self.update()
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), Qt.white)
+        plot = QRectF(self.MARGIN_LEFT, self.MARGIN_TOP, self.width() - self.MARGIN_LEFT - self.MARGIN_RIGHT,
+                      self.height() - self.MARGIN_TOP - self.MARGIN_BOTTOM)
+        if plot.width() <= 0 or plot.height() <= 0:
+            return
+        values = [v for points in self.series.values() for _, v in points]
+        v_min, v_max = (min(values), max(values)) if values else (0, 1)
+        if v_max == v_min:
+            v_min, v_max = v_min - 1, v_max + 1
+        t_min, t_max = self.t_range
+
+        # Axes and labels
+        painter.setPen(QPen(Qt.gray, 1))
+        painter.drawRect(plot)
+        painter.setFont(QFont("Arial", 8))
+        painter.setPen(Qt.black)
+        painter.drawText(QRectF(0, plot.top() - 6, self.MARGIN_LEFT - 4, 12), Qt.AlignRight | Qt.AlignVCenter, str(v_max))
+        painter.drawText(QRectF(0, plot.bottom() - 6, self.MARGIN_LEFT - 4, 12), Qt.AlignRight | Qt.AlignVCenter, str(v_min))
+        painter.drawText(QRectF(plot.left(), plot.bottom() + 4, 80, 14), Qt.AlignLeft, f"{t_min:.1f} s")
+        painter.drawText(QRectF(plot.right() - 80, plot.bottom() + 4, 80, 14), Qt.AlignRight, f"{t_max:.1f} s")
+
+        # Series, with a legend along the top
+        painter.setRenderHint(QPainter.Antialiasing)
+        x_scale = plot.width() / (t_max - t_min)
+        y_scale = plot.height() / (v_max - v_min)
+        legend_x = plot.left() + 6
+        for name, label, color in self.channels:
+            painter.setPen(QPen(QColor(color), 1.5))
+            points = self.series.get(name, [])
+            if points:
+                painter.drawPolyline(QPolygonF([QPointF(plot.left() + (t - t_min) * x_scale, plot.bottom() - (v - v_min) * y_scale)
+                                                for t, v in points]))
+            painter.drawText(QRectF(legend_x, plot.top() + 2, 120, 14), Qt.AlignLeft, label)
+            legend_x += painter.fontMetrics().horizontalAdvance(label) + 16
+
+
+class TelemetryTabWidget(QWidget):
+    def __init__(self, config_values_ref, serial_handler_ref, parent=None):
+        super().__init__(parent)
+        self.config_values = config_values_ref
+        self.serial_handler = serial_handler_ref
+        self.recorder = self.serial_handler.telemetry_recorder
+        self.shown_total = -1 # recorder.total at the last redraw
+
+        main_layout = QVBoxLayout(self)
+
+        # --- Controls ---
+        controls_layout = QHBoxLayout()
+        controls_layout.addWidget(QLabel("Show:"))
+        self.window_combo_box = QComboBox()
+        for label, seconds in TIME_WINDOWS:
+            self.window_combo_box.addItem(label, seconds)
+        self.window_combo_box.currentIndexChanged.connect(self.refresh_plots)
+        controls_layout.addWidget(self.window_combo_box)
+        self.pause_checkbox = QCheckBox("Pause display")
+        controls_layout.addWidget(self.pause_checkbox)
+        controls_layout.addStretch()
+        self.sample_count_label = QLabel("0 samples")
+        controls_layout.addWidget(self.sample_count_label)
+        self.clear_button = QPushButton("Clear")
+        self.clear_button.clicked.connect(self.clear_recording)
+        controls_layout.addWidget(self.clear_button)
+        self.export_csv_button = QPushButton("Export CSV...")
+        self.export_csv_button.clicked.connect(lambda: self.export_recording("csv"))
+        controls_layout.addWidget(self.export_csv_button)
+        self.export_binary_button = QPushButton("Export Binary...")
+        self.export_binary_button.setToolTip("Compact column-wise recording, see utils/telemetry_recorder.load_binary().")
+        self.export_binary_button.clicked.connect(lambda: self.export_recording("bin"))
+        controls_layout.addWidget(self.export_binary_button)
+        main_layout.addLayout(controls_layout)
+
+        # --- Plots ---
+        steppers_group = QGroupBox("Stepper Positions (steps)")
+        steppers_layout = QVBoxLayout(steppers_group)
+        self.stepper_plot = TelemetryPlotWidget([("cart_pos", "Cart", "#2980b9"), ("orb_pos", "Orb", "#c0392b"),
+                                                 ("capt_pos", "Capture", "#27ae60")])
+        steppers_layout.addWidget(self.stepper_plot)
+        main_layout.addWidget(steppers_group, 2)
+
+        servos_group = QGroupBox("Servos (°) and Actuator Sensor")
+        servos_layout = QVBoxLayout(servos_group)
+        self.servo_plot = TelemetryPlotWidget([("rot_servo", "Rotation", "#8e44ad"), ("grip_servo", "Gripper", "#d35400"),
+                                               ("actuator_sensor", "Retracted sensor", "#7f8c8d")])
+        servos_layout.addWidget(self.servo_plot)
+        main_layout.addWidget(servos_group, 1)
+
+        # Redrawn only while the tab is visible and new samples have arrived
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.timeout.connect(self.refresh_if_changed)
+
+    def showEvent(self, event):
+        self.refresh_timer.start(PLOT_REFRESH_MS)
+        self.refresh_plots()
+        super().showEvent(event)
+
+    def hideEvent(self, event):
+        self.refresh_timer.stop()
+        super().hideEvent(event)
+
+    def refresh_if_changed(self):
+        if not self.pause_checkbox.isChecked() and self.recorder.total != self.shown_total:
+            self.refresh_plots()
+
+    def refresh_plots(self):
+        self.shown_total = self.recorder.total
+        seconds = self.window_combo_box.currentData()
+        since = None if seconds is None else max(0.0, self.recorder.latest_time() - seconds)
+        self.stepper_plot.set_data(self.recorder, since)
+        self.servo_plot.set_data(self.recorder, since)
+        self.sample_count_label.setText(f"{self.recorder.count} samples")
+
+    def clear_recording(self):
+        self.recorder.clear()
+        self.refresh_plots()
+
+    def export_recording(self, kind):
+        if self.recorder.count == 0:
+            QMessageBox.information(self, "Export", "Nothing recorded yet.")
+            return
+        file_filter = "CSV Files (*.csv)" if kind == "csv" else "Telemetry Recordings (*.bin)"
+        file_path, _ = QFileDialog.getSaveFileName(self, "Export Telemetry", f"telemetry.{kind}", file_filter)
+        if not file_path:
+            return
+        try:
+            if kind == "csv":
+                self.recorder.export_csv(file_path)
+            else:
+                self.recorder.export_binary(file_path)
+            QMessageBox.information(self, "Export", f"Exported {self.recorder.count} samples to:\n{file_path}")
+        except OSError as e:
+            QMessageBox.critical(self, "Export Error", f"Could not write '{file_path}':\n{e}")
@@ -1,13 +1,17 @@
 
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit,
-                             QPushButton, QGroupBox, QMessageBox, QFormLayout, QGridLayout,
-                             QFrame, QSizePolicy, QScrollArea)
-from PyQt5.QtGui import QFont
-from PyQt5.QtCore import Qt
+                             QPushButton, QGroupBox, QMessageBox, QFormLayout,
+                             QSizePolicy, QScrollArea, QComboBox, QSpinBox,
+                             QPlainTextEdit, QFileDialog, QProgressBar)
+from PyQt5.QtGui import QFont, QColor
+from PyQt5.QtCore import Qt, QTimer
+from utils import capture_planner, motion_planner, move_profiler, move_sequence
+from utils.message_bus import Pos, Progress, parse_line
 
 # Import the visual components from other tabs
-from .board_tab import ChessSquareButton
+from .board_tab import ChessBoardWidget
 from .capture_tab import CircularCaptureWidget
+from .live_position import LivePositionFeed
 
 class TestTabWidget(QWidget):
     def __init__(self, config_values_ref, serial_handler_ref, parent=None):
@@ -19,6 +23,7 @@ class TestTabWidget(QWidget):
         self.selecting_from = True # Start by selecting the 'From' location
         self.from_location_str = ""
         self.to_location_str = ""
+        self.occupied_slots = set() # Capture slots holding a piece, updated as 'do' moves are sent
 
         # --- Main Layout ---
         tab_overall_layout = QVBoxLayout(self)
@@ -39,24 +44,16 @@ class TestTabWidget(QWidget):
 
         # Board Grid for selection
         board_group = QGroupBox("Select from Board")
-        board_grid_widget = QFrame()
-        board_grid_layout = QGridLayout(board_grid_widget)
-        board_grid_layout.setSpacing(1)
-        files = ['A', 'B', 'C', 'D', 'E', 'F', 'G', 'H']
-        ranks = ['8', '7', '6', '5', '4', '3', '2', '1']
-        for r, rank_char in enumerate(ranks):
-            for f, file_char in enumerate(files):
-                square_name = file_char + rank_char
-                square_btn = ChessSquareButton(square_name, f, r)
-                square_btn.clicked.connect(self.on_location_selected)
-                board_grid_layout.addWidget(square_btn, r, f)
-        board_group.setLayout(board_grid_layout)
+        self.board_widget = ChessBoardWidget(show_labels=False)
+        self.board_widget.element_clicked.connect(self.on_square_selected)
+        board_layout = QVBoxLayout(board_group)
+        board_layout.addWidget(self.board_widget)
         selection_area.addWidget(board_group)
 
         # Capture Zone Grid for selection
         capture_group = QGroupBox("Select from Capture Zone")
         self.circular_capture_widget = CircularCaptureWidget()
-        self.circular_capture_widget.slot_clicked.connect(self.on_location_selected)
+        self.circular_capture_widget.slot_clicked.connect(self.on_capture_slot_selected)
         capture_layout = QVBoxLayout(capture_group)
         capture_layout.addWidget(self.circular_capture_widget)
         selection_area.addWidget(capture_group)
@@ -92,30 +89,167 @@ class TestTabWidget(QWidget):
         self.execute_button.clicked.connect(self.send_do_command)
         control_layout.addWidget(self.execute_button)
 
+        self.execute_planned_button = QPushButton("Execute Overlapped")
+        self.execute_planned_button.setToolTip("Plans the move as overlapping goto/servo commands, checks it in the "
+                                               "simulator and sends it instead of a 'do' if it is faster.")
+        self.execute_planned_button.setEnabled(False)
+        self.execute_planned_button.clicked.connect(self.send_planned_move)
+        control_layout.addWidget(self.execute_planned_button)
+
         self.clear_button = QPushButton("Clear Selection")
         self.clear_button.clicked.connect(self.clear_selection)
         control_layout.addWidget(self.clear_button)
 
+        # --- Live progress of 'do'/'take'/'release' (firmware progress events) ---
+        progress_group = QGroupBox("Sequence Progress")
+        progress_layout = QVBoxLayout(progress_group)
+        self.seq_progress_label = QLabel("No sequence running.")
+        self.seq_progress_label.setWordWrap(True)
+        progress_layout.addWidget(self.seq_progress_label)
+        self.seq_progress_bar = QProgressBar()
+        self.seq_progress_bar.setFormat("%v / %m steps")
+        self.seq_progress_bar.setValue(0)
+        progress_layout.addWidget(self.seq_progress_bar)
+        self.seq_progress_log = QPlainTextEdit()
+        self.seq_progress_log.setReadOnly(True)
+        self.seq_progress_log.setMaximumBlockCount(200)
+        self.seq_progress_log.setMaximumHeight(90)
+        progress_layout.addWidget(self.seq_progress_log)
+        self.stop_button = QPushButton("Stop")
+        self.stop_button.setToolTip("Stops the steppers, the actuator and the running sequence at once.")
+        self.stop_button.clicked.connect(self.send_stop)
+        progress_layout.addWidget(self.stop_button)
+        control_layout.addWidget(progress_group)
+        self.serial_handler.message_bus.subscribe(Progress, self.on_progress)
+
+        # --- Capture slot planner ---
+        slot_group = QGroupBox("Capture Slot Planner")
+        slot_layout = QVBoxLayout(slot_group)
+        occupied_layout = QHBoxLayout()
+        occupied_layout.addWidget(QLabel("Occupied:"))
+        self.occupied_slots_input = QLineEdit()
+        self.occupied_slots_input.setPlaceholderText("e.g. 15, 16")
+        self.occupied_slots_input.setToolTip("Slot numbers holding a piece. Kept up to date as moves are sent.")
+        self.occupied_slots_input.editingFinished.connect(self.on_occupied_slots_edited)
+        occupied_layout.addWidget(self.occupied_slots_input)
+        slot_layout.addLayout(occupied_layout)
+        self.pick_slot_button = QPushButton("Nearest Free Slot as 'To'")
+        self.pick_slot_button.clicked.connect(self.pick_nearest_slot)
+        slot_layout.addWidget(self.pick_slot_button)
+        self.pick_slot_label = QLabel("Select 'From' first.")
+        self.pick_slot_label.setWordWrap(True)
+        slot_layout.addWidget(self.pick_slot_label)
+        control_layout.addWidget(slot_group)
+
+        # --- Move sequence runner ---
+        sequence_group = QGroupBox("Run Move Sequence")
+        sequence_layout = QVBoxLayout(sequence_group)
+        self.sequence_input = QPlainTextEdit()
+        self.sequence_input.setPlaceholderText("One move per line (e2 e4, e4 capt16, ...)\nor a game in UCI moves (e2e4 e7e5 ...)")
+        self.sequence_input.setMaximumHeight(90)
+        sequence_layout.addWidget(self.sequence_input)
+        sequence_options_layout = QHBoxLayout()
+        self.sequence_load_button = QPushButton("Load File...")
+        self.sequence_load_button.clicked.connect(self.load_sequence_file)
+        sequence_options_layout.addWidget(self.sequence_load_button)
+        sequence_options_layout.addWidget(QLabel("Passes:"))
+        self.sequence_passes_spin = QSpinBox()
+        self.sequence_passes_spin.setRange(0, 10000)
+        self.sequence_passes_spin.setSpecialValueText("Forever")
+        self.sequence_passes_spin.setValue(1)
+        self.sequence_passes_spin.setToolTip("Repeat the list (soak test). The list must put the pieces back where they started.")
+        sequence_options_layout.addWidget(self.sequence_passes_spin)
+        sequence_layout.addLayout(sequence_options_layout)
+        sequence_buttons_layout = QHBoxLayout()
+        self.sequence_run_button = QPushButton("Run")
+        self.sequence_run_button.clicked.connect(self.run_sequence)
+        sequence_buttons_layout.addWidget(self.sequence_run_button)
+        self.sequence_abort_button = QPushButton("Abort")
+        self.sequence_abort_button.clicked.connect(self.abort_sequence)
+        sequence_buttons_layout.addWidget(self.sequence_abort_button)
+        self.sequence_resume_button = QPushButton("Resume")
+        self.sequence_resume_button.clicked.connect(self.resume_sequence)
+        sequence_buttons_layout.addWidget(self.sequence_resume_button)
+        self.sequence_skip_button = QPushButton("Skip")
+        self.sequence_skip_button.setToolTip("Skip the next move, e.g. one that failed and was finished by hand.")
+        self.sequence_skip_button.clicked.connect(self.skip_sequence_move)
+        sequence_buttons_layout.addWidget(self.sequence_skip_button)
+        sequence_layout.addLayout(sequence_buttons_layout)
+        self.sequence_progress = QProgressBar()
+        sequence_layout.addWidget(self.sequence_progress)
+        self.sequence_status_label = QLabel("Idle.")
+        self.sequence_status_label.setWordWrap(True)
+        sequence_layout.addWidget(self.sequence_status_label)
+        self.sequence_log = QPlainTextEdit()
+        self.sequence_log.setReadOnly(True)
+        self.sequence_log.setFont(QFont("Courier", 9))
+        self.sequence_log.setMaximumBlockCount(1000) # Overnight runs
+        self.sequence_log.setMinimumHeight(120)
+        sequence_layout.addWidget(self.sequence_log)
+        control_layout.addWidget(sequence_group)
+        self.sequence_runner = move_sequence.MoveSequenceRunner(self.serial_handler.send_command_async)
+        self.update_sequence_buttons()
+
+        # --- Move profiler ---
+        profile_group = QGroupBox("Profile Moves")
+        profile_layout = QVBoxLayout(profile_group)
+        self.profile_kind_combo = QComboBox()
+        self.profile_kind_combo.addItem("All 64 squares (tour)", "squares")
+        self.profile_kind_combo.addItem("All 32 capture slots (from d4)", "capture")
+        self.profile_kind_combo.addItem("Random moves", "random")
+        self.profile_kind_combo.currentIndexChanged.connect(
+            lambda: self.profile_count_spin.setEnabled(self.profile_kind_combo.currentData() == "random"))
+        profile_layout.addWidget(self.profile_kind_combo)
+        count_layout = QHBoxLayout()
+        count_layout.addWidget(QLabel("Random moves:"))
+        self.profile_count_spin = QSpinBox()
+        self.profile_count_spin.setRange(1, 1000)
+        self.profile_count_spin.setValue(50)
+        self.profile_count_spin.setEnabled(False)
+        count_layout.addWidget(self.profile_count_spin)
+        profile_layout.addLayout(count_layout)
+        profile_layout.addWidget(QLabel("Carries one piece around, starting and ending on the first square."))
+
+        profile_buttons_layout = QHBoxLayout()
+        self.profile_run_button = QPushButton("Run")
+        self.profile_run_button.clicked.connect(self.toggle_profiling)
+        profile_buttons_layout.addWidget(self.profile_run_button)
+        self.profile_export_button = QPushButton("Export CSV...")
+        self.profile_export_button.setEnabled(False)
+        self.profile_export_button.clicked.connect(self.export_profile)
+        profile_buttons_layout.addWidget(self.profile_export_button)
+        profile_layout.addLayout(profile_buttons_layout)
+        self.profile_status_label = QLabel("Idle.")
+        self.profile_status_label.setWordWrap(True)
+        profile_layout.addWidget(self.profile_status_label)
+        self.profile_report = QPlainTextEdit()
+        self.profile_report.setReadOnly(True)
+        self.profile_report.setFont(QFont("Courier", 9))
+        self.profile_report.setLineWrapMode(QPlainTextEdit.NoWrap)
+        self.profile_report.setMinimumHeight(200)
+        profile_layout.addWidget(self.profile_report)
+        self.clear_heatmap_button = QPushButton("Clear Heatmap")
+        self.clear_heatmap_button.clicked.connect(self.clear_heatmap)
+        profile_layout.addWidget(self.clear_heatmap_button)
+        control_layout.addWidget(profile_group)
+        self.profiler = move_profiler.MoveProfiler(self.serial_handler.send_command_async)
+
         control_layout.addStretch()
         main_layout.addWidget(control_box, 1)
 
-    def on_location_selected(self):
-        location_str = ""
-        sender = self.sender()
+        # Live gripper marker on both views while a move runs
+        self.live_position = LivePositionFeed(self.serial_handler, self.config_values, self.board_widget,
+                                              self.circular_capture_widget, parent=self)
 
-        if isinstance(sender, ChessSquareButton):
-            location_str = sender.text().lower()
-        elif isinstance(sender, CircularCaptureWidget):
-         
-            if isinstance(self.sender(), CircularCaptureWidget):
-                slot_num = self.sender().selected_slot 
-                location_str = f"capt{slot_num}"
-                # Update the visual selection in the widget
-                self.circular_capture_widget.update_selected_slot_display(slot_num)
+    def on_square_selected(self, square_name, x, y, is_label):
+        self.on_location_selected(square_name.lower())
 
-        if not location_str:
-            return
+    def on_capture_slot_selected(self, slot_num):
+        # Update the visual selection in the widget
+        self.circular_capture_widget.update_selected_slot_display(slot_num)
+        self.on_location_selected(f"capt{slot_num}")
 
+    def on_location_selected(self, location_str):
         if self.selecting_from:
             self.from_location_str = location_str
             self.from_display.setText(self.from_location_str)
@@ -124,12 +258,14 @@ class TestTabWidget(QWidget):
             self.instruction_label.setText("2. Select 'To' location...")
             self.selecting_from = False # Switch to selecting 'To'
             self.execute_button.setEnabled(False)
+            self.execute_planned_button.setEnabled(False)
         else: # We are selecting 'To'
             self.to_location_str = location_str
             self.to_display.setText(self.to_location_str)
             self.instruction_label.setText("Ready to execute move.")
             self.selecting_from = True # Next click will be a new 'From'
             self.execute_button.setEnabled(True)
+            self.execute_planned_button.setEnabled(True)
 
     def clear_selection(self):
         self.from_location_str = ""
@@ -139,7 +275,9 @@ class TestTabWidget(QWidget):
         self.selecting_from = True
         self.instruction_label.setText("1. Select 'From' location...")
         self.execute_button.setEnabled(False)
+        self.execute_planned_button.setEnabled(False)
         self.circular_capture_widget.update_selected_slot_display(-1) # Clear visual selection
+        self.board_widget.set_selected(None)
 
     def send_do_command(self):
         if not self.from_location_str or not self.to_location_str:
@@ -149,12 +287,298 @@ class TestTabWidget(QWidget):
         command = f"do {self.from_location_str} {self.to_location_str}"
         
         if self.serial_handler.is_connected():
-            QMessageBox.information(self, "Sending Command", f"Sending: {command}\n\nMonitor ESP32 serial output for progress.")
             self.serial_handler.send_command(command)
+            self.track_capture_slots(self.from_location_str, self.to_location_str)
             # After sending, clear for the next move
             self.clear_selection()
+            self.instruction_label.setText(f"Sent '{command}' (see Sequence Progress).\n1. Select 'From' location...")
+        else:
+            QMessageBox.warning(self, "Serial Error", "Not connected to ESP32.")
+
+    # --- Sequence progress ---
+    def on_progress(self, event):
+        seq = f"'{event.sequence}'"
+        if event.event == "start":
+            self.seq_progress_log.clear()
+            self.seq_progress_bar.setRange(0, event.steps or 0)
+            self.seq_progress_bar.setValue(0)
+            text = f"{seq} started"
+        elif event.event == "state":
+            self.seq_progress_bar.setRange(0, event.steps or 0)
+            self.seq_progress_bar.setValue(event.step - 1)
+            text = f"{event.phase}: {event.state}"
+        elif event.event == "warn":
+            text = f"Warning: {event.message}"
+        elif event.event == "done":
+            self.seq_progress_bar.setValue(self.seq_progress_bar.maximum())
+            text = f"{seq} done"
+        elif event.event == "error":
+            text = f"{seq} failed: {event.message}"
         else:
+            text = f"{seq} {event.event}"
+        elapsed = "" if event.elapsed_ms is None else f"{event.elapsed_ms / 1000.0:.2f} s"
+        self.seq_progress_label.setText(f"{text} ({elapsed})" if elapsed else text)
+        self.seq_progress_log.appendPlainText(f"{elapsed:>8}  {text}")
+
+    def send_stop(self):
+        if not self.serial_handler.send_command("stop"):
+            QMessageBox.warning(self, "Serial Error", "Not connected to ESP32.")
+
+    # --- Overlapped (planned) moves ---
+    def send_planned_move(self):
+        if not self.from_location_str or not self.to_location_str:
+            QMessageBox.warning(self, "Input Error", "Both 'From' and 'To' locations must be selected.")
+            return
+        if not self.serial_handler.is_connected():
+            QMessageBox.warning(self, "Serial Error", "Not connected to ESP32.")
+            return
+        from_loc, to_loc = self.from_location_str, self.to_location_str
+        self.serial_handler.send_command_async("getallpos").add_done_callback(
+            lambda future: self.on_planned_move_positions(future, from_loc, to_loc))
+        self.clear_selection()
+
+    def on_planned_move_positions(self, future, from_loc, to_loc):
+        pos = parse_line(future.reply) if future.ok else None
+        if not isinstance(pos, Pos):
+            QMessageBox.warning(self, "Planned Move", f"Could not read the current positions: {future.error or future.reply}")
+            return
+        planner = motion_planner.MotionPlanner(self.config_values)
+        state = motion_planner.state_from_positions(vars(pos))
+        try:
+            plan = planner.plan_do(from_loc, to_loc, state)
+        except ValueError as e:
+            QMessageBox.warning(self, "Planned Move", str(e))
+            return
+        phases, _ = planner.model.estimate_do(from_loc, to_loc, state)
+        do_s = sum(phases.values())
+        if plan.finish_s >= do_s: # Nothing to gain from overlapping; let the firmware run its own sequence
+            command = f"do {from_loc} {to_loc}"
+            if not self.serial_handler.send_command(command):
+                QMessageBox.warning(self, "Serial Error", "Not connected to ESP32.")
+                return
+            self.track_capture_slots(from_loc, to_loc)
+            self.instruction_label.setText(f"Sent '{command}': the overlapped plan ({plan.finish_s:.2f} s) "
+                                           f"is not faster than a 'do' ({do_s:.2f} s).")
+            return
+        result = motion_planner.check_and_send(plan, self.config_values, self.serial_handler.send_command_async,
+                                               lambda seconds, callback: QTimer.singleShot(int(seconds * 1000), callback))
+        if not result.ok():
+            QMessageBox.critical(self, "Planned Move", "The plan breaks a safety rule in the simulator, nothing was sent:\n"
+                                 + "\n".join(f"{at_s:.2f} s: {text}" for at_s, text in result.violations))
+            return
+        self.track_capture_slots(from_loc, to_loc)
+        self.instruction_label.setText(f"Sent planned {from_loc} -> {to_loc}: {plan.finish_s:.2f} s "
+                                       f"(a 'do' takes {do_s:.2f} s).")
+        print(f"TestTab: Planned {from_loc} -> {to_loc}:\n{plan.describe()}")
+
+    # --- Capture slot planner ---
+    def on_occupied_slots_edited(self):
+        try:
+            slots = capture_planner.parse_slots(self.occupied_slots_input.text())
+        except ValueError:
+            QMessageBox.warning(self, "Input Error", "Occupied slots must be slot numbers separated by commas.")
+            self.show_occupied_slots()
+            return
+        self.occupied_slots = {slot for slot in slots if 1 <= slot <= len(move_profiler.CAPTURE_SLOTS)}
+        self.show_occupied_slots()
+
+    def track_capture_slots(self, from_loc, to_loc):
+        """Updates the occupied slots for a piece moved from from_loc to to_loc."""
+        self.occupied_slots.discard(capture_planner.slot_number(from_loc))
+        if capture_planner.slot_number(to_loc):
+            self.occupied_slots.add(capture_planner.slot_number(to_loc))
+        self.show_occupied_slots()
+
+    def show_occupied_slots(self):
+        self.occupied_slots_input.setText(", ".join(str(slot) for slot in sorted(self.occupied_slots)))
+
+    def pick_nearest_slot(self):
+        """Sets 'To' to the free slot the capture stepper reaches fastest from where 'From' leaves it."""
+        if not self.from_location_str:
+            QMessageBox.warning(self, "Input Error", "Select the 'From' location first.")
+            return
+        occupied = set(self.occupied_slots)
+        source_slot = capture_planner.slot_number(self.from_location_str)
+        if source_slot:
+            occupied.add(source_slot)
+        capt_pos = capture_planner.capture_position_for(self.from_location_str, self.config_values)
+        ranked = capture_planner.rank_free_slots(self.config_values, occupied, capt_pos)
+        if not ranked:
+            QMessageBox.warning(self, "Capture Zone Full", "All capture slots are occupied.")
+            return
+        seconds, slot = ranked[0]
+        self.selecting_from = False # Also replaces a 'To' already chosen
+        self.on_capture_slot_selected(slot)
+        self.pick_slot_label.setText(f"capt{slot}: capture wheel {capt_pos} -> "
+                                     f"{self.config_values['captureTargets'][slot - 1]} steps, {seconds:.2f} s.")
+
+    # --- Move sequence runner ---
+    def load_sequence_file(self):
+        file_path, _ = QFileDialog.getOpenFileName(self, "Load Move List", "", "Move Lists (*.txt *.uci *.pgn);;All Files (*)")
+        if not file_path:
+            return
+        try:
+            with open(file_path, "r") as f:
+                self.sequence_input.setPlainText(f.read())
+        except OSError as e:
+            QMessageBox.critical(self, "Load Error", f"Could not read '{file_path}':\n{e}")
+
+    def run_sequence(self):
+        if not self.serial_handler.is_connected():
+            QMessageBox.warning(self, "Serial Error", "Not connected to ESP32.")
+            return
+        if self.profiler.running:
+            QMessageBox.warning(self, "Busy", "Wait for the move profiler to finish.")
+            return
+        try:
+            moves = move_sequence.parse_move_list(self.sequence_input.toPlainText(),
+                                                  capture_planner.SlotPicker(self.config_values, self.occupied_slots))
+        except ValueError as e:
+            QMessageBox.warning(self, "Move List Error", str(e))
+            return
+        if not moves:
+            QMessageBox.warning(self, "Move List Error", "The move list is empty.")
+            return
+        passes = self.sequence_passes_spin.value()
+        reply = QMessageBox.question(self, "Run Move Sequence",
+                                     f"Set up the pieces for {moves[0][0]} -> {moves[0][1]} and keep the path clear.\n\n"
+                                     f"Run {len(moves)} 'do' moves {'until aborted' if passes == 0 else f'{passes} time(s)'}?",
+                                     QMessageBox.Yes | QMessageBox.No)
+        if reply != QMessageBox.Yes:
+            return
+        self.sequence_runner.load(moves, passes)
+        self.sequence_progress.setRange(0, len(moves))
+        self.sequence_progress.setValue(0)
+        self.sequence_log.clear()
+        self.start_sequence()
+
+    def resume_sequence(self):
+        if not self.serial_handler.is_connected():
             QMessageBox.warning(self, "Serial Error", "Not connected to ESP32.")
+            return
+        if self.profiler.running:
+            QMessageBox.warning(self, "Busy", "Wait for the move profiler to finish.")
+            return
+        self.sequence_log.appendPlainText(f"Resuming at move {self.sequence_runner.index + 1}.")
+        self.start_sequence()
+
+    def start_sequence(self):
+        self.sequence_status_label.setText("Running...")
+        self.sequence_runner.start(self.on_sequence_move_done, self.on_sequence_finished)
+        self.update_sequence_buttons()
+
+    def abort_sequence(self):
+        self.sequence_runner.abort()
+        self.sequence_abort_button.setEnabled(False) # Until the move in progress finishes
+        self.sequence_status_label.setText("Aborting after the current move...")
+
+    def skip_sequence_move(self):
+        runner = self.sequence_runner
+        self.sequence_log.appendPlainText(f"Skipped move {runner.index + 1} ({' -> '.join(runner.moves[runner.index])}).")
+        runner.skip()
+        self.sequence_progress.setValue(runner.index)
+        self.update_sequence_buttons()
+
+    def on_sequence_move_done(self, timing, index, pass_index):
+        runner = self.sequence_runner
+        if timing.ok:
+            self.track_capture_slots(timing.from_loc, timing.to_loc)
+        self.sequence_progress.setValue(index + 1 if timing.ok else index)
+        passes = "∞" if runner.passes == 0 else runner.passes
+        status = f"{timing.total_s:.2f} s" if timing.ok else f"FAILED ({timing.error})"
+        self.sequence_log.appendPlainText(f"[{pass_index + 1}/{passes}] {index + 1}. {timing.from_loc} -> {timing.to_loc}: {status}")
+        self.sequence_status_label.setText(f"Pass {pass_index + 1}/{passes}, move {index + 1}/{len(runner.moves)}. "
+                                           f"{runner.completed} moves done, {runner.failed} failed, "
+                                           f"{runner.total_s / 60:.1f} min of robot time.")
+
+    def on_sequence_finished(self, reason):
+        runner = self.sequence_runner
+        self.sequence_log.appendPlainText(f"Sequence {reason}.")
+        if runner.can_resume():
+            reason += f"; Resume continues with move {runner.index + 1} ({' -> '.join(runner.moves[runner.index])})"
+        self.sequence_status_label.setText(f"Sequence {reason}. {runner.completed} moves done, {runner.failed} failed.")
+        self.update_sequence_buttons()
+
+    def update_sequence_buttons(self):
+        running = self.sequence_runner.running
+        self.sequence_run_button.setEnabled(not running)
+        self.sequence_load_button.setEnabled(not running)
+        self.sequence_abort_button.setEnabled(running)
+        self.sequence_resume_button.setEnabled(self.sequence_runner.can_resume())
+        self.sequence_skip_button.setEnabled(self.sequence_runner.can_resume())
+
+    # --- Move profiler ---
+    def toggle_profiling(self):
+        if self.profiler.running:
+            self.profiler.stop()
+            self.profile_run_button.setEnabled(False) # Until the move in progress finishes
+            self.profile_status_label.setText("Stopping after the current move...")
+            return
+        if not self.serial_handler.is_connected():
+            QMessageBox.warning(self, "Serial Error", "Not connected to ESP32.")
+            return
+        if self.sequence_runner.running:
+            QMessageBox.warning(self, "Busy", "Wait for the move sequence to finish or abort it.")
+            return
+        kind = self.profile_kind_combo.currentData()
+        if kind == "squares":
+            moves = move_profiler.plan_square_tour()
+        elif kind == "capture":
+            moves = move_profiler.plan_capture_tour()
+        else:
+            moves = move_profiler.plan_random_walk(self.profile_count_spin.value())
+        reply = QMessageBox.question(self, "Profile Moves",
+                                     f"Place a piece on {moves[0][0]} and keep the path clear.\n\n"
+                                     f"Run {len(moves)} 'do' moves now?", QMessageBox.Yes | QMessageBox.No)
+        if reply != QMessageBox.Yes:
+            return
+        self.clear_heatmap()
+        self.profile_report.clear()
+        self.profile_run_button.setText("Stop")
+        self.profile_export_button.setEnabled(False)
+        self.profiler.start(moves, self.on_profile_move_done, self.on_profile_finished)
+
+    def on_profile_move_done(self, timing, index, count):
+        status = "OK" if timing.ok else f"FAILED ({timing.error})"
+        self.profile_status_label.setText(f"Move {index + 1}/{count}: {timing.from_loc} -> {timing.to_loc} {status}")
+        self.profile_report.appendPlainText(timing.describe() if timing.ok else f"{timing.from_loc} -> {timing.to_loc}: {status}")
+
+    def on_profile_finished(self, results, reason):
+        self.profile_run_button.setText("Run")
+        self.profile_run_button.setEnabled(True)
+        self.profile_export_button.setEnabled(bool(results))
+        self.profile_status_label.setText(f"Profiling {reason}.")
+        self.profile_report.setPlainText(move_profiler.format_report(results))
+        self.show_heatmap(move_profiler.location_heatmap(results))
+
+    def show_heatmap(self, heat):
+        """Tints every profiled location from green (fastest to reach) to red (slowest)."""
+        if not heat:
+            return
+        lo, hi = min(heat.values()), max(heat.values())
+        square_colors, slot_colors = {}, {}
+        for location, seconds in heat.items():
+            fraction = (seconds - lo) / (hi - lo) if hi > lo else 0.0
+            color = QColor.fromHsvF((1.0 - fraction) / 3.0, 0.8, 0.95, 0.65) # 120° green -> 0° red
+            if location.startswith("capt"):
+                slot_colors[int(location[4:])] = color
+            else:
+                square_colors[("abcdefgh".index(location[0]), 8 - int(location[1]))] = color
+        self.board_widget.set_square_colors(square_colors)
+        self.circular_capture_widget.set_slot_colors(slot_colors)
+
+    def clear_heatmap(self):
+        self.board_widget.set_square_colors({})
+        self.circular_capture_widget.set_slot_colors({})
+
+    def export_profile(self):
+        file_path, _ = QFileDialog.getSaveFileName(self, "Export Move Timings", "move_timings.csv", "CSV Files (*.csv)")
+        if not file_path:
+            return
+        try:
+            move_profiler.export_csv(self.profiler.results, file_path)
+        except OSError as e:
+            QMessageBox.critical(self, "Export Error", f"Could not write '{file_path}':\n{e}")
 
     def parse_esp32_response(self, line):
       
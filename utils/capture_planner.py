@@ -0,0 +1,115 @@
+import argparse
+import sys
+
+from utils.config_parser import DEFAULT_CONFIG_VALUES, layer_config_values, parse_config_file
+from utils.motion_estimator import MotionModel, format_seconds, game_to_do_moves
+from utils.move_profiler import CAPTURE_SLOTS
+
+# --- Capture slot planner ---
+# Picks the free capture slot a piece reaches fastest. captureTargets places the 32 slots
+# around the wheel (slot 16 at 30 steps, slot 17 at 6240: the wheel turns once in about
+# 6400 steps), but the capture stepper homes against an endstop and 'goto' moves in
+# absolute steps, so it never turns through the gap between slots 16 and 17. The cost of
+# a slot is the stepper's travel time from where it is when the 'do' reaches the capture
+# phase. Coming from a board square, that is home: the source move sends the wheel home
+# alongside the cart and orb. The way back costs the same, so ranking by one way is enough.
+#
+#   python -m utils.capture_planner config.h --occupied 15,16 --from e4
+#   python -m utils.capture_planner --game moves.txt   (sequential vs planned slots)
+
+
+def slot_number(location):
+    """'capt7' -> 7, None for board squares."""
+    location = location.lower()
+    return int(location[4:]) if location.startswith("capt") else None
+
+def capture_position_for(from_loc, config_values):
+    """Where the capture stepper is when 'do <from_loc> captN' starts carrying the piece."""
+    slot = slot_number(from_loc) if from_loc else None
+    return 0 if slot is None else config_values["captureTargets"][slot - 1]
+
+def rank_free_slots(config_values, occupied, capt_pos=0):
+    """[(seconds of capture stepper travel, slot number)] for the free slots, fastest first."""
+    model = MotionModel(config_values)
+    ranked = [(model.axis_time(target - capt_pos), slot)
+              for slot, target in enumerate(config_values["captureTargets"], start=1) if slot not in occupied]
+    return sorted(ranked)
+
+def pick_free_slot(config_values, occupied, capt_pos=0):
+    """The free slot number closest in time to capt_pos, None if all slots are taken."""
+    ranked = rank_free_slots(config_values, occupied, capt_pos)
+    return ranked[0][1] if ranked else None
+
+
+class SlotPicker:
+    """
+    game_to_do_moves() slot chooser: gives each captured piece the nearest free slot. Captured
+    pieces are carried off from board squares, so the capture wheel always starts at home.
+    """
+
+    def __init__(self, config_values, occupied=()):
+        self.config_values = config_values
+        self.occupied = set(occupied)
+
+    def __call__(self, from_square):
+        slot = pick_free_slot(self.config_values, self.occupied, capture_position_for(from_square, self.config_values))
+        if slot is None:
+            raise ValueError("All capture slots are occupied")
+        self.occupied.add(slot)
+        return CAPTURE_SLOTS[slot - 1]
+
+
+# --- Command line ---
+def parse_slots(text):
+    return {int(value) for value in text.replace(",", " ").split()}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pick the capture slot with the least capture stepper travel.")
+    parser.add_argument("config", nargs="?", help="config.h to read (defaults if omitted)")
+    parser.add_argument("--occupied", default="", help="Comma-separated occupied slot numbers")
+    parser.add_argument("--from", dest="from_loc", default="e4", help="Source of the 'do' (a board square or captN)")
+    parser.add_argument("--capt-pos", type=int, help="Capture stepper position instead of the one implied by --from")
+    parser.add_argument("--game", metavar="FILE", help="UCI moves to time with sequential and with planned slots")
+    args = parser.parse_args(argv)
+
+    try:
+        overrides = parse_config_file(args.config) if args.config else {}
+        occupied = parse_slots(args.occupied)
+    except OSError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    except ValueError:
+        print("Error: --occupied needs comma-separated slot numbers", file=sys.stderr)
+        return 2
+    config_values = layer_config_values(overrides, DEFAULT_CONFIG_VALUES)
+    if slot_number(args.from_loc):
+        occupied.add(slot_number(args.from_loc)) # Moving a piece to its own slot isn't a move
+
+    capt_pos = args.capt_pos if args.capt_pos is not None else capture_position_for(args.from_loc, config_values)
+    ranked = rank_free_slots(config_values, occupied, capt_pos)
+    if not ranked:
+        print("All capture slots are occupied.")
+        return 1
+    print(f"Capture stepper at {capt_pos}; {len(ranked)} free slots, nearest first:")
+    for seconds, slot in ranked[:5]:
+        print(f"  capt{slot:<3} {config_values['captureTargets'][slot - 1]:>5} steps  {seconds:.2f} s")
+
+    if args.game:
+        try:
+            with open(args.game, "r") as f:
+                uci_moves = f.read().split()
+            sequential = game_to_do_moves(uci_moves)
+            planned = game_to_do_moves(uci_moves, SlotPicker(config_values))
+        except (OSError, ValueError) as e:
+            print(f"Error reading game: {e}", file=sys.stderr)
+            return 2
+        model = MotionModel(config_values)
+        sequential_s, _ = model.estimate_sequence(sequential)
+        planned_s, _ = model.estimate_sequence(planned)
+        print(f"Game: slots in order {format_seconds(sequential_s)}, planned slots {format_seconds(planned_s)} "
+              f"({format_seconds(sequential_s - planned_s)} saved)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
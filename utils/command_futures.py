@@ -0,0 +1,260 @@
+from utils.message_bus import Progress, parse_line
+
+# --- Request/response correlation ---
+# The firmware answers commands strictly in order, so a reply always belongs to the
+# oldest command still waiting. If the firmware supports sequence tags, a command sent
+# as '#<id> <command>' prints its reply between 'BEGIN #<id>' and 'DONE #<id>', which
+# delimit it exactly: lines outside these markers (replies to untagged commands, homing
+# errors) belong to no tagged command. Otherwise the reply is recognised from REPLY_RULES.
+# Firmware that runs 'take'/'release'/'do' in the background announces them with an
+# 'EVT:' start event; from then on 'EVT:' lines belong to that sequence and every other
+# line to the commands sent after it (queries, 'stop'). Its final event decides whether
+# it succeeded.
+
+DEFAULT_COMMAND_TIMEOUT_S = 2.0
+SEQUENCE_COMMAND_TIMEOUT_S = 60.0 # Sequences ('do', 'take', ...) run for many seconds
+BEGIN_PREFIX = "BEGIN #"
+DONE_PREFIX = "DONE #"
+EVENT_PREFIX = "EVT:"
+UNKNOWN_COMMAND_PREFIX = "ERR: Unknown command: "
+
+# Command key -> line prefixes that complete it successfully (without sequence tags).
+# Any 'ERR:' line completes the oldest pending command as a failure, except an unknown
+# command error naming another command (one sent without a future).
+REPLY_RULES = {
+    "ping": ("ACK: pong",),
+    "getallpos": ("POS:",),
+    "getpos": ("SPOS:",),
+    "getsquarepos": ("SQPOS:",),
+    "getcaptpos": ("CAPTPOS:",),
+    "setconfig": ("ACK: Config",),
+    "setconfigs": ("ACK: Configs",),
+    "dumpconfig": ("CFG ",),
+    "loadconfig": ("ACK: Config loaded",),
+    "homeall": ("ACK: Homing sequence started",),
+    "sethome": ("ACK: sethome",),
+    "homecheck": ("HOMECHECK:",),
+    "gotocart": ("ACK: Stepper moving",),
+    "gotoorb": ("ACK: Stepper moving",),
+    "gotocapt": ("ACK: Stepper moving",),
+    "servorot": ("ACK: Rotation Servo",),
+    "servogrip": ("ACK: Gripper Servo",),
+    "gripopen": ("ACK: Gripper Open",),
+    "gripclose": ("ACK: Gripper Close",),
+    "jog": ("ACK: Jog Start",),
+    "stream": ("ACK: Stream",),
+    "la_ext": ("CMD: Extend Actuator",),
+    "la_ret_nosensor": ("CMD: Retract Actuator",),
+    "la_ext_timed": ("Extend (timed) complete",),
+    "la_ret": ("Retract (sensor) complete", "WARN: Timed retract"),
+    "take": ("Take Sequence Complete",),
+    "release": ("Release Sequence Complete",),
+    "do": ("Do Sequence Complete",),
+    "stop": ("ACK: Stopped",),
+}
+
+SEQUENCE_COMMANDS = ("do", "take", "release", "homeall", "homecheck")
+PROGRESS_COMMANDS = ("do", "take", "release") # Report progress events (and run in the background) on newer firmware
+
+
+def command_key(command):
+    return command.strip().split(" ", 1)[0].lower()
+
+def default_timeout_for(command):
+    return SEQUENCE_COMMAND_TIMEOUT_S if command_key(command) in SEQUENCE_COMMANDS else DEFAULT_COMMAND_TIMEOUT_S
+
+
+class CommandFuture:
+    """Handle for one sent command; resolves on its reply, an ERR, or a timeout."""
+
+    def __init__(self, command, timeout_s, sent_at, seq_id=None):
+        self.command = command
+        self.seq_id = seq_id
+        self.sent_at = sent_at
+        self.deadline = sent_at + timeout_s
+        self.lines = []          # (receive_time, line) attributed to this command
+        self.done = False
+        self.ok = False
+        self.reply = None        # The line that completed the command
+        self.error = None        # ERR text, 'timeout', 'disconnected' or 'not sent'
+        self.finished_at = None
+        self.background = False  # A sequence the firmware runs while taking other commands
+        self.outcome = None      # Its final Progress event
+        self._callbacks = []
+
+    @property
+    def latency_s(self):
+        return None if self.finished_at is None else self.finished_at - self.sent_at
+
+    def add_done_callback(self, callback):
+        if self.done:
+            callback(self)
+        else:
+            self._callbacks.append(callback)
+
+    def resolve(self, ok, now, reply=None, error=None):
+        if self.done:
+            return
+        self.done, self.ok, self.reply, self.error, self.finished_at = True, ok, reply, error, now
+        callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            callback(self)
+
+    def __repr__(self):
+        state = "pending" if not self.done else ("ok" if self.ok else f"failed: {self.error}")
+        return f"<CommandFuture '{self.command}' {state}>"
+
+
+def gather(futures, callback):
+    """Calls callback(futures) once every future has resolved."""
+    futures = list(futures)
+    remaining = [len(futures)]
+    if not futures:
+        callback(futures)
+        return
+    def on_done(_future):
+        remaining[0] -= 1
+        if remaining[0] == 0:
+            callback(futures)
+    for future in futures:
+        future.add_done_callback(on_done)
+
+
+class CommandTracker:
+    """Transport-independent bookkeeping of pending commands (no Qt, no serial)."""
+
+    def __init__(self):
+        self.pending = []
+        self.sequence_ids = None # None = unknown, True/False once probed
+        self.next_seq_id = 1
+        self._probe = None
+        self._open = None # Tagged command between its BEGIN and DONE (or its start event)
+
+    def create(self, command, now, timeout_s=None):
+        """Registers a command; returns (future, text to write on the wire)."""
+        if timeout_s is None:
+            timeout_s = default_timeout_for(command)
+        seq_id = None
+        if self.sequence_ids:
+            seq_id = self._take_seq_id()
+        future = CommandFuture(command, timeout_s, now, seq_id)
+        self.pending.append(future)
+        wire_text = command if seq_id is None else f"#{seq_id} {command}"
+        return future, wire_text
+
+    def create_probe(self, now):
+        """A tagged 'ping' that tells us whether the firmware echoes sequence tags."""
+        seq_id = self._take_seq_id()
+        future = CommandFuture("ping", DEFAULT_COMMAND_TIMEOUT_S, now, seq_id)
+        self._probe = future
+        self.pending.append(future)
+        return future, f"#{seq_id} ping"
+
+    def _take_seq_id(self):
+        seq_id = self.next_seq_id
+        self.next_seq_id = self.next_seq_id % 9999 + 1
+        return seq_id
+
+    def feed(self, line, now):
+        """Matches one received line. Returns True if the line is protocol-only (BEGIN/DONE/probe noise)."""
+        if line.startswith(BEGIN_PREFIX):
+            tag = line[len(BEGIN_PREFIX):].strip()
+            self._open = next((f for f in self.pending if str(f.seq_id) == tag), None)
+            return True
+        if line.startswith(DONE_PREFIX):
+            self._complete_tagged(line[len(DONE_PREFIX):].strip(), now)
+            return True
+        if self._probe is not None and line.startswith("ERR: Unknown command: #"):
+            self.sequence_ids = False
+            self._finish(self._probe, False, now, line, "sequence tags not supported")
+            return True
+        if not self.pending:
+            return False
+        if line.startswith(EVENT_PREFIX):
+            self._feed_event(line, now)
+            return False
+
+        if self._open is not None:
+            self._open.lines.append((now, line)) # Its outcome is decided on DONE
+            return False
+        head = next((f for f in self.pending if not f.background and f.seq_id is None), None)
+        if head is None:
+            return False
+        if line.startswith(UNKNOWN_COMMAND_PREFIX) and \
+           command_key(line[len(UNKNOWN_COMMAND_PREFIX):]) != command_key(head.command):
+            return False
+        head.lines.append((now, line))
+        if line.startswith("ERR:"):
+            self._finish(head, False, now, line, line[4:].strip())
+        elif line.lstrip().startswith(REPLY_RULES.get(command_key(head.command), ("ACK:",))): # Sequence lines are indented
+            self._finish(head, True, now, line)
+        return False
+
+    def _feed_event(self, line, now):
+        background = [f for f in self.pending if f.background]
+        if background:
+            future = background[0]
+        elif self._open is not None and command_key(self._open.command) in PROGRESS_COMMANDS:
+            future = self._open
+        else: # A start event: the sequence command was the next one to be processed
+            head = next((f for f in self.pending if command_key(f.command) in PROGRESS_COMMANDS), None)
+            if head is None:
+                return # Sent without a future (SerialHandler.send_command)
+            future = head
+        future.lines.append((now, line))
+        event = parse_line(line)
+        if not isinstance(event, Progress):
+            return
+        if event.event == "start":
+            future.background = True
+            if future is self._open:
+                self._open = None # Later lines belong to the commands sent meanwhile
+        elif event.final():
+            future.outcome = event
+            if future.seq_id is None:
+                self._finish_sequence(future, now, line)
+
+    def _finish_sequence(self, future, now, reply):
+        """Completes a background sequence by its final event."""
+        if future.outcome.event == "done":
+            self._finish(future, True, now, reply)
+        else:
+            self._finish(future, False, now, reply, future.outcome.message or future.outcome.event)
+
+    def _complete_tagged(self, tag, now):
+        for future in self.pending:
+            if str(future.seq_id) == tag:
+                if future is self._probe:
+                    self.sequence_ids = True
+                errors = [line for _, line in future.lines if line.startswith("ERR:")]
+                replies = [line for _, line in future.lines if not line.startswith("ERR:")]
+                if future.outcome is not None:
+                    self._finish_sequence(future, now, replies[-1])
+                elif errors:
+                    self._finish(future, False, now, errors[0], errors[0][4:].strip())
+                else:
+                    self._finish(future, True, now, replies[-1] if replies else None)
+                return
+
+    def expire(self, now):
+        for future in [f for f in self.pending if now >= f.deadline]:
+            if future is self._probe:
+                self.sequence_ids = False
+            self._finish(future, False, now, error="timeout")
+
+    def cancel(self, future, reason, now):
+        self._finish(future, False, now, error=reason)
+
+    def fail_all(self, reason, now):
+        for future in list(self.pending):
+            self._finish(future, False, now, error=reason)
+        self.sequence_ids = None
+
+    def _finish(self, future, ok, now, reply=None, error=None):
+        if future in self.pending:
+            self.pending.remove(future)
+        if future is self._probe:
+            self._probe = None
+        if future is self._open:
+            self._open = None
+        future.resolve(ok, now, reply, error)
@@ -0,0 +1,150 @@
+import argparse
+import functools
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from utils.config_parser import DEFAULT_CONFIG_VALUES, ConfigHeaderRenderer, layer_config_values, parse_config_file, write_config_h
+
+# --- Fleet config.h generation ---
+# Writes one config.h per robot from per-robot overrides laid on DEFAULT_CONFIG_VALUES,
+# across a process pool and without Qt. The robots come from either
+#   * a directory: every <robot>.json ({"KEY": value, ...}) or <robot>.h (a config.h,
+#     e.g. one generated by the app) is one robot
+#   * a manifest .json: {"defaults": {...}, "robots": {"<robot>": {...} or "<file>", ...}};
+#     "defaults" apply to every robot, file names are relative to the manifest
+# and each header is written to <out>/<robot>/config.h.
+#
+#   python -m utils.config_batch robots/ --out build/configs
+
+SOURCE_EXTENSIONS = (".json", ".h")
+CHUNK_SIZE = 16 # Robots per task sent to a worker
+
+_renderer = None # One per process; consecutive robots share most formatted slots
+
+
+def read_overrides(path):
+    """A <robot>.json or <robot>.h file -> {KEY: value}. Raises OSError/ValueError."""
+    if path.endswith(".h"):
+        return parse_config_file(path)
+    with open(path, 'r') as f:
+        overrides = json.load(f)
+    if not isinstance(overrides, dict):
+        raise ValueError(f"{path}: expected a JSON object of config keys")
+    return overrides
+
+def check_overrides(overrides):
+    """
+    Raises ValueError for values the header can't hold (the app would fall back to defaults)
+    and for keys it doesn't have (they would be dropped without a word).
+    """
+    for key, value in overrides.items():
+        default_value = DEFAULT_CONFIG_VALUES.get(key)
+        if default_value is None:
+            raise ValueError(f"unknown key '{key}' (not written to config.h)")
+        if isinstance(default_value, list):
+            if (not isinstance(value, list) or len(value) != len(default_value)
+                    or not all(isinstance(el, int) and not isinstance(el, bool) for el in value)):
+                raise ValueError(f"'{key}' needs {len(default_value)} integers")
+        elif isinstance(default_value, str):
+            if not isinstance(value, str):
+                raise ValueError(f"'{key}' needs a string")
+        elif not isinstance(value, (int, float)) or isinstance(value, bool):
+            raise ValueError(f"'{key}' needs a number")
+
+def collect_robots(source):
+    """Directory or manifest -> [(robot, shared defaults, overrides dict or file path)]."""
+    robots = []
+    if os.path.isdir(source):
+        for name in sorted(os.listdir(source)):
+            robot, extension = os.path.splitext(name)
+            if extension in SOURCE_EXTENSIONS:
+                robots.append((robot, {}, os.path.join(source, name)))
+    else:
+        with open(source, 'r') as f:
+            manifest = json.load(f)
+        if not isinstance(manifest, dict):
+            raise ValueError(f"{source}: expected a JSON object with a \"robots\" object")
+        base_dir = os.path.dirname(os.path.abspath(source))
+        defaults = manifest.get("defaults", {})
+        entries = manifest.get("robots", {})
+        if not isinstance(defaults, dict) or not isinstance(entries, dict):
+            raise ValueError(f"{source}: \"defaults\" and \"robots\" must be JSON objects")
+        check_overrides(defaults)
+        for robot, entry in entries.items():
+            robots.append((robot, defaults, os.path.join(base_dir, entry) if isinstance(entry, str) else entry))
+
+    names = [robot for robot, _, _ in robots]
+    duplicates = sorted({name for name in names if names.count(name) > 1})
+    if duplicates:
+        raise ValueError("Robots defined more than once: " + ", ".join(duplicates))
+    return robots
+
+def robot_config_path(out_dir, robot):
+    """<out_dir>/<robot>/config.h; raises ValueError for names that would land elsewhere."""
+    separators = [sep for sep in (os.sep, os.altsep, "/") if sep]
+    if not robot or robot in (".", "..") or os.path.isabs(robot) or any(sep in robot for sep in separators):
+        raise ValueError(f"invalid robot name '{robot}'")
+    out_root = os.path.realpath(out_dir)
+    robot_dir = os.path.realpath(os.path.join(out_dir, robot))
+    if os.path.dirname(robot_dir) != out_root:
+        raise ValueError(f"invalid robot name '{robot}'")
+    return os.path.join(out_dir, robot, "config.h")
+
+def build_robot(robot_entry, out_dir):
+    """Writes one robot's config.h. Returns (robot, path, error); runs in a worker process."""
+    global _renderer
+    robot, defaults, source = robot_entry
+    try:
+        path = robot_config_path(out_dir, robot)
+        if isinstance(source, str):
+            overrides = read_overrides(source)
+        elif isinstance(source, dict):
+            overrides = source
+        else:
+            raise ValueError("expected an object of config keys or a file name")
+        check_overrides(overrides)
+        config = layer_config_values(overrides, layer_config_values(defaults))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if _renderer is None:
+            _renderer = ConfigHeaderRenderer()
+        write_config_h(config, path, _renderer)
+        return robot, path, None
+    except (OSError, ValueError) as e:
+        return robot, None, str(e)
+
+def build_all(robots, out_dir, jobs=None):
+    """Builds every robot, in-process when jobs == 1. Returns the build_robot results in order."""
+    build = functools.partial(build_robot, out_dir=out_dir)
+    if jobs == 1 or len(robots) <= 1:
+        return [build(entry) for entry in robots]
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        return list(executor.map(build, robots, chunksize=CHUNK_SIZE))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate one config.h per robot without the GUI.")
+    parser.add_argument("source", help="Directory of <robot>.json/<robot>.h files, or a manifest .json")
+    parser.add_argument("--out", default="configs", help="Output directory (<out>/<robot>/config.h)")
+    parser.add_argument("--jobs", type=int, default=None, help="Worker processes (default: one per CPU)")
+    options = parser.parse_args()
+
+    try:
+        robots = collect_robots(options.source)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    started = time.perf_counter()
+    results = build_all(robots, options.out, options.jobs)
+    failed = [(robot, error) for robot, _, error in results if error]
+    for robot, error in failed:
+        print(f"{robot}: {error}", file=sys.stderr)
+    print(f"Wrote {len(results) - len(failed)} of {len(results)} config.h files to {options.out} "
+          f"in {time.perf_counter() - started:.2f} s")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,8 +1,13 @@
 
+import hashlib
+import json
+import os
 import re
+import string
 
 # DEFAULT_CONFIG_VALUES
 DEFAULT_CONFIG_VALUES = {
+    "ORB_ID": "ORB IVRY",
     "DEFAULT_SSID": "", "DEFAULT_PWD": "", "DEFAULT_HOST": "127.0.0.1", "DEFAULT_PORT": 29920,
     "orbTargets": [4000, 3180, 2420, 1630, 840, 20, 5650, 4820],
     "cartTargets": [4480, 3850, 3200, 2520, 1960, 1360, 680, 0],
@@ -23,89 +28,176 @@ DEFAULT_CONFIG_VALUES = {
 }
 
 
+# --- config.h tokenizer ---
+# One compiled pattern, scanned once over the whole file. Comments and stray string
+# literals are matched (and skipped) too, so declarations inside them are ignored.
+_DECLARATION_RE = re.compile(r"""
+    //[^\n]* | /\*.*?\*/ | "(?:[^"\\\n]|\\.)*"
+  | (?:static\s+)?const\s+\w+\s+(?P<key>\w+)\s*(?P<array>\[\s*\w*\s*\])?\s*=\s*
+    (?: "(?P<string>(?:[^"\\\n]|\\.)*)" | \{(?P<body>[^}]*)\} | (?P<number>[-+]?[0-9.]+) )\s*;
+""", re.VERBOSE | re.DOTALL)
+_COMMENT_RE = re.compile(r"//[^\n]*|/\*.*?\*/", re.DOTALL)
+
+
+def _parse_number(text):
+    # Cast to float if it contains a '.', otherwise int
+    return float(text) if '.' in text else int(text)
+
+
+def parse_config_h(content):
+    """
+    Extracts every 'const' scalar, 'const' array and 'static const String' declaration
+    from config.h source in a single pass. Returns {name: value}; when a name is declared
+    more than once, the first declaration wins. Values that don't parse are skipped.
+    """
+    declarations = {}
+    for match in _DECLARATION_RE.finditer(content):
+        key = match.group("key")
+        if key is None or key in declarations:
+            continue # Comment, string literal, or a later duplicate
+        string, body, number = match.group("string", "body", "number")
+        try:
+            if string is not None:
+                declarations[key] = string
+            elif body is not None and match.group("array"):
+                if "/" in body:
+                    body = _COMMENT_RE.sub("", body) # Remove comments
+                declarations[key] = [_parse_number(el.strip()) for el in body.split(",") if el.strip()]
+            elif number is not None:
+                declarations[key] = _parse_number(number)
+        except ValueError:
+            print(f"  WARNING: Could not parse value for '{key}'.")
+    return declarations
+
+
+# --- Parse cache ---
+# parse_config_h() results per file, keyed by path and validated by mtime + size (no read
+# at all) or, when those changed, by the SHA-1 of the content (a touched or re-saved file
+# is not parsed again). Optionally mirrored to a compact JSON file so that the next app
+# start skips the regex pass too; see enable_parse_cache_file().
+PARSE_CACHE_MAX_FILES = 32
+DEFAULT_PARSE_CACHE_FILE = os.path.join(os.path.expanduser("~"), ".cache", "matair-config-tool", "config_parse_cache.json")
+_parse_cache = {} # abspath -> {"mtime": ns, "size": bytes, "sha1": hex, "values": {...}}
+_parse_cache_file = None
+
+def enable_parse_cache_file(path):
+    """Mirrors the parse cache to `path` (loaded now, rewritten after every new parse)."""
+    global _parse_cache_file
+    _parse_cache_file = path
+    try:
+        with open(path, 'r') as f:
+            stored = json.load(f)
+        dropped = 0
+        for filepath, entry in stored.items():
+            if _is_cache_entry(entry):
+                _parse_cache.setdefault(filepath, entry)
+            else:
+                dropped += 1
+        if dropped:
+            print(f"Warning: Ignoring {dropped} malformed entries in parse cache '{path}'")
+    except FileNotFoundError:
+        pass
+    except (OSError, ValueError, AttributeError) as e:
+        print(f"Warning: Ignoring unreadable parse cache '{path}': {e}")
+
+def _is_cache_entry(entry):
+    """True for {"mtime": int, "size": int, "sha1": str, "values": dict} (an older or edited file may differ)."""
+    return (isinstance(entry, dict) and isinstance(entry.get("sha1"), str) and isinstance(entry.get("values"), dict)
+            and all(isinstance(entry.get(key), int) and not isinstance(entry.get(key), bool) for key in ("mtime", "size")))
+
+def clear_parse_cache():
+    _parse_cache.clear()
+
+def _save_parse_cache():
+    if not _parse_cache_file:
+        return
+    try:
+        os.makedirs(os.path.dirname(os.path.abspath(_parse_cache_file)), exist_ok=True)
+        temp_path = _parse_cache_file + ".tmp"
+        with open(temp_path, 'w') as f:
+            json.dump(_parse_cache, f, separators=(",", ":"))
+        os.replace(temp_path, _parse_cache_file)
+    except OSError as e:
+        print(f"Warning: Could not write parse cache '{_parse_cache_file}': {e}")
+
+def parse_config_file(filepath):
+    """
+    parse_config_h() for a file, answered from the cache when the file hasn't changed.
+    The returned dict is shared with the cache; copy it before editing. Raises OSError.
+    """
+    filepath = os.path.abspath(filepath)
+    stat = os.stat(filepath)
+    entry = _parse_cache.get(filepath)
+    if entry and entry["mtime"] == stat.st_mtime_ns and entry["size"] == stat.st_size:
+        return entry["values"]
+
+    with open(filepath, 'rb') as f:
+        raw = f.read()
+    sha1 = hashlib.sha1(raw).hexdigest()
+    if entry and entry["sha1"] == sha1:
+        entry["mtime"], entry["size"] = stat.st_mtime_ns, stat.st_size
+    else:
+        entry = {"mtime": stat.st_mtime_ns, "size": stat.st_size, "sha1": sha1,
+                 "values": parse_config_h(raw.decode("utf-8", errors="replace"))}
+    _parse_cache.pop(filepath, None) # Re-insert as most recently used
+    _parse_cache[filepath] = entry
+    while len(_parse_cache) > PARSE_CACHE_MAX_FILES:
+        del _parse_cache[next(iter(_parse_cache))]
+    _save_parse_cache()
+    return entry["values"]
+
+
+def layer_config_values(overrides, base=None):
+    """
+    Returns a copy of `base` (DEFAULT_CONFIG_VALUES if None) with the values from
+    `overrides` laid on top. Values of the wrong type for a known key are skipped
+    with a warning; keys the app doesn't know are kept as-is.
+    """
+    base = DEFAULT_CONFIG_VALUES if base is None else base
+    # Copy the arrays too, tabs edit them in place
+    layered = {key: list(value) if isinstance(value, list) else value for key, value in base.items()}
+    for key, value in overrides.items():
+        if isinstance(value, list):
+            value = list(value) # Never hand out the caller's (or the cache's) list
+        default_value = DEFAULT_CONFIG_VALUES.get(key)
+        if default_value is None:
+            layered[key] = value # Unknown to the app, preserved as-is
+        elif isinstance(default_value, list):
+            if isinstance(value, list) and all(isinstance(el, int) for el in value):
+                layered[key] = value
+            else:
+                print(f"  WARNING: Could not parse array for key '{key}'. Using default.")
+        elif isinstance(default_value, str):
+            if isinstance(value, str):
+                layered[key] = value
+        elif isinstance(value, (int, float)):
+            layered[key] = value
+    return layered
+
+
 def load_config_values(filepath):
     """
     Loads configuration from a .h file. Starts with defaults and overwrites with
-    any values found in the file. Returns a complete dictionary.
+    any values found in the file. Returns a complete dictionary; declarations for
+    names the app doesn't know are kept as well.
     """
-
-    loaded_cfg = DEFAULT_CONFIG_VALUES.copy()
     try:
-        with open(filepath, 'r') as f:
-            content = f.read()
+        declarations = parse_config_file(filepath)
         print(f"Successfully read file: {filepath}")
     except (FileNotFoundError, Exception) as e:
         print(f"Warning: Could not read '{filepath}': {e}. Using all default values.")
-        return loaded_cfg
-
-   
-    for key, default_value in DEFAULT_CONFIG_VALUES.items():
-        # Build a specific regex pattern for each key
-        
-        # Handle Arrays
-        if isinstance(default_value, list):
-            # Pattern: const <any_type> KEY[<any_size>] = { ... };
-            pattern = rf"const\s+\w+\s+{key}\[\d+\]\s*=\s*({{.+?}});"
-            match = re.search(pattern, content, re.DOTALL) # DOTALL handles multi-line arrays
-            if match:
-                try:
-                    values_str = match.group(1).strip("{} ")
-                    # Clean up newlines, comments, and split
-                    values_str = re.sub(r'//.*', '', values_str) # Remove comments
-                    values_str = re.sub(r'\s+', '', values_str)   # Remove all whitespace
-                    elements = values_str.split(',')
-                    # Filter out potential empty strings from trailing commas
-                    valid_elements = [int(el) for el in elements if el]
-                    loaded_cfg[key] = valid_elements
-                    # print(f"  Parsed array '{key}'") # Debug
-                except (ValueError, IndexError) as e:
-                    print(f"  WARNING: Could not parse array for key '{key}': {e}. Using default.")
-                    loaded_cfg[key] = default_value # Revert to default on parse error
-            continue # Move to next key
-
-        # Handle Strings
-        if isinstance(default_value, str):
-            # Pattern: static const String KEY = "VALUE";
-            pattern = rf"static\s+const\s+String\s+{key}\s*=\s*\"(.*?)\";"
-            match = re.search(pattern, content)
-            if match:
-                loaded_cfg[key] = match.group(1)
-                # print(f"  Parsed string '{key}'") # Debug
-            continue
-
-        # Handle all single Numeric values (int, float, long, etc.)
-        if isinstance(default_value, (int, float)):
-            # Pattern: const <any_type> KEY = VALUE;
-            pattern = rf"const\s+\w+\s+{key}\s*=\s*([0-9.]+);"
-            match = re.search(pattern, content)
-            if match:
-                try:
-                    value_str = match.group(1)
-                    # Cast to float if it contains a '.', otherwise int
-                    loaded_cfg[key] = float(value_str) if '.' in value_str else int(value_str)
-                    # print(f"  Parsed numeric '{key}'") # Debug
-                except ValueError:
-                    print(f"  WARNING: Could not parse numeric value for key '{key}': '{value_str}'. Using default.")
-                    loaded_cfg[key] = default_value # Revert on parse error
-            continue
+        return layer_config_values({})
 
+    loaded_cfg = layer_config_values(declarations)
     print(f"Config values parsed from {filepath}")
     return loaded_cfg
 
 
-def generate_config_h_string(config_data):
-    def format_array(data_list):
-        lines = []
-        for i in range(0, len(data_list), 8):
-            chunk = ", ".join(map(str, data_list[i:i+8]))
-            lines.append(chunk)
-        return (",\n  ").join(lines)
-
-    orb_targets_str = format_array(config_data.get("orbTargets", DEFAULT_CONFIG_VALUES["orbTargets"]))
-    cart_targets_str = format_array(config_data.get("cartTargets", DEFAULT_CONFIG_VALUES["cartTargets"]))
-    capture_targets_str = format_array(config_data.get("captureTargets", DEFAULT_CONFIG_VALUES["captureTargets"]))
-    
-    content = f"""\
+# --- config.h generation ---
+# The header template is compiled once into literal segments and named slots; a render
+# only formats the slot values and joins the parts. '{KEY}' is a CONFIG_VALUES key, literal
+# braces are doubled. Arrays are written 8 values per line.
+CONFIG_H_TEMPLATE = """\
 #pragma once
 #include <Arduino.h>
 
@@ -113,56 +205,125 @@ def generate_config_h_string(config_data):
 #define PWD_MAX_LEN     64
 #define HOST_MAX_LEN    32
 
-static const String  ORB_ID         = "ORB IVRY";
-static const String  DEFAULT_SSID   = "{config_data.get("DEFAULT_SSID", DEFAULT_CONFIG_VALUES["DEFAULT_SSID"])}";
-static const String  DEFAULT_PWD    = "{config_data.get("DEFAULT_PWD", DEFAULT_CONFIG_VALUES["DEFAULT_PWD"])}";
-static const String  DEFAULT_HOST   = "{config_data.get("DEFAULT_HOST", DEFAULT_CONFIG_VALUES["DEFAULT_HOST"])}";
-const uint32_t       DEFAULT_PORT   = {config_data.get("DEFAULT_PORT", DEFAULT_CONFIG_VALUES["DEFAULT_PORT"])};
+static const String  ORB_ID         = "{ORB_ID}";
+static const String  DEFAULT_SSID   = "{DEFAULT_SSID}";
+static const String  DEFAULT_PWD    = "{DEFAULT_PWD}";
+static const String  DEFAULT_HOST   = "{DEFAULT_HOST}";
+const uint32_t       DEFAULT_PORT   = {DEFAULT_PORT};
 
 // --- POSITION CONFIG ----
 const uint16_t orbTargets[8] = {{
-  {orb_targets_str}
+  {orbTargets}
 }};   // a-h
 const uint16_t cartTargets[8] = {{
-  {cart_targets_str}
+  {cartTargets}
 }};     // ranks 1-8
 const uint16_t captureTargets[32] = {{
-  {capture_targets_str}
+  {captureTargets}
 }};
 
 // --- Constants ---
-const uint16_t STEPPER_SPEED = {config_data.get("STEPPER_SPEED", DEFAULT_CONFIG_VALUES["STEPPER_SPEED"])};
-const uint16_t STEPPER_ACCEL = {config_data.get("STEPPER_ACCEL", DEFAULT_CONFIG_VALUES["STEPPER_ACCEL"])};
-const uint16_t HOMING_SPEED_CAPTURE = {config_data.get("HOMING_SPEED_CAPTURE", DEFAULT_CONFIG_VALUES["HOMING_SPEED_CAPTURE"])};
-const uint16_t HOMING_SPEED_CART_ORB = {config_data.get("HOMING_SPEED_CART_ORB", DEFAULT_CONFIG_VALUES["HOMING_SPEED_CART_ORB"])};
-const uint16_t HOMING_ACCEL = {config_data.get("HOMING_ACCEL", DEFAULT_CONFIG_VALUES["HOMING_ACCEL"])};
+const uint16_t STEPPER_SPEED = {STEPPER_SPEED};
+const uint16_t STEPPER_ACCEL = {STEPPER_ACCEL};
+const uint16_t HOMING_SPEED_CAPTURE = {HOMING_SPEED_CAPTURE};
+const uint16_t HOMING_SPEED_CART_ORB = {HOMING_SPEED_CART_ORB};
+const uint16_t HOMING_ACCEL = {HOMING_ACCEL};
 
-const uint8_t GRIPPER_ROT_BOARD = {config_data.get("GRIPPER_ROT_BOARD", DEFAULT_CONFIG_VALUES["GRIPPER_ROT_BOARD"])};
-const uint8_t GRIPPER_ROT_CAPTURE = {config_data.get("GRIPPER_ROT_CAPTURE", DEFAULT_CONFIG_VALUES["GRIPPER_ROT_CAPTURE"])};
-const uint16_t CART_SAFETY_THRESHOLD = {config_data.get("CART_SAFETY_THRESHOLD", DEFAULT_CONFIG_VALUES["CART_SAFETY_THRESHOLD"])};
-const uint16_t CART_CAPTURE_HOME_THRESHOLD = {config_data.get("CART_CAPTURE_HOME_THRESHOLD", DEFAULT_CONFIG_VALUES["CART_CAPTURE_HOME_THRESHOLD"])};
-const uint16_t CART_CAPTURE_POS = {config_data.get("CART_CAPTURE_POS", DEFAULT_CONFIG_VALUES["CART_CAPTURE_POS"])};
+const uint8_t GRIPPER_ROT_BOARD = {GRIPPER_ROT_BOARD};
+const uint8_t GRIPPER_ROT_CAPTURE = {GRIPPER_ROT_CAPTURE};
+const uint16_t CART_SAFETY_THRESHOLD = {CART_SAFETY_THRESHOLD};
+const uint16_t CART_CAPTURE_HOME_THRESHOLD = {CART_CAPTURE_HOME_THRESHOLD};
+const uint16_t CART_CAPTURE_POS = {CART_CAPTURE_POS};
 
-const uint8_t GripperOpen = {config_data.get("GripperOpen", DEFAULT_CONFIG_VALUES["GripperOpen"])};
-const uint8_t GripperClose = {config_data.get("GripperClose", DEFAULT_CONFIG_VALUES["GripperClose"])};
+const uint8_t GripperOpen = {GripperOpen};
+const uint8_t GripperClose = {GripperClose};
 
-const uint16_t ACTUATOR_TRAVEL_TIME_MS = {config_data.get("ACTUATOR_TRAVEL_TIME_MS", DEFAULT_CONFIG_VALUES["ACTUATOR_TRAVEL_TIME_MS"])};
+const uint16_t ACTUATOR_TRAVEL_TIME_MS = {ACTUATOR_TRAVEL_TIME_MS};
 
-const uint8_t CAPTURE_HOME_BACKUP_STEPS = {config_data.get("CAPTURE_HOME_BACKUP_STEPS", DEFAULT_CONFIG_VALUES["CAPTURE_HOME_BACKUP_STEPS"])};
+const uint8_t CAPTURE_HOME_BACKUP_STEPS = {CAPTURE_HOME_BACKUP_STEPS};
 
-const uint16_t MANUAL_JOG_CART_SPEED = {config_data.get("MANUAL_JOG_CART_SPEED", DEFAULT_CONFIG_VALUES["MANUAL_JOG_CART_SPEED"])};
-const uint16_t MANUAL_JOG_ORB_SPEED = {config_data.get("MANUAL_JOG_ORB_SPEED", DEFAULT_CONFIG_VALUES["MANUAL_JOG_ORB_SPEED"])};
-const uint16_t MANUAL_JOG_CAPTURE_SPEED = {config_data.get("MANUAL_JOG_CAPTURE_SPEED", DEFAULT_CONFIG_VALUES["MANUAL_JOG_CAPTURE_SPEED"])};
-const uint8_t  MANUAL_JOG_SERVO_INCREMENT = {config_data.get("MANUAL_JOG_SERVO_INCREMENT", DEFAULT_CONFIG_VALUES["MANUAL_JOG_SERVO_INCREMENT"])};
+const uint16_t MANUAL_JOG_CART_SPEED = {MANUAL_JOG_CART_SPEED};
+const uint16_t MANUAL_JOG_ORB_SPEED = {MANUAL_JOG_ORB_SPEED};
+const uint16_t MANUAL_JOG_CAPTURE_SPEED = {MANUAL_JOG_CAPTURE_SPEED};
+const uint8_t  MANUAL_JOG_SERVO_INCREMENT = {MANUAL_JOG_SERVO_INCREMENT};
 
 // --- Travel Limits ---
-const long CART_MIN_POS = {config_data.get("CART_MIN_POS", DEFAULT_CONFIG_VALUES["CART_MIN_POS"])};
-const long CART_MAX_POS = {config_data.get("CART_MAX_POS", DEFAULT_CONFIG_VALUES["CART_MAX_POS"])}; 
+const long CART_MIN_POS = {CART_MIN_POS};
+const long CART_MAX_POS = {CART_MAX_POS}; 
 
-const long ORB_MIN_POS = {config_data.get("ORB_MIN_POS", DEFAULT_CONFIG_VALUES["ORB_MIN_POS"])};
-const long ORB_MAX_POS = {config_data.get("ORB_MAX_POS", DEFAULT_CONFIG_VALUES["ORB_MAX_POS"])}; 
+const long ORB_MIN_POS = {ORB_MIN_POS};
+const long ORB_MAX_POS = {ORB_MAX_POS}; 
 
-const long CAPTURE_MIN_POS = {config_data.get("CAPTURE_MIN_POS", DEFAULT_CONFIG_VALUES["CAPTURE_MIN_POS"])};
-const long CAPTURE_MAX_POS = {config_data.get("CAPTURE_MAX_POS", DEFAULT_CONFIG_VALUES["CAPTURE_MAX_POS"])};
+const long CAPTURE_MIN_POS = {CAPTURE_MIN_POS};
+const long CAPTURE_MAX_POS = {CAPTURE_MAX_POS};
 """
-    return content
\ No newline at end of file
+
+def _format_array(data_list):
+    lines = []
+    for i in range(0, len(data_list), 8):
+        lines.append(", ".join(map(str, data_list[i:i+8])))
+    return ",\n  ".join(lines)
+
+def compile_template(template, defaults):
+    """
+    Template text -> (parts, slots). parts holds the literal text with a None per slot;
+    slots lists (index into parts, key, default value, formatter) per slot.
+    """
+    parts, slots = [], []
+    for literal, key, _spec, _conversion in string.Formatter().parse(template):
+        if literal:
+            parts.append(literal)
+        if key is not None:
+            default_value = defaults[key]
+            slots.append((len(parts), key, default_value, _format_array if isinstance(default_value, list) else str))
+            parts.append(None)
+    return parts, slots
+
+_CONFIG_H_PARTS, _CONFIG_H_SLOTS = compile_template(CONFIG_H_TEMPLATE, DEFAULT_CONFIG_VALUES)
+
+
+class ConfigHeaderRenderer:
+    """
+    Renders config.h from the compiled template, keeping the formatted slots of the last
+    render so that only values that changed since then are formatted again.
+    """
+
+    def __init__(self):
+        self.parts = list(_CONFIG_H_PARTS)
+        self.rendered_values = {} # key -> value the slot currently holds
+
+    def update(self, config_data):
+        """Re-formats the slots whose value changed. Returns the number of slots formatted."""
+        formatted = 0
+        for index, key, default_value, format_value in _CONFIG_H_SLOTS:
+            value = config_data.get(key, default_value)
+            previous = self.rendered_values.get(key)
+            if self.parts[index] is not None and previous == value and type(previous) is type(value):
+                continue # 1 == 1.0, but they print differently
+            self.parts[index] = format_value(value)
+            self.rendered_values[key] = list(value) if isinstance(value, list) else value
+            formatted += 1
+        return formatted
+
+    def render(self, config_data):
+        self.update(config_data)
+        return "".join(self.parts)
+
+    def write(self, config_data, file_obj):
+        """Streams the header into an open text file without building the whole string."""
+        self.update(config_data)
+        file_obj.writelines(self.parts)
+
+
+def generate_config_h_string(config_data):
+    parts = list(_CONFIG_H_PARTS)
+    for index, key, default_value, format_value in _CONFIG_H_SLOTS:
+        parts[index] = format_value(config_data.get(key, default_value))
+    return "".join(parts)
+
+def write_config_h(config_data, filepath, renderer=None):
+    """Writes config.h for config_data. Pass the same renderer for many files to reuse
+    the slots that are identical across them."""
+    renderer = renderer or ConfigHeaderRenderer()
+    with open(filepath, 'w', newline='') as f:
+        renderer.write(config_data, f)
@@ -0,0 +1,215 @@
+from utils.command_futures import CommandFuture, gather, DEFAULT_COMMAND_TIMEOUT_S
+
+# CONFIG_VALUES keys the calibration firmware accepts through setconfig/setconfigs.
+# The firmware key is always the lower-cased config key.
+FIRMWARE_CONFIG_KEYS = (
+    "STEPPER_SPEED", "STEPPER_ACCEL", "GripperOpen", "GripperClose",
+    "GRIPPER_ROT_BOARD", "GRIPPER_ROT_CAPTURE", "CART_CAPTURE_POS", "CART_SAFETY_THRESHOLD",
+    "CART_CAPTURE_HOME_THRESHOLD", "ACTUATOR_TRAVEL_TIME_MS", "HOMING_SPEED_CAPTURE",
+    "HOMING_SPEED_CART_ORB", "HOMING_ACCEL", "MANUAL_JOG_CART_SPEED", "MANUAL_JOG_ORB_SPEED",
+    "MANUAL_JOG_CAPTURE_SPEED", "CART_MIN_POS", "CART_MAX_POS", "ORB_MIN_POS", "ORB_MAX_POS",
+    "CAPTURE_MIN_POS", "CAPTURE_MAX_POS",
+)
+_CONFIG_KEY_BY_FIRMWARE_KEY = {key.lower(): key for key in FIRMWARE_CONFIG_KEYS}
+
+# Position target arrays and their lengths, transferred by dumpconfig/loadconfig only
+FIRMWARE_TARGET_ARRAYS = {"orbTargets": 8, "cartTargets": 8, "captureTargets": 32}
+_ARRAY_KEY_BY_FIRMWARE_KEY = {key.lower(): key for key in FIRMWARE_TARGET_ARRAYS}
+
+SETCONFIGS_ACK_PREFIX = "ACK: Configs"
+CONFIG_DUMP_PREFIX = "CFG "
+LOADCONFIG_ACK_PREFIX = "ACK: Config loaded"
+
+
+def build_setconfigs_command(values):
+    """{'STEPPER_SPEED': 4000, ...} -> 'setconfigs stepper_speed=4000 ...'"""
+    return "setconfigs " + " ".join(f"{key.lower()}={value}" for key, value in values.items())
+
+def parse_applied_rejected(line):
+    """'ACK: Configs applied=a,b rejected=c' -> (['a', 'b'], ['c']) as firmware keys."""
+    applied, rejected = [], []
+    for token in line.split():
+        name, _, items = token.partition("=")
+        target = applied if name == "applied" else rejected if name == "rejected" else None
+        if target is not None:
+            target.extend(item for item in items.split(",") if item)
+    return applied, rejected
+
+def _config_keys(firmware_keys):
+    return [_CONFIG_KEY_BY_FIRMWARE_KEY.get(k) or _ARRAY_KEY_BY_FIRMWARE_KEY.get(k, k) for k in firmware_keys]
+
+
+# --- Bulk transfer frame ---
+# One line: '<fletcher16 hex> key=value;...;orbtargets=v,v,...' (after the 'CFG ' prefix
+# for dumpconfig). Keys are firmware (lower-case) keys; the checksum covers the payload.
+
+def fletcher16(data):
+    sum1 = sum2 = 0
+    for byte in data.encode("ascii"):
+        sum1 = (sum1 + byte) % 255
+        sum2 = (sum2 + sum1) % 255
+    return (sum2 << 8) | sum1
+
+def _format_number(value):
+    return str(int(value)) if float(value).is_integer() else str(value)
+
+def _parse_number(text):
+    value = float(text)
+    return int(value) if value.is_integer() else value
+
+def encode_config_blob(config_values):
+    """CONFIG_VALUES -> '<checksum> <payload>' holding every firmware scalar and target array."""
+    entries = [f"{key.lower()}={_format_number(config_values[key])}"
+               for key in FIRMWARE_CONFIG_KEYS if key in config_values]
+    for key, length in FIRMWARE_TARGET_ARRAYS.items():
+        values = list(config_values.get(key, []))
+        if len(values) != length:
+            raise ValueError(f"{key} needs {length} values, got {len(values)}")
+        entries.append(f"{key.lower()}=" + ",".join(_format_number(v) for v in values))
+    payload = ";".join(entries)
+    return f"{fletcher16(payload):04x} {payload}"
+
+def decode_config_blob(line):
+    """A 'CFG ...' line (or a bare blob) -> dict of CONFIG_VALUES keys. Raises ValueError if damaged."""
+    if line.startswith(CONFIG_DUMP_PREFIX):
+        line = line[len(CONFIG_DUMP_PREFIX):]
+    checksum, _, payload = line.strip().partition(" ")
+    try:
+        if int(checksum, 16) != fletcher16(payload):
+            raise ValueError("Config checksum mismatch")
+    except UnicodeEncodeError:
+        raise ValueError("Config payload is not ASCII")
+    values = {}
+    for entry in filter(None, payload.split(";")):
+        firmware_key, _, text = entry.partition("=")
+        if firmware_key in _CONFIG_KEY_BY_FIRMWARE_KEY:
+            values[_CONFIG_KEY_BY_FIRMWARE_KEY[firmware_key]] = _parse_number(text)
+        elif firmware_key in _ARRAY_KEY_BY_FIRMWARE_KEY:
+            key = _ARRAY_KEY_BY_FIRMWARE_KEY[firmware_key]
+            items = [int(_parse_number(item)) for item in text.split(",")]
+            if len(items) != FIRMWARE_TARGET_ARRAYS[key]:
+                raise ValueError(f"{key} has {len(items)} values, expected {FIRMWARE_TARGET_ARRAYS[key]}")
+            values[key] = items
+        else:
+            print(f"ConfigSync: Ignoring unknown key in config dump: '{firmware_key}'")
+    return values
+
+
+class DeviceConfigSync:
+    """
+    Tracks the config values last confirmed on the ESP32 and pushes only what differs,
+    as a single 'setconfigs' batch (or one 'setconfig' per key on older firmware).
+    Values already on their way count as sent, so overlapping pushes don't repeat them.
+    """
+
+    def __init__(self, send_async):
+        self.send_async = send_async # SerialHandler.send_command_async
+        self.reset()
+
+    def reset(self):
+        """Call on every (re)connect: nothing is known about a freshly booted ESP32."""
+        self.known_values = {}
+        self.in_flight = {}  # Values sent but not yet confirmed or rejected
+        self.batch_supported = True
+
+    def diff(self, config_values, keys=None):
+        keys = FIRMWARE_CONFIG_KEYS if keys is None else [k for k in keys if k in FIRMWARE_CONFIG_KEYS]
+        expected = dict(self.known_values, **self.in_flight)
+        return {key: config_values[key] for key in keys
+                if key in config_values and expected.get(key) != config_values[key]}
+
+    def push(self, config_values, keys=None, now=0.0):
+        """
+        Sends the minimal diff for `keys` (all firmware keys if None). Returns a CommandFuture
+        whose `applied`/`rejected` attributes list config keys once it resolves.
+        """
+        changes = self.diff(config_values, keys)
+        result = CommandFuture("setconfigs", DEFAULT_COMMAND_TIMEOUT_S, now)
+        result.applied, result.rejected = [], []
+        if not changes:
+            result.resolve(True, now, reply="Nothing to send")
+            return result
+        self.in_flight.update(changes)
+        result.add_done_callback(lambda _result: self._settle(changes))
+        if self.batch_supported:
+            batch = self.send_async(build_setconfigs_command(changes))
+            batch.add_done_callback(lambda f: self._on_batch_done(f, changes, result))
+        else:
+            self._push_individually(changes, result)
+        return result
+
+    def _on_batch_done(self, batch, changes, result):
+        if not batch.ok and batch.error and batch.error.startswith("Unknown command"):
+            print("DeviceConfigSync: Firmware has no 'setconfigs', falling back to one setconfig per key.")
+            self.batch_supported = False
+            self._push_individually(changes, result)
+            return
+        if batch.ok and batch.reply and batch.reply.startswith(SETCONFIGS_ACK_PREFIX):
+            applied, rejected = parse_applied_rejected(batch.reply)
+            self._record(changes, _config_keys(applied), _config_keys(rejected), result)
+            result.resolve(not result.rejected, batch.finished_at, batch.reply,
+                           None if not result.rejected else "rejected: " + ", ".join(result.rejected))
+        else:
+            result.rejected = list(changes)
+            result.resolve(False, batch.finished_at, batch.reply, batch.error)
+
+    def _push_individually(self, changes, result):
+        futures = {key: self.send_async(f"setconfig {key.lower()} {value}") for key, value in changes.items()}
+        def on_all_done(_futures):
+            applied = [key for key, f in futures.items() if f.ok]
+            rejected = [key for key, f in futures.items() if not f.ok]
+            self._record(changes, applied, rejected, result)
+            finished_at = max(f.finished_at for f in futures.values())
+            result.resolve(not rejected, finished_at, error=None if not rejected else "rejected: " + ", ".join(rejected))
+        gather(futures.values(), on_all_done)
+
+    def _settle(self, changes):
+        """The push of `changes` has resolved: they are known (if applied) or to be sent again."""
+        for key, value in changes.items():
+            if key in self.in_flight and self.in_flight[key] == value:
+                del self.in_flight[key]
+
+    def _record(self, changes, applied, rejected, result):
+        for key in applied:
+            if key in changes:
+                self.known_values[key] = changes[key]
+        result.applied, result.rejected = applied, rejected
+
+    # --- Whole-config transfer ---
+    def download(self, now=0.0):
+        """
+        Reads every scalar and target array with one 'dumpconfig'. Returns a CommandFuture
+        whose `values` attribute holds the decoded CONFIG_VALUES keys once it resolves.
+        """
+        result = CommandFuture("dumpconfig", DEFAULT_COMMAND_TIMEOUT_S, now)
+        result.values = {}
+        def on_done(dump):
+            if not dump.ok or not dump.reply or not dump.reply.startswith(CONFIG_DUMP_PREFIX):
+                result.resolve(False, dump.finished_at, dump.reply, dump.error or "no config dump received")
+                return
+            try:
+                result.values = decode_config_blob(dump.reply)
+            except ValueError as e:
+                result.resolve(False, dump.finished_at, dump.reply, str(e))
+                return
+            self.known_values.update({k: v for k, v in result.values.items() if k in FIRMWARE_CONFIG_KEYS})
+            result.resolve(True, dump.finished_at, dump.reply)
+        self.send_async("dumpconfig").add_done_callback(on_done)
+        return result
+
+    def upload(self, config_values, now=0.0):
+        """Writes every scalar and target array with one 'loadconfig'. Same result shape as push()."""
+        result = CommandFuture("loadconfig", DEFAULT_COMMAND_TIMEOUT_S, now)
+        result.applied, result.rejected = [], []
+        blob = encode_config_blob(config_values)
+        sent = {key: config_values[key] for key in FIRMWARE_CONFIG_KEYS if key in config_values}
+        def on_done(load):
+            if load.ok and load.reply and load.reply.startswith(LOADCONFIG_ACK_PREFIX):
+                applied, rejected = parse_applied_rejected(load.reply)
+                self._record(sent, _config_keys(applied), _config_keys(rejected), result)
+                result.resolve(not result.rejected, load.finished_at, load.reply,
+                               None if not result.rejected else "rejected: " + ", ".join(result.rejected))
+            else:
+                result.resolve(False, load.finished_at, load.reply, load.error)
+        self.send_async(f"loadconfig {blob}").add_done_callback(on_done)
+        return result
@@ -0,0 +1,1144 @@
+import argparse
+import collections
+import heapq
+import json
+import math
+import os
+import select
+import threading
+import time
+
+from utils.command_futures import CommandTracker
+from utils.config_sync import fletcher16
+from utils.position_stream import PositionStreamEncoder, STREAM_MAX_HZ
+
+# --- Firmware simulator ---
+# A pure-Python stand-in for configuration_firmware.ino. FirmwareSimulator is the
+# firmware itself, driven in simulated milliseconds (no Qt, no serial, no wall clock);
+# PtySimulator puts it behind a pseudo-terminal so SerialHandler can connect to it like
+# a real ESP32. Blocking firmware code (delays, safety homing before a manual cart move,
+# ...) runs to completion inside a single command, exactly like on the device, and its
+# output lines carry the simulated time at which the firmware would have printed them.
+# 'take', 'release' and 'do' run step by step from loop() (advance()), with the same
+# steps, states and progress events as the firmware.
+
+SIM_TICK_MS = 1.0            # Physics step; the real loop() runs much faster, 1 ms is plenty
+SIM_BAUDRATE = 115200
+HOMING_TIMEOUT_MS = 20000
+SAFETY_HOMING_TIMEOUT_MS = 15000
+JOG_STOP_RUN_MS = 100
+ACTUATOR_FULL_TRAVEL_MS = 600 # Physical end-to-end time of the linear actuator
+SEQ_MOVE_TIMEOUT_MS = 20000
+
+# One step of a 'take'/'release'/'do' sequence; see _run_seq_step() for the arguments
+SeqStep = collections.namedtuple("SeqStep", "kind state phase a b c")
+SEQ_KEEP = None # 'move' step: leave this stepper where it is
+SEQUENCE_ALLOWED_COMMANDS = ("help", "ping", "getallpos", "getpos", "stream", "getsquarepos",
+                             "getcaptpos", "dumpconfig", "stop")
+
+# Steps between each axis and its endstop at power-up (the firmware only learns this by homing)
+DEFAULT_PHYSICAL_POSITIONS = {"cart": 1500, "orb": 900, "capt": 400}
+
+# Lost steps: above its (speed, acceleration) limit an axis' motor can't follow the step
+# pulses and misses a share of them, growing with the excess. The counted position still
+# reaches the target; only re-homing ('homecheck') reveals the difference. Moving towards
+# the endstop the load helps, so fewer steps are missed and back-and-forth moves don't cancel out.
+DEFAULT_STALL_LIMITS = {"cart": (7000.0, 14000.0), "orb": (6000.0, 11000.0), "capt": (8000.0, 16000.0)}
+STALL_SLIP_GAIN = 0.5 # Share of steps missed per 100 % over the limit
+STALL_MAX_SLIP = 0.5
+STALL_HOMEWARD_FACTOR = 0.5
+
+# Firmware config globals and their defaults, in the order 'dumpconfig' prints them
+FIRMWARE_DEFAULTS = {
+    "stepper_speed": 4000.0, "stepper_accel": 5000.0, "gripperopen": 160, "gripperclose": 50,
+    "gripper_rot_board": 180, "gripper_rot_capture": 62, "cart_capture_pos": 2250,
+    "cart_safety_threshold": 2250, "cart_capture_home_threshold": 800, "actuator_travel_time_ms": 650,
+    "homing_speed_capture": 1000.0, "homing_speed_cart_orb": 1000.0, "homing_accel": 1500.0,
+    "manual_jog_cart_speed": 1500.0, "manual_jog_orb_speed": 1000.0, "manual_jog_capture_speed": 800.0,
+    "cart_min_pos": 10, "cart_max_pos": 4400, "orb_min_pos": 10, "orb_max_pos": 6000,
+    "capture_min_pos": 100, "capture_max_pos": 6100,
+}
+FIRMWARE_TARGETS = {
+    "orbtargets": [4100, 3280, 2500, 1700, 900, 80, 5700, 4950],
+    "carttargets": [4500, 3900, 3400, 2750, 2050, 1400, 725, 0],
+    "capturetargets": [
+        2780, 2600, 2420, 2240, 2060, 1880, 1700, 1520, 1300, 1130, 920, 720,
+        550, 380, 200, 0, 6250, 6050, 5850, 5700, 5500, 5300, 5150, 4950,
+        4750, 4580, 4380, 4210, 4020, 3840, 3650, 3480,
+    ],
+}
+
+HELP_LINES = (
+    "--- Calibration Firmware Help ---",
+    "#<id> <command>         - Run command between 'BEGIN #<id>' and 'DONE #<id>'",
+    "ping                    - Test connection",
+    "getallpos               - Get current stepper/servo positions & sensor",
+    "getpos <id>             - Get specific stepper pos (capt, cart, orb)",
+    "stream <hz>             - Push position frames at <hz> (1-50, 0 = off)",
+    "homeall                 - Start homing all steppers",
+    "sethome <id>            - Set current pos of stepper (capt,cart,orb) to 0",
+    "homecheck <id>          - Re-home one stepper, report its pos at the endstop (lost steps)",
+    "gotocart <pos>          - Move Cart stepper",
+    "gotoorb <pos>           - Move Orb stepper",
+    "gotocapt <pos>          - Move Capture stepper",
+    "servorot <angle>        - Set Rotation Servo (0-180)",
+    "servogrip <angle>       - Set Gripper Servo",
+    "gripopen                - Open gripper fully",
+    "gripclose               - Close gripper fully",
+    "la_ext_timed            - Extend linear actuator for configured time",
+    "la_ret                  - Retract LA for time, stops early on sensor",
+    "la_ext / la_ret_nosensor- Start continuous extend/retract (for jog)",
+    "la_stop                 - Stop linear actuator",
+    "jog <id> <dir (1/0)>    - Start continuous jog (cart,orb,capt)",
+    "jogstop                 - Stop any active stepper jog",
+    "take                    - Execute test Take sequence",
+    "release                 - Execute test Release sequence",
+    "do <from_sq> <to_sq>    - Execute test Do sequence (e.g., do a1 capt5)",
+    "stop                    - Stop steppers, actuator and any running sequence",
+    "  take/release/do report progress as 'EVT: {json}' lines and refuse",
+    "  motion commands until they finish (queries and 'stop' still work)",
+    "getsquarepos <sq>       - Get target stepper values for board square (e.g., a1)",
+    "getcaptpos <slot_num>   - Get target stepper value for capture slot (1-32)",
+    "setconfig <key> <value> - Set one config value",
+    "setconfigs k=v k=v ...  - Set many config values, one ACK lists applied/rejected",
+    "dumpconfig              - Print all config values and targets as one CFG line",
+    "loadconfig <sum> <data> - Apply a CFG line produced by dumpconfig",
+    "-------------------------------",
+)
+
+
+def _to_int(text):
+    """Arduino String.toInt(): leading integer, 0 if there is none."""
+    text = text.strip()
+    end = 1 if text[:1] in "+-" else 0
+    while end < len(text) and text[end].isdigit():
+        end += 1
+    try:
+        return int(text[:end])
+    except ValueError:
+        return 0
+
+def _to_float(text):
+    """Arduino String.toFloat(): leading number, 0.0 if there is none."""
+    text = text.strip()
+    for end in range(len(text), 0, -1):
+        try:
+            return float(text[:end])
+        except ValueError:
+            continue
+    return 0.0
+
+def _constrain(value, low, high):
+    return low if value < low else high if value > high else value
+
+
+class SimStepper:
+    """
+    AccelStepper-style trapezoidal motion. `position` is the counted position that
+    currentPosition() reports; `origin` is where counted 0 sits physically, so the
+    endstop (physical 0) is only found by homing, like on the real machine.
+    """
+
+    def __init__(self, physical_position, max_speed, accel, stall_limits=None):
+        self.stall_speed, self.stall_accel = stall_limits or (None, None)
+        self.position = 0.0
+        self.origin = float(physical_position)
+        self.target = 0.0
+        self.speed = 0.0         # steps/s, signed
+        self.jog_speed = 0.0     # Constant speed set by setSpeed() for manual jogs
+        self.max_speed = max_speed
+        self.accel = accel
+
+    def current_position(self):
+        return int(round(self.position))
+
+    def physical_position(self):
+        return self.origin + self.position
+
+    def at_endstop(self):
+        return self.physical_position() <= 0
+
+    def distance_to_go(self):
+        return int(round(self.target - self.position))
+
+    def is_moving(self):
+        return self.jog_speed != 0 or self.speed != 0 or self.distance_to_go() != 0
+
+    def move_to(self, position):
+        self.jog_speed = 0.0
+        self.target = float(position)
+
+    def move(self, relative):
+        self.move_to(self.position + relative)
+
+    def set_speed(self, speed):
+        self.jog_speed = float(speed)
+        if speed == 0:
+            self.speed = 0.0
+            self.target = self.position
+
+    def set_current_position(self, position):
+        self.origin += self.position - position
+        self.position = self.target = float(position)
+        self.speed = self.jog_speed = 0.0
+
+    def place(self, position):
+        """Homed and standing still at `position` (counted and physical)."""
+        self.origin = 0.0
+        self.position = self.target = float(position)
+        self.speed = self.jog_speed = 0.0
+
+    def stop(self):
+        """Decelerates to a halt as quickly as the acceleration allows."""
+        self.jog_speed = 0.0
+        stopping = self.speed * self.speed / (2.0 * self.accel) if self.accel > 0 else 0.0
+        self.target = self.position + math.copysign(stopping, self.speed)
+
+    def run(self, dt_s):
+        self._advance(dt_s)
+        if self.physical_position() < 0:
+            self.origin = -self.position # Mechanical stop just past the endstop switch
+
+    def _advance(self, dt_s):
+        if self.jog_speed:
+            self.speed = self.jog_speed
+            self.position += self.jog_speed * dt_s
+            self.target = self.position
+            return
+        distance = self.target - self.position
+        if abs(distance) < 0.5 and abs(self.speed) <= self.accel * dt_s:
+            self.position, self.speed = self.target, 0.0
+            return
+        direction = 1.0 if distance > 0 else -1.0
+        dv = self.accel * dt_s
+        if self.speed * direction < 0:
+            self.speed += direction * dv # Still heading the wrong way: brake first
+        else:
+            brake_limit = math.sqrt(2.0 * self.accel * abs(distance))
+            self.speed = direction * min(abs(self.speed) + dv, self.max_speed, max(brake_limit, dv))
+        step = self.speed * dt_s
+        before = self.position
+        accelerating = abs(self.speed) < self.max_speed # Accelerating, braking or turning around
+        if self.speed * direction > 0 and abs(step) >= abs(distance):
+            self.position, self.speed = self.target, 0.0
+        else:
+            self.position += step
+        slip = self._slip(abs(step) / dt_s if dt_s else 0.0, accelerating)
+        if direction < 0:
+            slip *= STALL_HOMEWARD_FACTOR
+        if slip:
+            self.origin -= (self.position - before) * slip # Counted, but the motor didn't move
+
+    def _slip(self, speed, accelerating):
+        """Share of this tick's steps the motor misses."""
+        excess = 0.0
+        if self.stall_speed and speed > self.stall_speed:
+            excess = speed / self.stall_speed - 1.0
+        if self.stall_accel and accelerating and self.accel > self.stall_accel:
+            excess = max(excess, self.accel / self.stall_accel - 1.0)
+        return min(STALL_MAX_SLIP, excess * STALL_SLIP_GAIN)
+
+
+class FirmwareSimulator:
+    """
+    The calibration firmware's command set and loop(), in simulated time.
+    feed() takes serial input, advance() runs loop() for a while, and take_output()
+    returns the (time_ms, line) pairs printed since the last call.
+    """
+
+    def __init__(self, physical_positions=None, max_stream_hz=STREAM_MAX_HZ, stall_limits=None):
+        self.now_ms = 0.0
+        self.output = []
+        self.input_buffer = ""
+        self.config = dict(FIRMWARE_DEFAULTS)
+        self.targets = {key: list(values) for key, values in FIRMWARE_TARGETS.items()}
+
+        positions = dict(DEFAULT_PHYSICAL_POSITIONS)
+        positions.update(physical_positions or {})
+        speed, accel = self.config["stepper_speed"], self.config["stepper_accel"]
+        limits = DEFAULT_STALL_LIMITS if stall_limits is None else stall_limits # {} for perfect motors
+        self.cart = SimStepper(positions["cart"], speed, accel, limits.get("cart"))
+        self.orb = SimStepper(positions["orb"], speed, accel, limits.get("orb"))
+        self.capture = SimStepper(positions["capt"], speed, accel, limits.get("capt"))
+        self.steppers = {"cart": self.cart, "orb": self.orb, "capt": self.capture}
+
+        self.rot_servo = self.config["gripper_rot_board"]
+        self.grip_servo = self.config["gripperopen"]
+        self.actuator_extension = 0.0 # 0 = fully retracted, 1 = fully extended
+        self.actuator_direction = 0
+
+        self.homing = False
+        self.homed = {"capt": False, "cart": False, "orb": False}
+        self.homing_started_ms = 0.0
+        self.jogging = None
+
+        self.seq_active = False
+        self.seq_name = ""
+        self.seq_steps = []
+        self.seq_index = 0
+        self.seq_entered = False
+        self.seq_started_by_command = False
+        self.seq_done_tag = ""
+        self.seq_start_ms = self.seq_step_start_ms = self.seq_sub_start_ms = 0.0
+        self.seq_sub_state = 0
+        self.seq_saved_capture = None # (max speed, accel) while safety-homing the capture wheel
+
+        self.max_stream_hz = max_stream_hz
+        self.stream_interval_ms = 0
+        self.last_stream_frame_ms = 0.0
+        self.stream_encoder = PositionStreamEncoder()
+
+        self._commands = {
+            "help": self._cmd_help, "ping": lambda args: self._println("ACK: pong"),
+            "getallpos": lambda args: self._send_all_positions(), "getpos": self._cmd_getpos,
+            "stream": self._cmd_stream, "homeall": self._cmd_homeall, "sethome": self._cmd_sethome,
+            "homecheck": self._cmd_homecheck,
+            "gotocart": lambda args: self._stepper_move(self.cart, _to_int(args)),
+            "gotoorb": lambda args: self._stepper_move(self.orb, _to_int(args)),
+            "gotocapt": lambda args: self._stepper_move(self.capture, _to_int(args)),
+            "servorot": self._cmd_servorot, "servogrip": self._cmd_servogrip,
+            "gripopen": self._cmd_gripopen, "gripclose": self._cmd_gripclose,
+            "la_ext": lambda args: self._extend_actuator(False),
+            "la_ext_timed": lambda args: self._extend_actuator(True),
+            "la_ret": lambda args: self._retract_actuator(True, True),
+            "la_ret_nosensor": lambda args: self._retract_actuator(False, False),
+            "la_stop": lambda args: self._stop_actuator(),
+            "jog": self._cmd_jog, "jogstop": lambda args: self._stop_jog(), "stop": self._cmd_stop,
+            "take": lambda args: self._take_sequence(), "release": lambda args: self._release_sequence(),
+            "do": self._cmd_do, "getsquarepos": self._cmd_getsquarepos, "getcaptpos": self._cmd_getcaptpos,
+            "setconfig": self._cmd_setconfig, "setconfigs": self._cmd_setconfigs,
+            "dumpconfig": lambda args: self._cmd_dumpconfig(), "loadconfig": self._cmd_loadconfig,
+        }
+
+        self._println("ACK: Calibration Firmware Ready. Send 'help'.")
+        self._println("INFO: Homing required. Send 'homeall'.")
+
+    # --- Host interface ---
+    def feed(self, data):
+        """Serial input (str or bytes); every complete line is executed immediately."""
+        if isinstance(data, bytes):
+            data = data.decode("ascii", errors="ignore")
+        for char in data:
+            if char in "\r\n":
+                if self.input_buffer:
+                    line, self.input_buffer = self.input_buffer, ""
+                    self.handle_command_line(line)
+            elif char.isprintable():
+                self.input_buffer += char
+        self._tick_sequence() # The rest of this loop() pass
+    def advance(self, duration_ms):
+        """Runs loop() for duration_ms of simulated time."""
+        end_ms = self.now_ms + duration_ms
+        while self.now_ms < end_ms:
+            if self._is_idle():
+                # Nothing can change until the next stream keyframe is due
+                next_ms = end_ms
+                if self.stream_interval_ms:
+                    next_ms = min(end_ms, self.last_stream_frame_ms + self.stream_interval_ms)
+                self.now_ms = max(self.now_ms, next_ms)
+                self._service_stream()
+                continue
+            dt = min(SIM_TICK_MS, end_ms - self.now_ms)
+            if self.homing:
+                self._tick(dt, self._homing_steppers())
+                self._handle_homing()
+            else:
+                self._tick(dt, self.steppers.values())
+            self._tick_sequence()
+            self._service_stream()
+
+    def take_output(self):
+        output, self.output = self.output, []
+        return output
+
+    def positions(self):
+        """The values getallpos would report, keyed like the Pos message fields."""
+        return {
+            "cart_pos": self.cart.current_position(), "orb_pos": self.orb.current_position(),
+            "capt_pos": self.capture.current_position(), "rot_servo": self.rot_servo,
+            "grip_servo": self.grip_servo, "actuator_sensor": self._actuator_sensor(),
+        }
+
+    def place(self, cart, orb, capt, rot):
+        """Homes everything and puts it at the given positions at once, as a starting point for host-side tools."""
+        for stepper, position in ((self.cart, cart), (self.orb, orb), (self.capture, capt)):
+            stepper.place(position)
+        self.homed = {"capt": True, "cart": True, "orb": True}
+        self.rot_servo = rot
+
+    # --- Internals: time and physics ---
+    def _println(self, text):
+        self.output.append((self.now_ms, text))
+
+    def _is_idle(self):
+        return not self.homing and not self.seq_active and self.actuator_direction == 0 and \
+               not any(stepper.is_moving() for stepper in self.steppers.values())
+
+    def _tick(self, dt_ms, running_steppers):
+        for stepper in running_steppers:
+            stepper.run(dt_ms / 1000.0)
+        if self.actuator_direction:
+            step = self.actuator_direction * dt_ms / ACTUATOR_FULL_TRAVEL_MS
+            self.actuator_extension = _constrain(self.actuator_extension + step, 0.0, 1.0)
+        self.now_ms += dt_ms
+
+    def _delay(self, ms):
+        """delay(): time passes, the actuator keeps moving, steppers do not step."""
+        end_ms = self.now_ms + ms
+        while self.now_ms < end_ms:
+            self._tick(min(SIM_TICK_MS, end_ms - self.now_ms), ())
+
+    def _actuator_sensor(self):
+        return 1 if self.actuator_extension <= 0.0 else 0 # HIGH when fully retracted
+
+    def _service_stream(self):
+        if not self.stream_interval_ms or self.now_ms - self.last_stream_frame_ms < self.stream_interval_ms:
+            return
+        self.last_stream_frame_ms = self.now_ms
+        frame = self.stream_encoder.encode(self.positions(), self.now_ms)
+        if frame:
+            self._println(frame)
+
+    # --- Command dispatch ---
+    def handle_command_line(self, line):
+        line = line.strip()
+        seq_tag = ""
+        if line.startswith("#"):
+            space = line.find(" ")
+            if space == -1:
+                self._println("ERR: Missing command after sequence tag")
+                return
+            seq_tag, line = line[1:space], line[space + 1:]
+            self._println("BEGIN #" + seq_tag)
+        self.seq_started_by_command = False
+        self._process_command(line)
+        if not seq_tag:
+            return
+        if self.seq_started_by_command:
+            self.seq_done_tag = seq_tag # Answered when the sequence ends
+        else:
+            self._println("DONE #" + seq_tag)
+
+    def _process_command(self, cmd):
+        cmd = cmd.strip()
+        key, _, args = cmd.partition(" ")
+        handler = self._commands.get(key.lower())
+        if self.seq_active and key.lower() not in SEQUENCE_ALLOWED_COMMANDS:
+            self._println(f"ERR: Busy: '{self.seq_name}' sequence running (send 'stop')")
+        elif handler is None:
+            self._println("ERR: Unknown command: " + key.lower())
+        else:
+            handler(args)
+
+    def _cmd_help(self, args):
+        for line in HELP_LINES:
+            self._println(line)
+
+    def _send_all_positions(self):
+        pos = self.positions()
+        doc = {"cartPos": pos["cart_pos"], "orbPos": pos["orb_pos"], "captPos": pos["capt_pos"],
+               "rotServo": pos["rot_servo"], "gripServo": pos["grip_servo"], "actuatorSensor": pos["actuator_sensor"]}
+        self._println("POS: " + json.dumps(doc, separators=(",", ":")))
+
+    def _cmd_getpos(self, stepper_id):
+        stepper_id = stepper_id.lower()
+        if stepper_id in self.steppers:
+            self._println(f"SPOS: {stepper_id} {self.steppers[stepper_id].current_position()}")
+        else:
+            self._println("ERR: Unknown stepper ID for getpos: " + stepper_id)
+
+    def _cmd_stream(self, args):
+        hz = _to_int(args)
+        if hz <= 0:
+            self.stream_interval_ms = 0
+            self._println("ACK: Stream off")
+            return
+        hz = _constrain(hz, 1, self.max_stream_hz)
+        self.stream_interval_ms = 1000 // hz
+        self.stream_encoder.last_keyframe_ms = None # Next frame is a keyframe
+        self._println(f"ACK: Stream at {hz} Hz")
+
+    # --- Motion ---
+    def _stepper_move(self, stepper, position):
+        if stepper is self.cart:
+            self._enforce_all_safety_for_cart(position)
+        elif stepper is self.orb and self.rot_servo != self.config["gripper_rot_board"]:
+            self.rot_servo = self.config["gripper_rot_board"]
+            self._delay(400) # Wait for safe rotation
+        stepper.move_to(position)
+        self._println(f"ACK: Stepper moving to {position}")
+
+    def _enforce_cart_safety_rotation(self, target_cart_pos):
+        if target_cart_pos < self.config["cart_safety_threshold"] and self.rot_servo != self.config["gripper_rot_board"]:
+            self._println("SAFETY: Cart target low, forcing gripper to board angle.")
+            self.rot_servo = self.config["gripper_rot_board"]
+            self._delay(500)
+
+    def _enforce_capture_homed_for_low_cart(self, target_cart_pos):
+        if target_cart_pos >= self.config["cart_capture_home_threshold"] or self.capture.current_position() == 0:
+            return
+        self._println("SAFETY: Cart target very low, forcing Capture home.")
+        speed, accel = self.capture.max_speed, self.capture.accel
+        self.capture.max_speed = abs(self.config["homing_speed_capture"])
+        self.capture.accel = self.config["homing_accel"]
+        self.capture.move(-30000)
+        start_ms = self.now_ms
+        homed = False
+        while not homed and self.now_ms - start_ms < SAFETY_HOMING_TIMEOUT_MS:
+            if self.capture.at_endstop():
+                self.capture.stop()
+                self.capture.set_current_position(0)
+                homed = True
+                self._println("  SAFETY: Capture homed.")
+            else:
+                self._tick(SIM_TICK_MS, (self.capture,))
+        if not homed:
+            self._println("ERR: SAFETY Capture homing timeout!")
+            self.capture.stop()
+        else:
+            self.homed["capt"] = True
+        self.capture.max_speed, self.capture.accel = speed, accel
+        while self.capture.is_moving(): # runToPosition()
+            self._tick(SIM_TICK_MS, (self.capture,))
+
+    def _enforce_all_safety_for_cart(self, target_cart_pos):
+        self._enforce_capture_homed_for_low_cart(target_cart_pos)
+        self._enforce_cart_safety_rotation(target_cart_pos)
+
+    def _cmd_homeall(self, args):
+        if self.homing:
+            self._println("ERR: Homing already in progress.")
+            return
+        self._println("ACK: Homing sequence started...")
+        self.homing = True
+        self.homed = {"capt": False, "cart": False, "orb": False}
+        self._println("  Homing Capture stepper...")
+        self.capture.max_speed = self.config["homing_speed_capture"]
+        self.capture.accel = self.config["homing_accel"]
+        self.capture.move(-30000)
+        self.homing_started_ms = self.now_ms
+
+    def _cmd_homecheck(self, stepper_id):
+        """homeCheck(): drives one axis onto its endstop and reports where it counted it."""
+        stepper_id = stepper_id.strip().lower()
+        stepper = self.steppers.get(stepper_id)
+        if stepper is None:
+            self._println("ERR: Unknown stepper ID for homecheck: " + stepper_id)
+            return
+        if stepper is self.cart:
+            self._enforce_all_safety_for_cart(0)
+        elif stepper is self.orb and self.rot_servo != self.config["gripper_rot_board"]:
+            self.rot_servo = self.config["gripper_rot_board"]
+            self._delay(400)
+        speed, accel = stepper.max_speed, stepper.accel
+        homing_speed = self.config["homing_speed_capture"] if stepper is self.capture else self.config["homing_speed_cart_orb"]
+        stepper.max_speed, stepper.accel = abs(homing_speed), self.config["homing_accel"]
+        stepper.move(-30000)
+        start_ms = self.now_ms
+        trigger_position = None
+        while trigger_position is None and self.now_ms - start_ms < SAFETY_HOMING_TIMEOUT_MS:
+            if stepper.at_endstop():
+                trigger_position = stepper.current_position()
+                stepper.stop()
+                stepper.set_current_position(0)
+                self.homed[stepper_id] = True
+            else:
+                self._tick(SIM_TICK_MS, (stepper,))
+        stepper.max_speed, stepper.accel = speed, accel
+        if trigger_position is None:
+            stepper.stop()
+            self._println("ERR: homecheck timeout for " + stepper_id)
+        else:
+            self._println(f"HOMECHECK: {stepper_id} {trigger_position}")
+
+    def _homing_steppers(self):
+        if not self.homed["capt"]:
+            return (self.capture,)
+        return [self.steppers[name] for name in ("cart", "orb") if not self.homed[name]]
+
+    def _handle_homing(self):
+        """handleHoming(): the physics for this tick has already run for the active axes."""
+        timed_out = self.now_ms - self.homing_started_ms > HOMING_TIMEOUT_MS
+        if not self.homed["capt"]:
+            if self.capture.at_endstop():
+                self.capture.stop()
+                self.capture.set_current_position(0)
+                self.homed["capt"] = True
+                self._println("  Capture stepper homed at 0.")
+                self.capture.max_speed, self.capture.accel = self.config["stepper_speed"], self.config["stepper_accel"]
+                self._println("  Homing Cart and Orb steppers...")
+                for stepper in (self.cart, self.orb):
+                    stepper.max_speed = self.config["homing_speed_cart_orb"]
+                    stepper.accel = self.config["homing_accel"]
+                    stepper.move(-30000)
+                self.homing_started_ms = self.now_ms
+            elif timed_out:
+                self._println("ERR: Capture homing timeout!")
+                self.capture.stop()
+                self.homing = False
+            return
+        for name, label in (("cart", "Cart"), ("orb", "Orb")):
+            stepper = self.steppers[name]
+            if not self.homed[name] and stepper.at_endstop():
+                stepper.stop()
+                stepper.set_current_position(0)
+                self.homed[name] = True
+                self._println(f"  {label} stepper homed at 0.")
+                stepper.max_speed, stepper.accel = self.config["stepper_speed"], self.config["stepper_accel"]
+        if self.homed["cart"] and self.homed["orb"]:
+            self._println("ACK: All steppers homed.")
+            self.homing = False
+        elif timed_out:
+            self._println("ERR: Cart/Orb homing timeout!")
+            for name in ("cart", "orb"):
+                if not self.homed[name]:
+                    self.steppers[name].stop()
+            self.homing = False
+
+    def _cmd_sethome(self, stepper_id):
+        stepper_id = stepper_id.lower()
+        if stepper_id not in self.steppers:
+            self._println("ERR: Unknown stepper ID for sethome: " + stepper_id)
+            return
+        stepper = self.steppers[stepper_id]
+        stepper.stop()
+        stepper.set_current_position(0)
+        self.homed[stepper_id] = True
+        self._println(f"ACK: sethome {stepper_id} position set to 0.")
+        self._send_all_positions()
+
+    def _cmd_jog(self, args):
+        actuator_id, space, direction = args.partition(" ")
+        if space:
+            self._start_jog(actuator_id, _to_int(direction) == 1)
+
+    def _start_jog(self, actuator_id, positive):
+        self._stop_jog()
+        actuator_id = actuator_id.lower()
+        self._println(f"ACK: Jog Start - {actuator_id}{' POS' if positive else ' NEG'}")
+        sign = 1 if positive else -1
+        if actuator_id == "cart":
+            self.jogging = "cart"
+            self._enforce_all_safety_for_cart(self.cart.current_position() + sign * 1000)
+            self.cart.set_speed(sign * self.config["manual_jog_cart_speed"])
+        elif actuator_id == "orb":
+            self.jogging = "orb"
+            if self.rot_servo != self.config["gripper_rot_board"]:
+                self.rot_servo = self.config["gripper_rot_board"]
+                self._delay(400)
+            self.orb.set_speed(sign * self.config["manual_jog_orb_speed"])
+        elif actuator_id == "capt":
+            self.jogging = "capt"
+            self.capture.set_speed(sign * self.config["manual_jog_capture_speed"])
+        else:
+            self._println("ERR: Unknown actuator for jog: " + actuator_id)
+
+    def _stop_jog(self):
+        if self.jogging is None:
+            return
+        self._println("ACK: Jog Stop")
+        self.steppers[self.jogging].set_speed(0)
+        self.jogging = None
+        end_ms = self.now_ms + JOG_STOP_RUN_MS
+        while self.now_ms < end_ms:
+            self._tick(SIM_TICK_MS, self.steppers.values())
+
+    # --- Servos and actuator ---
+    def _cmd_servorot(self, args):
+        self.rot_servo = _constrain(_to_int(args), 0, 180)
+        self._println("ACK: Rotation Servo to " + args)
+
+    def _cmd_servogrip(self, args):
+        self.grip_servo = _constrain(_to_int(args), self.config["gripperclose"], self.config["gripperopen"])
+        self._println("ACK: Gripper Servo to " + args)
+
+    def _cmd_gripopen(self, args):
+        self.grip_servo = self.config["gripperopen"]
+        self._println("ACK: Gripper Open")
+
+    def _cmd_gripclose(self, args):
+        self.grip_servo = self.config["gripperclose"]
+        self._println("ACK: Gripper Close")
+
+    def _extend_actuator(self, timed):
+        self._println("CMD: Extend Actuator")
+        self.actuator_direction = 1
+        if timed:
+            self._delay(self.config["actuator_travel_time_ms"])
+            self._stop_actuator()
+            self._println("  Extend (timed) complete.")
+
+    def _retract_actuator(self, timed, use_sensor):
+        self._println("CMD: Retract Actuator")
+        self.actuator_direction = -1
+        if timed:
+            self._delay(self.config["actuator_travel_time_ms"])
+            sensor_triggered = use_sensor and self._actuator_sensor() == 1
+            self._stop_actuator()
+            if use_sensor:
+                self._println("  Retract (sensor) complete." if sensor_triggered else "WARN: Timed retract, sensor NOT triggered.")
+            else:
+                self._println("  Retract (timed) complete.")
+
+    def _stop_actuator(self):
+        self.actuator_direction = 0
+
+    # --- Sequences ('take', 'release', 'do'): steps ticked from loop() ---
+    def _emit_seq_event(self, event, state=None, msg=None):
+        doc = {"seq": self.seq_name, "ev": event}
+        if state is not None:
+            doc.update(state=state, phase=self.seq_steps[self.seq_index].phase, step=self.seq_index + 1)
+        if state is not None or event == "start":
+            doc["steps"] = len(self.seq_steps)
+        if msg is not None:
+            doc["msg"] = msg
+        doc["ms"] = int(self.now_ms - self.seq_start_ms)
+        self._println("EVT: " + json.dumps(doc, separators=(",", ":")))
+
+    def _move_steps(self, location, phase):
+        kind, orb, cart, capt, rot = location
+        steps = [SeqStep("safety", "SAFETY", phase, cart, 0, 0)]
+        if kind == "board":
+            return steps + [
+                SeqStep("rotate", "ROTATE", phase, rot, 400, True),
+                SeqStep("move", "MOVE_BOARD", phase, cart, orb, capt),
+                SeqStep("wait", "WAIT_BOARD", phase, 0, 0, 0),
+            ]
+        return steps + [
+            SeqStep("rotate", "ROTATE_BOARD_ANGLE", phase, self.config["gripper_rot_board"], 400, True),
+            SeqStep("move", "MOVE_CART_ORB", phase, cart, orb, SEQ_KEEP),
+            SeqStep("wait", "WAIT_CART_ORB", phase, 0, 0, 0),
+            SeqStep("move", "MOVE_CAPTURE", phase, SEQ_KEEP, SEQ_KEEP, capt),
+            SeqStep("wait", "WAIT_CAPTURE", phase, 0, 0, 0),
+            SeqStep("rotate", "ROTATE_CAPTURE_ANGLE", phase, rot, 400, False),
+        ]
+
+    def _take_steps(self):
+        return [
+            SeqStep("grip", "GRIP_OPEN", "take", self.config["gripperopen"], 300, 0),
+            SeqStep("extend", "EXTEND", "take", 0, 0, 0),
+            SeqStep("grip", "GRIP_CLOSE", "take", self.config["gripperclose"], 700, 0),
+            SeqStep("retract", "RETRACT", "take", True, 0, 0), # Use sensor for take
+        ]
+
+    def _release_steps(self):
+        return [
+            SeqStep("extend", "EXTEND", "release", 0, 0, 0),
+            SeqStep("grip", "GRIP_OPEN", "release", self.config["gripperopen"], 300, 0),
+            SeqStep("retract", "RETRACT", "release", False, 0, 0),
+        ]
+
+    def _start_sequence(self, name, steps):
+        self.seq_name, self.seq_steps, self.seq_index = name, steps, 0
+        self.seq_entered = False
+        self.seq_active = self.seq_started_by_command = True
+        self.seq_start_ms = self.now_ms
+        self._emit_seq_event("start")
+
+    def _end_sequence(self, event, msg=None):
+        if self.seq_saved_capture is not None:
+            self.capture.max_speed, self.capture.accel = self.seq_saved_capture
+            self.seq_saved_capture = None
+        self.seq_active = False
+        self._emit_seq_event(event, msg=msg)
+        if self.seq_done_tag:
+            self._println("DONE #" + self.seq_done_tag)
+            self.seq_done_tag = ""
+
+    def _cmd_stop(self, args):
+        self._stop_jog()
+        for stepper in self.steppers.values():
+            stepper.stop()
+        self._stop_actuator()
+        if self.seq_active:
+            self._end_sequence("stopped")
+        self._println("ACK: Stopped")
+
+    def _tick_sequence(self):
+        while self.seq_active:
+            entering = not self.seq_entered
+            if entering:
+                self.seq_entered, self.seq_step_start_ms = True, self.now_ms
+            if not self._run_seq_step(self.seq_steps[self.seq_index], entering):
+                return # Still running (or failed)
+            self.seq_entered = False
+            self.seq_index += 1
+            if self.seq_index >= len(self.seq_steps):
+                self._end_sequence("done")
+
+    def _run_seq_step(self, step, entering):
+        """
+        runSeqStep(): True once the step is finished. Arguments: safety a=cart target;
+        rotate a=angle b=settle ms c=skip if already there; move a,b,c=cart,orb,capture
+        targets (SEQ_KEEP: don't move); grip a=angle b=settle ms; retract a=check the sensor.
+        """
+        elapsed = self.now_ms - self.seq_step_start_ms
+        if step.kind == "safety":
+            return self._run_safety_step(step.a, entering)
+        if step.kind == "rotate":
+            if entering:
+                if step.c and self.rot_servo == step.a:
+                    return True
+                self._emit_seq_event("state", step.state)
+                self.rot_servo = step.a
+            return elapsed >= step.b
+        if step.kind == "move":
+            self._emit_seq_event("state", step.state)
+            for stepper, target in ((self.cart, step.a), (self.orb, step.b), (self.capture, step.c)):
+                if target is not SEQ_KEEP:
+                    stepper.move_to(target)
+            return True
+        if step.kind == "wait":
+            if entering:
+                self._emit_seq_event("state", step.state)
+            if all(stepper.distance_to_go() == 0 for stepper in self.steppers.values()):
+                return True
+            if elapsed > SEQ_MOVE_TIMEOUT_MS:
+                for stepper in self.steppers.values():
+                    stepper.stop()
+                self._end_sequence("error", "Stepper move timeout")
+            return False
+        if step.kind == "grip":
+            if entering:
+                self._emit_seq_event("state", step.state)
+                self.grip_servo = step.a
+            return elapsed >= step.b
+        # extend / retract
+        if entering:
+            self._emit_seq_event("state", step.state)
+            self.actuator_direction = 1 if step.kind == "extend" else -1
+        if elapsed < self.config["actuator_travel_time_ms"]:
+            return False
+        sensor_triggered = self._actuator_sensor() == 1
+        self._stop_actuator()
+        if step.kind == "retract" and step.a and not sensor_triggered:
+            self._emit_seq_event("warn", msg="Timed retract, sensor NOT triggered")
+        return True
+
+    def _run_safety_step(self, target_cart_pos, entering):
+        """_enforce_all_safety_for_cart() without blocking."""
+        if entering:
+            self.seq_sub_state = 0
+        if self.seq_sub_state == 0:
+            if target_cart_pos < self.config["cart_capture_home_threshold"] and self.capture.current_position() != 0:
+                self._emit_seq_event("state", "SAFETY_HOME_CAPTURE")
+                self.seq_saved_capture = (self.capture.max_speed, self.capture.accel)
+                self.capture.max_speed = abs(self.config["homing_speed_capture"])
+                self.capture.accel = self.config["homing_accel"]
+                self.capture.move(-30000)
+                self.seq_sub_state = 1
+            else:
+                self.seq_sub_state = 2
+        if self.seq_sub_state == 1: # loop() runs the capture stepper towards its endstop
+            if not self.capture.at_endstop():
+                if self.now_ms - self.seq_step_start_ms >= SAFETY_HOMING_TIMEOUT_MS:
+                    self.capture.stop()
+                    self._end_sequence("error", "SAFETY Capture homing timeout")
+                return False
+            self.capture.stop()
+            self.capture.set_current_position(0)
+            self.homed["capt"] = True
+            self.capture.max_speed, self.capture.accel = self.seq_saved_capture
+            self.seq_saved_capture = None
+            self.seq_sub_state = 2
+        if self.seq_sub_state == 2:
+            if target_cart_pos >= self.config["cart_safety_threshold"] or self.rot_servo == self.config["gripper_rot_board"]:
+                return True
+            self._emit_seq_event("state", "SAFETY_ROTATE")
+            self.rot_servo = self.config["gripper_rot_board"]
+            self.seq_sub_start_ms = self.now_ms
+            self.seq_sub_state = 3
+        return self.now_ms - self.seq_sub_start_ms >= 500
+
+    def _take_sequence(self):
+        self._println("ACK: Executing Take Sequence...")
+        self._start_sequence("take", self._take_steps())
+
+    def _release_sequence(self):
+        self._println("ACK: Executing Release Sequence...")
+        self._start_sequence("release", self._release_steps())
+
+    def _cmd_do(self, args):
+        from_str, space, to_str = args.partition(" ")
+        if not space:
+            return
+        self._println(f"ACK: Executing Do Sequence: {from_str} -> {to_str}")
+        if not all(self.homed.values()):
+            self._println("ERR: Steppers not homed.")
+            return
+        source = self._parse_location(from_str)
+        dest = self._parse_location(to_str)
+        if source is None or dest is None:
+            self._println("ERR: Invalid loc in DO")
+            return
+        steps = self._move_steps(source, "source") + self._take_steps() + self._move_steps(dest, "dest") + self._release_steps()
+        self._start_sequence("do", steps)
+
+    # --- Targets ---
+    def _square_targets(self, square):
+        square = square.strip().lower()
+        if len(square) != 2:
+            self._println("ERR: Square fmt (e.g. a1)")
+            return None
+        file_char, rank_char = square
+        if not "a" <= file_char <= "h":
+            self._println("ERR: Invalid file")
+            return None
+        if not "1" <= rank_char <= "8":
+            self._println("ERR: Invalid rank")
+            return None
+        return (self.targets["orbtargets"][ord(file_char) - ord("a")],
+                self.targets["carttargets"][ord(rank_char) - ord("1")])
+
+    def _capture_target(self, slot):
+        if not 1 <= slot <= 32:
+            self._println("ERR: Invalid slot num")
+            return None
+        return self.targets["capturetargets"][slot - 1]
+
+    def _parse_location(self, location):
+        """parseLocationCalib(): (kind, orb, cart, capt, rot), or None if invalid."""
+        location = location.strip().lower()
+        if location.startswith("capt"):
+            if len(location) <= 4:
+                self._println("ERR: Capt num missing")
+                return None
+            capt = self._capture_target(_to_int(location[4:]))
+            if capt is None:
+                return None
+            return ("capture", self.orb.current_position(), self.config["cart_capture_pos"], capt,
+                    self.config["gripper_rot_capture"])
+        if len(location) == 2:
+            targets = self._square_targets(location)
+            if targets is None:
+                return None
+            return ("board", targets[0], targets[1], 0, self.config["gripper_rot_board"])
+        self._println("ERR: Invalid loc fmt: " + location)
+        return None
+
+    def _cmd_getsquarepos(self, square):
+        targets = self._square_targets(square)
+        if targets is None:
+            self._println("ERR: Invalid square for getsquarepos: " + square)
+            return
+        doc = {"square": square, "orb": targets[0], "cart": targets[1]}
+        self._println("SQPOS: " + json.dumps(doc, separators=(",", ":")))
+
+    def _cmd_getcaptpos(self, args):
+        slot = _to_int(args)
+        capture = self._capture_target(slot) if 1 <= slot <= 32 else None
+        if capture is None:
+            self._println(f"ERR: Invalid slot for getcaptpos: {slot}")
+            return
+        self._println("CAPTPOS: " + json.dumps({"slot": slot, "capture": capture}, separators=(",", ":")))
+
+    # --- Config ---
+    def _apply_config_value(self, key, value):
+        if key not in self.config:
+            return False
+        self.config[key] = _to_float(value) if isinstance(FIRMWARE_DEFAULTS[key], float) else _to_int(value)
+        if key == "stepper_speed":
+            for stepper in self.steppers.values():
+                stepper.max_speed = self.config[key]
+        elif key == "stepper_accel":
+            for stepper in self.steppers.values():
+                stepper.accel = self.config[key]
+        return True
+
+    def _apply_target_array(self, key, value):
+        if key not in self.targets:
+            return False
+        items = value.split(",")
+        if len(items) != len(self.targets[key]) or any(item == "" for item in items):
+            return False
+        self.targets[key] = [_to_int(item) for item in items]
+        return True
+
+    def _cmd_setconfig(self, args):
+        key, space, value = args.partition(" ")
+        if not space:
+            self._println("ERR: Invalid setconfig format. Use: setconfig <key> <value>")
+            return
+        key = key.lower()
+        if not self._apply_config_value(key, value):
+            self._println("ERR: Unknown config key: " + key)
+            return
+        self._println(f"ACK: Config '{key}' updated to {value}")
+
+    def _apply_pairs(self, pairs, apply):
+        applied, rejected = [], []
+        for pair in pairs:
+            if not pair:
+                continue
+            key, eq, value = pair.partition("=")
+            key = key.lower()
+            (applied if eq and apply(key, value) else rejected).append(key)
+        return ",".join(applied), ",".join(rejected)
+
+    def _cmd_setconfigs(self, args):
+        applied, rejected = self._apply_pairs(args.strip().split(" "), self._apply_config_value)
+        self._println(f"ACK: Configs applied={applied} rejected={rejected}")
+
+    def _cmd_dumpconfig(self):
+        entries = [f"{key}={value:.2f}" if isinstance(value, float) else f"{key}={value}"
+                   for key, value in self.config.items()]
+        entries += [f"{key}=" + ",".join(str(v) for v in values) for key, values in self.targets.items()]
+        payload = ";".join(entries)
+        self._println(f"CFG {fletcher16(payload):04x} {payload}")
+
+    def _cmd_loadconfig(self, args):
+        checksum, space, payload = args.strip().partition(" ")
+        if not space:
+            self._println("ERR: Invalid loadconfig format. Use: loadconfig <checksum> <payload>")
+            return
+        try:
+            valid = int(checksum, 16) == fletcher16(payload)
+        except ValueError:
+            valid = False
+        if not valid:
+            self._println("ERR: Config checksum mismatch")
+            return
+        apply = lambda key, value: self._apply_config_value(key, value) or self._apply_target_array(key, value)
+        applied, rejected = self._apply_pairs(payload.split(";"), apply)
+        self._println(f"ACK: Config loaded applied={applied} rejected={rejected}")
+
+
+class PtySimulator(threading.Thread):
+    """
+    Serves a FirmwareSimulator on a pseudo-terminal (Linux/macOS). Connect to `port_name`
+    like any serial port. Simulated time follows the wall clock (scaled by `speed`), and
+    output is paced to `baud` (None for an unlimited line rate, e.g. for load tests).
+    """
+
+    def __init__(self, simulator=None, speed=1.0, baud=SIM_BAUDRATE):
+        super().__init__(daemon=True)
+        import tty # Unix only; imported here so the simulator core stays importable everywhere
+        self.simulator = simulator if simulator is not None else FirmwareSimulator()
+        self.speed = speed
+        self.byte_time_ms = 10000.0 / baud if baud else 0.0 # 10 bits per byte on the wire
+        self.master_fd, self.slave_fd = os.openpty()
+        tty.setraw(self.slave_fd) # No echo or newline translation, like a UART
+        os.set_blocking(self.master_fd, False)
+        self.port_name = os.ttyname(self.slave_fd)
+        self.running = True
+        self.lines_sent = 0
+
+    def stop(self):
+        self.running = False
+        if self.is_alive():
+            self.join()
+        for fd in (self.master_fd, self.slave_fd):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+    def run(self):
+        started = time.monotonic()
+        outgoing = collections.deque() # (delivery time in sim ms, bytes)
+        incoming = bytearray()          # Input received while the firmware is busy
+        tx_free_ms = 0.0
+        while self.running:
+            sim_now = (time.monotonic() - started) * 1000.0 * self.speed
+            sim = self.simulator
+            if sim.now_ms < sim_now:
+                if incoming:
+                    data, incoming = bytes(incoming), bytearray()
+                    sim.feed(data)
+                sim.advance(sim_now - sim.now_ms)
+            for printed_ms, line in sim.take_output():
+                data = (line + "\r\n").encode("ascii", errors="replace")
+                tx_free_ms = max(tx_free_ms, printed_ms) + len(data) * self.byte_time_ms
+                outgoing.append((tx_free_ms, data))
+
+            while outgoing and outgoing[0][0] <= sim_now:
+                data = outgoing[0][1]
+                try:
+                    written = os.write(self.master_fd, data)
+                except BlockingIOError:
+                    break # Host isn't reading; hold the rest like a full UART FIFO
+                if written < len(data):
+                    outgoing[0] = (outgoing[0][0], data[written:])
+                    break
+                outgoing.popleft()
+                self.lines_sent += 1
+
+            wait_ms = SIM_TICK_MS
+            if outgoing:
+                wait_ms = max(0.0, min(wait_ms, outgoing[0][0] - sim_now))
+            readable, _, _ = select.select([self.master_fd], [], [], wait_ms / 1000.0 / self.speed)
+            if readable:
+                try:
+                    incoming += os.read(self.master_fd, 4096)
+                except (BlockingIOError, OSError):
+                    pass
+
+
+class SimulatorLink:
+    """
+    Talks to a FirmwareSimulator in-process, in simulated time and without a pty or Qt:
+    send_command_async() and call_later() stand in for SerialHandler.send_command_async()
+    and QTimer.singleShot(), so host-side tools can be run against the simulator from a
+    script. run() processes scheduled calls until none are left and every command has
+    finished.
+    """
+
+    def __init__(self, simulator=None):
+        self.simulator = simulator if simulator is not None else FirmwareSimulator()
+        self.tracker = CommandTracker()
+        self._scheduled = [] # heap of (due sim ms, order, callback)
+        self._order = 0
+
+    def _pump(self):
+        for printed_ms, line in self.simulator.take_output():
+            self.tracker.feed(line, printed_ms / 1000.0)
+
+    def advance(self, duration_ms):
+        self.simulator.advance(duration_ms)
+        self._pump()
+
+    def send_command_async(self, command, timeout_s=None):
+        future, wire_text = self.tracker.create(command, self.simulator.now_ms / 1000.0, timeout_s)
+        self.simulator.feed(wire_text + "\n")
+        self._pump()
+        return future
+
+    def call_later(self, delay_s, callback):
+        heapq.heappush(self._scheduled, (self.simulator.now_ms + delay_s * 1000.0, self._order, callback))
+        self._order += 1
+
+    def run(self):
+        while self._scheduled or self.tracker.pending:
+            if not self._scheduled: # Sequences finish in loop(): let it run
+                self.advance(SIM_TICK_MS)
+                self.tracker.expire(self.simulator.now_ms / 1000.0)
+                continue
+            due_ms, _, callback = heapq.heappop(self._scheduled)
+            if due_ms > self.simulator.now_ms:
+                self.advance(due_ms - self.simulator.now_ms)
+            callback()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulated calibration firmware on a pseudo-terminal.")
+    parser.add_argument("--speed", type=float, default=1.0, help="Simulated time per wall-clock second")
+    parser.add_argument("--baud", type=int, default=SIM_BAUDRATE, help="Output pacing; 0 = unlimited")
+    parser.add_argument("--max-stream-hz", type=int, default=STREAM_MAX_HZ,
+                        help="Highest 'stream' rate accepted (the firmware allows 50)")
+    options = parser.parse_args()
+
+    simulator = PtySimulator(FirmwareSimulator(max_stream_hz=options.max_stream_hz),
+                             speed=options.speed, baud=options.baud or None)
+    print(f"Firmware simulator listening on {simulator.port_name} (Ctrl+C to quit)")
+    simulator.start()
+    try:
+        while simulator.is_alive():
+            time.sleep(0.5)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        simulator.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+# --- Stepper positions -> board / capture wheel coordinates ---
+# Position targets map an index (file, rank, slot) to a stepper position. The inverse,
+# used to draw where the gripper is, interpolates linearly between the targets on either
+# side of the position and extrapolates past the outer ones with the nearest spacing.
+# Targets need not be in index order: on the orb, files a-f run downwards and g-h sit at
+# the top of the range, so the a/h gap wraps around the sphere. Between two targets
+# whose indices aren't neighbours the position snaps to the nearer one.
+
+BOARD_MARGIN_CELLS = 0.5 # How far past the outer targets the gripper still counts as over the board
+
+
+def interpolate_index(position, targets):
+    """Stepper position -> fractional index i with targets[i] == position. None if not defined."""
+    points = sorted((target, index) for index, target in enumerate(targets))
+    # Targets that coincide would give a zero-width segment; keep the first of each
+    unique = [points[0]] if points else []
+    for target, index in points[1:]:
+        if target != unique[-1][0]:
+            unique.append((target, index))
+    if position is None or len(unique) < 2:
+        return None
+
+    for (lo_target, lo_index), (hi_target, hi_index) in zip(unique, unique[1:]):
+        if position <= hi_target:
+            break # Also covers positions below the first target (extrapolated)
+    fraction = (position - lo_target) / (hi_target - lo_target)
+    if abs(hi_index - lo_index) != 1 and 0.0 <= fraction <= 1.0:
+        return lo_index if fraction < 0.5 else hi_index
+    return lo_index + fraction * (hi_index - lo_index)
+
+def _within(index, count, margin):
+    return index is not None and -margin <= index <= count - 1 + margin
+
+def board_cell_position(orb_pos, cart_pos, orb_targets, cart_targets, margin=BOARD_MARGIN_CELLS):
+    """
+    (orb, cart) stepper positions -> (file, row) in fractional board cells as used by
+    ChessBoardWidget (file 0 = A, row 0 = rank 8). Either is None when unknown or off the board.
+    """
+    file_index = interpolate_index(orb_pos, orb_targets)
+    rank_index = interpolate_index(cart_pos, cart_targets) # cartTargets[0] is rank 1
+    file_pos = file_index if _within(file_index, len(orb_targets), margin) else None
+    row_pos = (len(cart_targets) - 1) - rank_index if _within(rank_index, len(cart_targets), margin) else None
+    return file_pos, row_pos
+
+def capture_slot_position(capt_pos, capture_targets, margin=BOARD_MARGIN_CELLS):
+    """Capture stepper position -> fractional slot index (0 = slot 1), None if unknown or out of range."""
+    slot_index = interpolate_index(capt_pos, capture_targets)
+    return slot_index if _within(slot_index, len(capture_targets), margin) else None
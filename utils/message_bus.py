@@ -0,0 +1,167 @@
+import json
+from dataclasses import dataclass
+
+# --- Typed firmware messages ---
+# Each firmware reply line is decoded once into one of these and handed to
+# every subscriber of that type.
+
+@dataclass(frozen=True)
+class Pos:
+    """POS: {"cartPos":..,"orbPos":..,"captPos":..,"rotServo":..,"gripServo":..,"actuatorSensor":..}"""
+    cart_pos: int = None
+    orb_pos: int = None
+    capt_pos: int = None
+    rot_servo: int = None
+    grip_servo: int = None
+    actuator_sensor: int = None
+
+@dataclass(frozen=True)
+class SPos:
+    """SPOS: <stepper_id> <position>"""
+    stepper_id: str
+    position: int
+
+@dataclass(frozen=True)
+class Ack:
+    text: str
+
+@dataclass(frozen=True)
+class Err:
+    text: str
+
+@dataclass(frozen=True)
+class SqPos:
+    """SQPOS: {"square":..,"orb":..,"cart":..}"""
+    square: str
+    orb: int
+    cart: int
+
+@dataclass(frozen=True)
+class CaptPos:
+    """CAPTPOS: {"slot":..,"capture":..}"""
+    slot: int
+    capture: int
+
+@dataclass(frozen=True)
+class Safety:
+    text: str
+
+@dataclass(frozen=True)
+class HomeCheck:
+    """HOMECHECK: <stepper_id> <position counted when the endstop triggered>"""
+    stepper_id: str
+    position: int
+
+@dataclass(frozen=True)
+class Progress:
+    """EVT: {"seq":..,"ev":..,"state":..,"phase":..,"step":..,"steps":..,"msg":..,"ms":..} from 'take'/'release'/'do'"""
+    sequence: str
+    event: str               # start, state, warn, then one of SEQUENCE_FINAL_EVENTS
+    state: str = None
+    phase: str = None
+    step: int = None
+    steps: int = None
+    message: str = None
+    elapsed_ms: int = None   # Since the sequence started
+
+    def final(self):
+        return self.event in SEQUENCE_FINAL_EVENTS
+
+
+SEQUENCE_FINAL_EVENTS = ("done", "error", "stopped")
+
+# Firmware JSON key -> Pos field
+POS_JSON_FIELDS = {
+    "cartPos": "cart_pos", "orbPos": "orb_pos", "captPos": "capt_pos",
+    "rotServo": "rot_servo", "gripServo": "grip_servo", "actuatorSensor": "actuator_sensor",
+}
+
+def _parse_pos(payload):
+    json_data = json.loads(payload)
+    return Pos(**{field: json_data[key] for key, field in POS_JSON_FIELDS.items() if key in json_data})
+
+def _parse_spos(payload):
+    stepper_id, pos_str = payload.split(" ")
+    return SPos(stepper_id, int(pos_str))
+
+def _parse_sqpos(payload):
+    json_data = json.loads(payload)
+    return SqPos(str(json_data["square"]), json_data["orb"], json_data["cart"])
+
+def _parse_captpos(payload):
+    json_data = json.loads(payload)
+    return CaptPos(json_data["slot"], json_data["capture"])
+
+def _parse_homecheck(payload):
+    stepper_id, pos_str = payload.split(" ")
+    return HomeCheck(stepper_id, int(pos_str))
+
+def _parse_progress(payload):
+    json_data = json.loads(payload)
+    return Progress(str(json_data["seq"]), str(json_data["ev"]), json_data.get("state"), json_data.get("phase"),
+                    json_data.get("step"), json_data.get("steps"), json_data.get("msg"), json_data.get("ms"))
+
+# (line prefix, message type, payload parser) - checked in order
+_LINE_PARSERS = [
+    ("POS:", Pos, _parse_pos),
+    ("SPOS:", SPos, _parse_spos),
+    ("ACK:", Ack, Ack),
+    ("ERR:", Err, Err),
+    ("SQPOS:", SqPos, _parse_sqpos),
+    ("CAPTPOS:", CaptPos, _parse_captpos),
+    ("SAFETY:", Safety, Safety),
+    ("HOMECHECK:", HomeCheck, _parse_homecheck),
+    ("EVT:", Progress, _parse_progress),
+]
+
+
+def _decode(line, prefix, message_type, parser):
+    try:
+        return parser(line[len(prefix):].strip())
+    except (ValueError, KeyError, TypeError) as e:
+        print(f"MessageBus: Could not parse {message_type.__name__} line: {line} ({e})")
+        return None
+
+def parse_line(line):
+    """Decodes a single firmware line into a typed message, or None if it is untyped/malformed."""
+    for prefix, message_type, parser in _LINE_PARSERS:
+        if line.startswith(prefix):
+            return _decode(line, prefix, message_type, parser)
+    return None
+
+
+class MessageBus:
+    """
+    Parses each firmware line once and dispatches it to subscribers by message type.
+    Lines whose type has no subscribers are not decoded at all.
+    """
+
+    def __init__(self):
+        self._subscribers = {} # message type -> list of callbacks
+
+    def subscribe(self, message_type, callback):
+        self._subscribers.setdefault(message_type, []).append(callback)
+
+    def unsubscribe(self, message_type, callback):
+        callbacks = self._subscribers.get(message_type, [])
+        if callback in callbacks:
+            callbacks.remove(callback)
+
+    def publish(self, message):
+        """Hands an already-decoded message (e.g. rebuilt from the position stream) to its subscribers."""
+        for callback in list(self._subscribers.get(type(message), [])):
+            callback(message)
+
+    def dispatch(self, line):
+        for prefix, message_type, parser in _LINE_PARSERS:
+            if not line.startswith(prefix):
+                continue
+            callbacks = self._subscribers.get(message_type)
+            if not callbacks:
+                return None # Nobody listens: skip the decode entirely
+            message = _decode(line, prefix, message_type, parser)
+            if message is not None:
+                for callback in list(callbacks):
+                    callback(message)
+            return message
+        return None
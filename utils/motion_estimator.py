@@ -0,0 +1,277 @@
+import argparse
+import csv
+import functools
+import math
+import sys
+from dataclasses import dataclass, replace
+
+from utils.config_parser import DEFAULT_CONFIG_VALUES, layer_config_values, parse_config_file
+from utils.move_profiler import ALL_LOCATIONS, BOARD_SQUARES, CAPTURE_SLOTS, PHASES
+
+# --- Motion time estimator ---
+# Predicts how long 'do <from> <to>' takes from the config alone, following the
+# firmware's executeDoSequence step by step: the safety checks before a cart move, the
+# 400 ms servo rotations, steppers moving together (the slowest one decides) and the
+# fixed delays of take/release. Each stepper move is an AccelStepper trapezoid:
+# accelerate at STEPPER_ACCEL up to STEPPER_SPEED, cruise, decelerate (a triangle when
+# the move is too short to reach full speed).
+#
+#   python -m utils.motion_estimator config.h --set STEPPER_SPEED=5000 --matrix pairs.csv
+
+SERVO_ROTATION_MS = 400     # delay() after every gripper rotation change in a move
+SAFETY_ROTATION_MS = 500    # enforceCartSafetyRotation()
+TAKE_OPEN_MS, TAKE_CLOSE_MS = 300, 700
+RELEASE_OPEN_MS = 300
+
+
+@dataclass(frozen=True)
+class GripperState:
+    """Stepper positions (steps) and rotation servo angle between moves."""
+    orb: int
+    cart: int
+    capt: int
+    rot: int
+
+
+def trapezoid_time(distance, max_speed, accel):
+    """Seconds for a move of `distance` steps starting and ending at rest."""
+    distance = abs(distance)
+    if distance == 0:
+        return 0.0
+    if accel <= 0:
+        return distance / max_speed
+    ramp_distance = max_speed * max_speed / accel # Both ramps together
+    if distance >= ramp_distance:
+        return distance / max_speed + max_speed / accel
+    return 2.0 * math.sqrt(distance / accel)
+
+def approach_time(distance, max_speed, accel):
+    """Seconds to cover `distance` from rest without braking (homing into an endstop)."""
+    distance = abs(distance)
+    if accel <= 0:
+        return distance / max_speed
+    ramp_distance = max_speed * max_speed / (2.0 * accel)
+    if distance >= ramp_distance:
+        return distance / max_speed + max_speed / (2.0 * accel)
+    return math.sqrt(2.0 * distance / accel)
+
+
+class MotionModel:
+    """The firmware's 'do' sequence timing for one config (CONFIG_VALUES-style dict)."""
+
+    def __init__(self, config_values):
+        self.config = config_values
+        self.speed = float(config_values["STEPPER_SPEED"])
+        self.accel = float(config_values["STEPPER_ACCEL"])
+        self.travel_s = config_values["ACTUATOR_TRAVEL_TIME_MS"] / 1000.0
+        self.rot_board = config_values["GRIPPER_ROT_BOARD"]
+        self.rot_capture = config_values["GRIPPER_ROT_CAPTURE"]
+        self.orb_targets = config_values["orbTargets"]
+        self.cart_targets = config_values["cartTargets"]
+        self.capture_targets = config_values["captureTargets"]
+        # Same distance -> same time; a full pair matrix only sees a few hundred distinct ones
+        self.axis_time = functools.lru_cache(maxsize=None)(
+            lambda distance: trapezoid_time(distance, self.speed, self.accel))
+
+    def home_state(self):
+        """Where everything is after 'homeall'."""
+        return GripperState(0, 0, 0, self.rot_board)
+
+    def state_at(self, location):
+        """The state right after a move has arrived at `location` (the orb stays put for capture slots)."""
+        return self.move_to(self.home_state(), location)[1]
+
+    # --- Phases ---
+    def move_to(self, state, location, capture_orb=None):
+        """
+        Moving to one location of a 'do': (seconds, new state). A capture slot keeps the
+        orb at `capture_orb`: the firmware parses both locations before moving, so that is
+        where the orb was when the 'do' started (the current position if None).
+        """
+        location = location.lower()
+        config = self.config
+        seconds = 0.0
+        if location.startswith("capt"):
+            target_cart = config["CART_CAPTURE_POS"]
+        else:
+            target_cart = self.cart_targets[int(location[1]) - 1]
+
+        # enforceAllSafetyForCart()
+        if target_cart < config["CART_CAPTURE_HOME_THRESHOLD"] and state.capt != 0:
+            seconds += approach_time(state.capt, config["HOMING_SPEED_CAPTURE"], config["HOMING_ACCEL"])
+            state = replace(state, capt=0)
+        if target_cart < config["CART_SAFETY_THRESHOLD"] and state.rot != self.rot_board:
+            seconds += SAFETY_ROTATION_MS / 1000.0
+            state = replace(state, rot=self.rot_board)
+
+        # Board squares and the capture wheel's approach both need the board angle first
+        if state.rot != self.rot_board:
+            seconds += SERVO_ROTATION_MS / 1000.0
+            state = replace(state, rot=self.rot_board)
+        if location.startswith("capt"):
+            orb = state.orb if capture_orb is None else capture_orb
+            capt = self.capture_targets[int(location[4:]) - 1]
+            seconds += max(self.axis_time(target_cart - state.cart), self.axis_time(orb - state.orb))
+            seconds += self.axis_time(capt - state.capt) # Only once the cart is in place
+            seconds += SERVO_ROTATION_MS / 1000.0
+            return seconds, GripperState(orb, target_cart, capt, self.rot_capture)
+        orb = self.orb_targets["abcdefgh".index(location[0])]
+        seconds += max(self.axis_time(target_cart - state.cart), self.axis_time(orb - state.orb),
+                       self.axis_time(state.capt)) # The capture wheel goes home alongside
+        return seconds, GripperState(orb, target_cart, 0, state.rot)
+
+    def take_time(self):
+        return (TAKE_OPEN_MS + TAKE_CLOSE_MS) / 1000.0 + 2 * self.travel_s
+
+    def release_time(self):
+        return RELEASE_OPEN_MS / 1000.0 + 2 * self.travel_s
+
+    # --- Moves ---
+    def estimate_do(self, from_loc, to_loc, state=None):
+        """
+        ({phase: seconds} with the keys of move_profiler.PHASES, state afterwards) for
+        'do from to' starting from `state` (over from_loc if None).
+        """
+        state = self.state_at(from_loc) if state is None else state
+        start_orb = state.orb
+        source_s, state = self.move_to(state, from_loc, start_orb)
+        dest_s, state = self.move_to(state, to_loc, start_orb)
+        phases = dict(zip(PHASES, (source_s, self.take_time(), dest_s, self.release_time())))
+        return phases, state
+
+    def estimate_sequence(self, moves, state=None):
+        """(total seconds, [per-move seconds]) for consecutive (from, to) moves, starting from home by default."""
+        state = self.home_state() if state is None else state
+        durations = []
+        for from_loc, to_loc in moves:
+            phases, state = self.estimate_do(from_loc, to_loc, state)
+            durations.append(sum(phases.values()))
+        return sum(durations), durations
+
+    def pair_matrix(self, locations=ALL_LOCATIONS):
+        """
+        seconds[i][j] of 'do locations[i] locations[j]' with the gripper already over the
+        source (as when the previous move ended there; after homing for the orb of capture
+        slots). The diagonal is a take and release in place.
+        """
+        fixed_s = self.take_time() + self.release_time()
+        arrived = [self.state_at(location) for location in locations]
+        return [[fixed_s + self.move_to(source_state, to_loc, source_state.orb)[0] for to_loc in locations]
+                for source_state in arrived]
+
+
+# --- Games ---
+def game_to_do_moves(uci_moves, pick_slot=None):
+    """
+    UCI moves ('e2e4', 'e1g1', 'e7e8q') -> the (from, to) 'do' moves that play them from
+    the starting position: a captured piece is first carried to a capture slot (the next
+    one in order, or pick_slot(square) e.g. a capture_planner.SlotPicker), castling also
+    moves the rook, en passant removes the passed pawn. Promotions move the pawn (the
+    piece swap is left to the operator).
+    """
+    occupied = {square for square in BOARD_SQUARES if square[1] in "1278"}
+    pawns = {square for square in occupied if square[1] in "27"}
+    kings = {"e1", "e8"}
+    next_slot = iter(CAPTURE_SLOTS)
+    pick_slot = pick_slot or (lambda square: next(next_slot))
+    moves = []
+
+    def capture(square):
+        moves.append((square, pick_slot(square)))
+        occupied.discard(square)
+        pawns.discard(square)
+
+    for uci in uci_moves:
+        uci = uci.strip().lower()
+        from_sq, to_sq = uci[:2], uci[2:4]
+        if from_sq not in occupied:
+            raise ValueError(f"'{uci}': no piece on {from_sq}")
+        is_pawn, is_king = from_sq in pawns, from_sq in kings
+        if to_sq in occupied:
+            capture(to_sq)
+        elif is_pawn and from_sq[0] != to_sq[0]: # Diagonal onto an empty square: en passant
+            capture(to_sq[0] + from_sq[1])
+        moves.append((from_sq, to_sq))
+        occupied.remove(from_sq)
+        occupied.add(to_sq)
+        pawns.discard(from_sq)
+        if is_pawn and len(uci) == 4:
+            pawns.add(to_sq)
+        if is_king:
+            kings.discard(from_sq)
+            kings.add(to_sq)
+        if is_king and from_sq[0] == "e" and to_sq[1] == from_sq[1] and to_sq[0] in "cg":
+            rank = from_sq[1]
+            rook_from, rook_to = ("h" + rank, "f" + rank) if to_sq[0] == "g" else ("a" + rank, "d" + rank)
+            if rook_from in occupied:
+                moves.append((rook_from, rook_to))
+                occupied.remove(rook_from)
+                occupied.add(rook_to)
+    return moves
+
+
+# --- Command line ---
+def format_seconds(seconds):
+    minutes, seconds = divmod(seconds, 60)
+    return f"{int(minutes)} min {seconds:.1f} s" if minutes else f"{seconds:.2f} s"
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Predict 'do' move durations from a config.h, without hardware.")
+    parser.add_argument("config", nargs="?", help="config.h to read (defaults if omitted)")
+    parser.add_argument("--set", action="append", default=[], metavar="KEY=VALUE",
+                        help="Override a value, e.g. --set STEPPER_SPEED=5000 (repeatable)")
+    parser.add_argument("--matrix", metavar="CSV", help="Write the 96x96 from/to duration matrix")
+    parser.add_argument("--game", metavar="FILE", help="UCI moves (whitespace separated) to time as one game")
+    parser.add_argument("--top", type=int, default=10, help="Slowest pairs to list")
+    args = parser.parse_args(argv)
+
+    overrides = {}
+    if args.config:
+        try:
+            overrides = parse_config_file(args.config)
+        except OSError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            return 2
+    for item in args.set:
+        key, _, value = item.partition("=")
+        try:
+            overrides[key.strip()] = float(value) if "." in value else int(value)
+        except ValueError:
+            print(f"Error: --set {item}: expected KEY=<number>", file=sys.stderr)
+            return 2
+    model = MotionModel(layer_config_values(overrides, DEFAULT_CONFIG_VALUES))
+
+    matrix = model.pair_matrix()
+    pairs = [(matrix[i][j], ALL_LOCATIONS[i], ALL_LOCATIONS[j])
+             for i in range(len(ALL_LOCATIONS)) for j in range(len(ALL_LOCATIONS)) if i != j]
+    mean = sum(seconds for seconds, _, _ in pairs) / len(pairs)
+    board_pairs = [seconds for seconds, from_loc, to_loc in pairs if not from_loc.startswith("capt") and not to_loc.startswith("capt")]
+    print(f"'do' over all {len(pairs)} location pairs: mean {mean:.2f} s, "
+          f"board-to-board mean {sum(board_pairs) / len(board_pairs):.2f} s, "
+          f"fixed take + release {model.take_time() + model.release_time():.2f} s")
+    print(f"Slowest {args.top}:")
+    for seconds, from_loc, to_loc in sorted(pairs, reverse=True)[:args.top]:
+        print(f"  do {from_loc} {to_loc}: {seconds:.2f} s")
+
+    if args.matrix:
+        with open(args.matrix, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["from/to"] + list(ALL_LOCATIONS))
+            for location, row in zip(ALL_LOCATIONS, matrix):
+                writer.writerow([location] + [f"{seconds:.3f}" for seconds in row])
+        print(f"Matrix written to {args.matrix}")
+
+    if args.game:
+        try:
+            with open(args.game, "r") as f:
+                do_moves = game_to_do_moves(f.read().split())
+        except (OSError, ValueError) as e:
+            print(f"Error reading game: {e}", file=sys.stderr)
+            return 2
+        total, _ = model.estimate_sequence(do_moves)
+        print(f"Game: {len(do_moves)} 'do' moves, {format_seconds(total)} of robot time")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
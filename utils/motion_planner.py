@@ -0,0 +1,363 @@
+import argparse
+import math
+import sys
+
+from utils.command_futures import PROGRESS_COMMANDS, command_key
+from utils.config_parser import DEFAULT_CONFIG_VALUES, layer_config_values, parse_config_file
+from utils.motion_estimator import SERVO_ROTATION_MS, GripperState, MotionModel
+from utils.move_profiler import plan_capture_tour, plan_random_walk
+
+# --- Overlapped motion planner ---
+# The firmware moves one axis group after another with fixed waits in between. This plans
+# the same moves as timed goto*/servorot commands that overlap wherever the safety rules
+# allow, and predicts when everything has arrived. The rules:
+#   - the cart only goes below CART_SAFETY_THRESHOLD with the gripper at the board angle
+#     (enforceCartSafetyRotation), and the gripper only turns away from it while the cart
+#     stays above;
+#   - the cart only goes below CART_CAPTURE_HOME_THRESHOLD with the capture wheel at 0
+#     (enforceCaptureHomedForLowCart), and the wheel only leaves 0 with the cart above;
+#   - the orb and the capture wheel only move with the gripper at the board angle, as in
+#     the firmware's own sequences (the carried piece would otherwise sweep the wheel).
+# Every command is sent early enough for the firmware's own checks to pass, so they never
+# step in with a blocking fallback. The servo takes SERVO_ROTATION_MS to turn. A plan can
+# be replayed in the firmware simulator (simulate_plan) to check its timing and, tick by
+# tick, the rules above before it is sent to the robot.
+#
+#   python -m utils.motion_planner config.h --from d4 --to capt5
+
+GATE_MARGIN_S = 0.03         # Added after a predicted arrival that another command waits for
+GATE_MARGIN_FRACTION = 0.03  # ... plus this share of the move, for the model's error
+SIM_TIMEOUT_MS = 30000
+
+
+def time_to_cover(covered, distance, max_speed, accel):
+    """Seconds into a trapezoid move of `distance` steps until `covered` of them are done."""
+    covered, distance = min(abs(covered), abs(distance)), abs(distance)
+    if accel <= 0:
+        return covered / max_speed
+    ramp = max_speed * max_speed / (2.0 * accel) # One ramp
+    if 2.0 * ramp > distance: # Triangle profile: never reaches full speed
+        ramp = distance / 2.0
+    peak = math.sqrt(2.0 * accel * ramp)
+    total = 2.0 * peak / accel + (distance - 2.0 * ramp) / max_speed if peak else 0.0
+    if covered <= ramp:
+        return math.sqrt(2.0 * covered / accel)
+    if covered <= distance - ramp:
+        return peak / accel + (covered - ramp) / max_speed
+    return total - math.sqrt(2.0 * (distance - covered) / accel)
+
+
+class PlannedMove:
+    """Timed commands [(seconds from the start, command)] and when everything has arrived."""
+
+    def __init__(self, start, target):
+        self.start = start
+        self.target = target
+        self.commands = []
+        self.finish_s = 0.0
+
+    def add(self, at_s, command, done_s):
+        self.commands.append((at_s, command))
+        self.finish_s = max(self.finish_s, done_s)
+
+    def extend(self, other, offset_s):
+        for at_s, command in other.commands:
+            self.commands.append((offset_s + at_s, command))
+        self.finish_s = max(self.finish_s, offset_s + other.finish_s)
+
+    def sorted_commands(self):
+        return sorted(self.commands, key=lambda item: item[0])
+
+    def describe(self):
+        lines = [f"  {at_s:6.2f} s  {command}" for at_s, command in self.sorted_commands()]
+        lines.append(f"  {self.finish_s:6.2f} s  (everything arrived)")
+        return "\n".join(lines)
+
+
+class MotionPlanner:
+    """Overlapped command schedules for one config (CONFIG_VALUES-style dict)."""
+
+    def __init__(self, config_values):
+        self.config = config_values
+        self.model = MotionModel(config_values)
+        self.safety_threshold = config_values["CART_SAFETY_THRESHOLD"]
+        self.home_threshold = config_values["CART_CAPTURE_HOME_THRESHOLD"]
+        self.servo_s = SERVO_ROTATION_MS / 1000.0
+
+    def _gate(self, arrival_s, move_s):
+        return arrival_s + GATE_MARGIN_S + GATE_MARGIN_FRACTION * move_s
+
+    def _time_below(self, start, target, level):
+        """Seconds into a cart move until it is below `level` (inf if it never gets there)."""
+        if start < level:
+            return 0.0
+        if target >= level:
+            return float("inf")
+        return time_to_cover(start - level, target - start, self.model.speed, self.model.accel)
+
+    def _time_above(self, start, target, level):
+        """Seconds into a cart move from which it is at or above `level` (inf if it never gets there)."""
+        if start >= level:
+            return 0.0
+        if target < level:
+            return float("inf")
+        return time_to_cover(level - start, target - start, self.model.speed, self.model.accel)
+
+    def target_state(self, state, location):
+        """Where `location` puts the gripper; capture slots keep the orb where it is."""
+        location = location.lower()
+        if location.startswith("capt"):
+            return GripperState(state.orb, self.config["CART_CAPTURE_POS"],
+                                self.model.capture_targets[int(location[4:]) - 1], self.model.rot_capture)
+        return GripperState(self.model.orb_targets["abcdefgh".index(location[0])],
+                            self.model.cart_targets[int(location[1]) - 1], 0, self.model.rot_board)
+
+    # --- Planning ---
+    def plan_move(self, state, location):
+        return self.plan_to(state, self.target_state(state, location))
+
+    def plan_to(self, state, target):
+        """PlannedMove from `state` to `target` (GripperStates). ValueError if the target itself is unsafe."""
+        board = self.model.rot_board
+        if target.rot != board and target.cart < self.safety_threshold:
+            raise ValueError(f"The gripper can't turn away from the board angle with the cart at {target.cart}")
+        if target.capt != 0 and target.cart < self.home_threshold:
+            raise ValueError(f"The capture wheel can't leave home with the cart at {target.cart}")
+        axis_time = self.model.axis_time
+        plan = PlannedMove(state, target)
+
+        # The board angle first, if anything needs it
+        cart_low = min(state.cart, target.cart) < self.safety_threshold
+        board_ready_s = 0.0
+        if state.rot != board and (cart_low or target.orb != state.orb or target.capt != state.capt or target.rot == board):
+            plan.add(0.0, f"servorot {board}", self.servo_s)
+            board_ready_s = self._gate(self.servo_s, 0.0)
+        rot_now = board if plan.commands else state.rot
+
+        # Orb: as soon as the gripper is at the board angle
+        orb_done_s = 0.0
+        if target.orb != state.orb:
+            orb_done_s = board_ready_s + axis_time(target.orb - state.orb)
+            plan.add(board_ready_s, f"gotoorb {target.orb}", orb_done_s)
+
+        cart_s = axis_time(target.cart - state.cart)
+        capt_s = axis_time(target.capt - state.capt)
+        cart_start_s = capt_start_s = board_ready_s
+        if target.cart != state.cart:
+            cart_start_s = 0.0
+            if state.rot != board and target.cart < self.safety_threshold: # Mustn't get below it before the servo has turned
+                cart_start_s = max(0.0, board_ready_s - self._time_below(state.cart, target.cart, self.safety_threshold))
+        if target.capt == 0:
+            # Wheel home first; the firmware checks it is at 0 before a cart move below the threshold
+            if target.cart < self.home_threshold and state.capt != 0:
+                cart_start_s = max(cart_start_s, self._gate(capt_start_s + capt_s, capt_s))
+        elif state.cart < self.home_threshold:
+            # The wheel waits for the cart to get above the threshold
+            capt_start_s = max(capt_start_s, self._gate(
+                cart_start_s + self._time_above(state.cart, target.cart, self.home_threshold), cart_s))
+        cart_done_s, capt_done_s = cart_start_s + cart_s, capt_start_s + capt_s
+        if target.cart != state.cart:
+            plan.add(cart_start_s, f"gotocart {target.cart}", cart_done_s)
+        if target.capt != state.capt:
+            plan.add(capt_start_s, f"gotocapt {target.capt}", capt_done_s)
+
+        # Final angle: once the orb and wheel are still and the cart is (and stays) above the threshold
+        if target.rot != rot_now:
+            cart_safe_s = 0.0
+            if state.cart < self.safety_threshold:
+                cart_safe_s = self._gate(cart_start_s + self._time_above(state.cart, target.cart, self.safety_threshold), cart_s)
+            rotate_s = max(board_ready_s if rot_now == board else 0.0, cart_safe_s,
+                           self._gate(orb_done_s, 0.0) if target.orb != state.orb else 0.0,
+                           self._gate(capt_done_s, capt_s) if target.capt != state.capt else 0.0)
+            plan.add(rotate_s, f"servorot {target.rot}", rotate_s + self.servo_s)
+        return plan
+
+    def plan_do(self, from_loc, to_loc, state=None):
+        """
+        'do from to' as one PlannedMove: the moves overlapped, with 'take' and 'release'
+        sent once the gripper has arrived (each is a blocking firmware sequence).
+        """
+        state = self.model.state_at(from_loc) if state is None else state
+        source = self.plan_move(state, from_loc)
+        dest = self.plan_move(source.target, to_loc)
+        plan = PlannedMove(state, dest.target)
+        plan.extend(source, 0.0)
+        take_at_s = self._gate(source.finish_s, source.finish_s)
+        plan.add(take_at_s, "take", take_at_s + self.model.take_time())
+        dest_at_s = self._gate(take_at_s + self.model.take_time(), 0.0)
+        plan.extend(dest, dest_at_s)
+        release_at_s = self._gate(dest_at_s + dest.finish_s, dest.finish_s)
+        plan.add(release_at_s, "release", release_at_s + self.model.release_time())
+        return plan
+
+
+# --- Simulation ---
+class SimulationResult:
+    def __init__(self, simulated_s, violations, positions):
+        self.simulated_s = simulated_s
+        self.violations = violations # [(seconds, text)], the first of each kind
+        self.positions = positions
+
+    def ok(self):
+        return not self.violations
+
+
+def state_from_positions(positions):
+    """Pos message fields / FirmwareSimulator.positions() -> GripperState."""
+    return GripperState(positions["orb_pos"], positions["cart_pos"], positions["capt_pos"], positions["rot_servo"])
+
+def simulate_plan(plan, config_values):
+    """
+    Runs a plan in the firmware simulator (perfect motors, the given config) from plan.start
+    and checks the safety rules every simulated millisecond.
+    """
+    from utils.config_sync import DeviceConfigSync
+    from utils.firmware_sim import FirmwareSimulator, SimulatorLink
+
+    link = SimulatorLink(FirmwareSimulator(stall_limits={}))
+    DeviceConfigSync(link.send_command_async).upload(config_values)
+    sim = link.simulator
+    start = plan.start
+    sim.place(start.cart, start.orb, start.capt, start.rot)
+    sim.take_output()
+
+    board = config_values["GRIPPER_ROT_BOARD"]
+    safety_threshold = config_values["CART_SAFETY_THRESHOLD"]
+    home_threshold = config_values["CART_CAPTURE_HOME_THRESHOLD"]
+    servo_ms = SERVO_ROTATION_MS
+    pending = plan.sorted_commands()
+    t0 = sim.now_ms
+    rot_settled_ms = t0
+    violations, seen = [], set()
+
+    def violation(kind, text):
+        if kind not in seen:
+            seen.add(kind)
+            violations.append(((sim.now_ms - t0) / 1000.0, text))
+
+    while pending or not sim._is_idle() or sim.now_ms < rot_settled_ms:
+        while pending and pending[0][0] * 1000.0 <= sim.now_ms - t0:
+            _at_s, command = pending.pop(0)
+            rot_before = sim.rot_servo
+            sim.handle_command_line(command)
+            if sim.rot_servo != rot_before:
+                rot_settled_ms = sim.now_ms + servo_ms
+        for _printed_ms, line in sim.take_output():
+            if line.startswith("SAFETY:") or line.startswith("ERR:"):
+                violation(line, f"firmware: {line}")
+        at_board = sim.rot_servo == board and sim.now_ms >= rot_settled_ms
+        if sim.cart.current_position() < safety_threshold and not at_board:
+            violation("rot", "cart below CART_SAFETY_THRESHOLD without the gripper at the board angle")
+        if sim.cart.current_position() < home_threshold and sim.capture.current_position() != 0:
+            violation("capt", "cart below CART_CAPTURE_HOME_THRESHOLD with the capture wheel away from home")
+        if sim.orb.is_moving() and not at_board:
+            violation("orb", "orb moving without the gripper at the board angle")
+        if sim.capture.is_moving() and not at_board:
+            violation("wheel", "capture wheel moving without the gripper at the board angle")
+        if sim.now_ms - t0 > SIM_TIMEOUT_MS:
+            violation("timeout", "plan did not finish")
+            break
+        sim.advance(1.0)
+
+    positions = sim.positions()
+    end = state_from_positions(positions)
+    if end != plan.target:
+        violation("end", f"ended at {end} instead of {plan.target}")
+    return SimulationResult((sim.now_ms - t0) / 1000.0, violations, positions)
+
+
+# --- Sending ---
+def send_plan(plan, send_async, call_later):
+    """
+    Sends the commands at their times (call_later(seconds, callback), QTimer.singleShot in the app).
+    The commands after a 'take'/'release' go out once it has finished, the first one at once:
+    firmware that runs sequences in the background answers motion commands with 'ERR: Busy'
+    until then, and the planned margin is smaller than the serial round trip can be.
+    """
+    commands = plan.sorted_commands()
+
+    def send_from(index, started_s):
+        for position in range(index, len(commands)):
+            at_s, command = commands[position]
+            delay_s = max(0.0, at_s - started_s)
+            if command_key(command) in PROGRESS_COMMANDS:
+                def on_done(future, position=position):
+                    if not future.ok:
+                        print(f"MotionPlanner: '{future.command}' failed ({future.error}); rest of the plan not sent.")
+                    elif position + 1 < len(commands):
+                        send_from(position + 1, commands[position + 1][0])
+                def send_sequence(command=command, on_done=on_done):
+                    send_async(command).add_done_callback(on_done)
+                call_later(delay_s, send_sequence)
+                return
+            call_later(delay_s, lambda command=command: send_async(command))
+
+    send_from(0, 0.0)
+
+def check_and_send(plan, config_values, send_async, call_later):
+    """Simulates the plan first and sends it only if no safety rule was broken. Returns the SimulationResult."""
+    result = simulate_plan(plan, config_values)
+    if result.ok():
+        send_plan(plan, send_async, call_later)
+    return result
+
+
+# --- Command line ---
+def compare(planner, moves, config_values, verify=True):
+    """[(from, to, firmware 'do' seconds, planned seconds, simulated seconds or None, violations)] for a chained walk."""
+    rows = []
+    state = planner.model.home_state()
+    for from_loc, to_loc in moves:
+        phases, _ = planner.model.estimate_do(from_loc, to_loc, state)
+        plan = planner.plan_do(from_loc, to_loc, state)
+        result = simulate_plan(plan, config_values) if verify else None
+        rows.append((from_loc, to_loc, sum(phases.values()), plan.finish_s,
+                     result.simulated_s if result else None, result.violations if result else []))
+        state = plan.target
+    return rows
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Plan overlapped 'do' moves and check them in the firmware simulator.")
+    parser.add_argument("config", nargs="?", help="config.h to read (defaults if omitted)")
+    parser.add_argument("--from", dest="from_loc", help="Source of a single 'do' to plan and print")
+    parser.add_argument("--to", dest="to_loc", help="Destination of that 'do'")
+    parser.add_argument("--random", type=int, default=30, help="Otherwise: random moves to compare (plus the capture tour)")
+    args = parser.parse_args(argv)
+    try:
+        overrides = parse_config_file(args.config) if args.config else {}
+    except OSError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    config_values = layer_config_values(overrides, DEFAULT_CONFIG_VALUES)
+    planner = MotionPlanner(config_values)
+
+    if args.from_loc and args.to_loc:
+        plan = planner.plan_do(args.from_loc, args.to_loc)
+        result = simulate_plan(plan, config_values)
+        phases, _ = planner.model.estimate_do(args.from_loc, args.to_loc)
+        print(f"do {args.from_loc} {args.to_loc}, starting over {args.from_loc}:")
+        print(plan.describe())
+        print(f"Firmware 'do' {sum(phases.values()):.2f} s, planned {plan.finish_s:.2f} s, simulated {result.simulated_s:.2f} s")
+        for at_s, text in result.violations:
+            print(f"  VIOLATION at {at_s:.2f} s: {text}")
+        return 0 if result.ok() else 1
+
+    moves = plan_capture_tour() + plan_random_walk(args.random, seed=1)
+    rows = compare(planner, moves, config_values)
+    firmware_s = sum(row[2] for row in rows)
+    planned_s = sum(row[3] for row in rows)
+    simulated_s = sum(row[4] for row in rows)
+    worst = max(rows, key=lambda row: abs(row[4] - row[3]))
+    print(f"{len(rows)} moves: firmware 'do' {firmware_s:.1f} s, planned {planned_s:.1f} s "
+          f"({100.0 * (1.0 - planned_s / firmware_s):.0f}% less), simulated {simulated_s:.1f} s")
+    print(f"Largest prediction error: do {worst[0]} {worst[1]}, planned {worst[3]:.2f} s, simulated {worst[4]:.2f} s")
+    unsafe = [row for row in rows if row[5]]
+    for from_loc, to_loc, _, _, _, violations in unsafe:
+        for at_s, text in violations:
+            print(f"  do {from_loc} {to_loc}: VIOLATION at {at_s:.2f} s: {text}")
+    print("No safety rule broken in the simulator." if not unsafe else f"{len(unsafe)} moves broke a safety rule.")
+    return 0 if not unsafe else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,195 @@
+import csv
+import random
+
+from utils.command_futures import EVENT_PREFIX
+from utils.message_bus import Progress, parse_line
+
+# --- 'do' move profiler ---
+# Runs a batch of 'do <from> <to>' moves one after another and times every phase from the
+# receive times of the lines the firmware prints while the move runs (kept on the command
+# future). Every batch is a chained walk, each move starting where the previous one put
+# the piece, so a single piece is carried around and ends where it started.
+
+FILES = "abcdefgh"
+BOARD_SQUARES = tuple(f + r for r in "12345678" for f in FILES)
+CAPTURE_SLOTS = tuple(f"capt{n}" for n in range(1, 33))
+ALL_LOCATIONS = BOARD_SQUARES + CAPTURE_SLOTS
+
+# (phase, line marker that starts it), in firmware order; the last phase ends at DONE_MARKER.
+# Firmware that reports progress events names the phase in each event instead.
+PHASE_MARKERS = (
+    ("source", "1. Moving to Source"),
+    ("take", "2. Performing Take"),
+    ("dest", "3. Moving to Dest"),
+    ("release", "4. Performing Release"),
+)
+DONE_MARKER = "Do Sequence Complete"
+PHASES = tuple(name for name, _ in PHASE_MARKERS)
+
+
+# --- Batch plans: lists of (from, to) ---
+def plan_square_tour():
+    """Every square once as source and once as destination: a1 -> b1 ... h1 -> h2 ... -> a1 (boustrophedon)."""
+    path = []
+    for rank_index, rank in enumerate("12345678"):
+        files = FILES if rank_index % 2 == 0 else FILES[::-1]
+        path.extend(f + rank for f in files)
+    return list(zip(path, path[1:] + path[:1]))
+
+def plan_capture_tour(board_square="d4"):
+    """board_square -> capt1 -> board_square -> capt2 ... for all 32 slots."""
+    moves = []
+    for slot in CAPTURE_SLOTS:
+        moves += [(board_square, slot), (slot, board_square)]
+    return moves
+
+def plan_random_walk(count, start="e2", seed=None, locations=ALL_LOCATIONS):
+    """`count` random moves between `locations`, plus one back to the start."""
+    rng = random.Random(seed)
+    moves, here = [], start
+    for _ in range(count):
+        there = rng.choice([loc for loc in locations if loc != here])
+        moves.append((here, there))
+        here = there
+    if here != start:
+        moves.append((here, start))
+    return moves
+
+
+class MoveTiming:
+    """Timing of one 'do' move; phase durations in seconds (None if the move stopped before the phase ended)."""
+
+    def __init__(self, from_loc, to_loc, future):
+        self.from_loc = from_loc
+        self.to_loc = to_loc
+        self.ok = future.ok
+        self.error = future.error
+        self.total_s = future.latency_s
+        starts, done_at = {}, None
+        for received_at, line in future.lines:
+            event = parse_line(line) if line.startswith(EVENT_PREFIX) else None
+            if isinstance(event, Progress):
+                if event.phase in PHASES and event.phase not in starts:
+                    starts[event.phase] = received_at
+                if event.event == "done":
+                    done_at = received_at
+                continue
+            for phase, marker in PHASE_MARKERS:
+                if phase not in starts and marker in line:
+                    starts[phase] = received_at
+            if DONE_MARKER in line:
+                done_at = received_at
+        # A phase runs until the next one starts. Skipped steps print nothing, so the time
+        # before the first line of a phase is charged to that phase (to the first phase from
+        # the moment the command was sent), and a phase with no lines at all gets 0 s: the
+        # phases add up to the whole move.
+        ends = [starts.get(phase) for phase in PHASES[1:]] + [done_at]
+        for index in range(len(ends) - 2, -1, -1):
+            if ends[index] is None:
+                ends[index] = ends[index + 1]
+        begins = [future.sent_at] + ends[:-1]
+        self.phases = {phase: None if end is None else end - begin
+                       for phase, begin, end in zip(PHASES, begins, ends)}
+
+    def describe(self):
+        phases = ", ".join(f"{phase} {seconds:.2f}" for phase, seconds in self.phases.items() if seconds is not None)
+        return f"{self.from_loc} -> {self.to_loc}: {self.total_s:.2f} s ({phases})"
+
+
+class MoveProfiler:
+    """Sends the moves of a plan one at a time through send_async (SerialHandler.send_command_async)."""
+
+    def __init__(self, send_async):
+        self.send_async = send_async
+        self.results = []
+        self.running = False
+        self._moves = []
+        self._on_move_done = None
+        self._on_finished = None
+
+    def start(self, moves, on_move_done=None, on_finished=None):
+        """on_move_done(timing, index, count) after each move; on_finished(results, reason) at the end."""
+        self.results = []
+        self._moves = list(moves)
+        self._on_move_done, self._on_finished = on_move_done, on_finished
+        self.running = True
+        self._send_next()
+
+    def stop(self):
+        """Stops after the move in progress (a 'do' can't be interrupted)."""
+        self.running = False
+
+    def _send_next(self):
+        index = len(self.results)
+        if not self.running or index >= len(self._moves):
+            self._finish("stopped" if index < len(self._moves) else "completed")
+            return
+        from_loc, to_loc = self._moves[index]
+        self.send_async(f"do {from_loc} {to_loc}").add_done_callback(
+            lambda future: self._on_done(MoveTiming(from_loc, to_loc, future)))
+
+    def _on_done(self, timing):
+        self.results.append(timing)
+        if self._on_move_done:
+            self._on_move_done(timing, len(self.results) - 1, len(self._moves))
+        if not timing.ok:
+            self._finish(f"move failed: {timing.error}") # The piece may not be where the plan expects
+            return
+        self._send_next()
+
+    def _finish(self, reason):
+        self.running = False
+        if self._on_finished:
+            self._on_finished(self.results, reason)
+
+
+# --- Reports ---
+def location_heatmap(results):
+    """
+    {location: mean seconds to carry a piece there}, from the destination phase of the
+    successful moves ending there. (In a chained walk the source phase is ~0: the gripper
+    is already over the source.)
+    """
+    samples = {}
+    for timing in results:
+        seconds = timing.phases.get("dest")
+        if timing.ok and seconds is not None:
+            samples.setdefault(timing.to_loc, []).append(seconds)
+    return {location: sum(values) / len(values) for location, values in samples.items()}
+
+def phase_summary(results):
+    """{phase: (mean, max)} over the successful moves, plus 'total'."""
+    summary = {}
+    for phase in PHASES + ("total",):
+        values = [t.total_s if phase == "total" else t.phases.get(phase) for t in results if t.ok]
+        values = [v for v in values if v is not None]
+        if values:
+            summary[phase] = (sum(values) / len(values), max(values))
+    return summary
+
+def slowest_moves(results, count=10):
+    return sorted((t for t in results if t.ok), key=lambda t: t.total_s, reverse=True)[:count]
+
+def format_report(results, count=10):
+    lines = [f"{sum(1 for t in results if t.ok)} of {len(results)} moves completed."]
+    for phase, (mean, worst) in phase_summary(results).items():
+        lines.append(f"  {phase:<8} mean {mean:6.2f} s   max {worst:6.2f} s")
+    slowest = slowest_moves(results, count)
+    if slowest:
+        lines.append(f"Slowest {len(slowest)} moves:")
+        lines.extend("  " + timing.describe() for timing in slowest)
+    heat = location_heatmap(results)
+    if heat:
+        lines.append("Slowest locations to carry a piece to (mean):")
+        for location, seconds in sorted(heat.items(), key=lambda item: item[1], reverse=True)[:count]:
+            lines.append(f"  {location:<7} {seconds:.2f} s")
+    return "\n".join(lines)
+
+def export_csv(results, path):
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["from", "to", "ok", "error", "total_s"] + [f"{phase}_s" for phase in PHASES])
+        for t in results:
+            writer.writerow([t.from_loc, t.to_loc, int(t.ok), t.error or "",
+                             "" if t.total_s is None else f"{t.total_s:.4f}"]
+                            + ["" if t.phases[p] is None else f"{t.phases[p]:.4f}" for p in PHASES])
@@ -0,0 +1,123 @@
+import re
+
+from utils.motion_estimator import game_to_do_moves
+from utils.move_profiler import MoveTiming
+
+# --- 'do' move sequences ---
+# A move list is run one 'do' at a time: the next move is sent as soon as the previous
+# one has finished. The runner can be aborted (after the move in progress; the firmware's
+# 'stop' interrupts a 'do', which then fails) and resumed where it stopped; a failed move
+# stops the run and is retried on resume, once the piece has been put right. Running the
+# list several times (or until aborted) soak-tests a robot unattended, as long as the
+# list puts every piece back where it started.
+
+LOCATION_PATTERN = re.compile(r"^([a-h][1-8]|capt([1-9]|[12][0-9]|3[0-2]))$")
+UCI_PATTERN = re.compile(r"^[a-h][1-8][a-h][1-8][qrbn]?$")
+# PGN decorations around UCI moves: tag pairs, {comments}, ;comments, move numbers, results
+PGN_NOISE = re.compile(r"\[[^\]]*\]|\{[^}]*\}|;[^\n]*|\b\d+\.(\.\.)?|\b1-0\b|\b0-1\b|\b1/2-1/2\b|\*")
+
+
+def parse_move_list(text, pick_slot=None):
+    """
+    Text -> [(from, to)] 'do' moves. Either pairs of locations, one move per line as
+    'e2 e4', 'e2-e4' or 'do e2 capt3' ('#' starts a comment), or a game in UCI moves
+    ('e2e4 e7e5 ...', PGN headers, move numbers, comments and result allowed), which is
+    turned into 'do' moves by game_to_do_moves(uci_moves, pick_slot). SAN moves ('Nf3')
+    aren't supported. Raises ValueError on the first token that is neither.
+    """
+    text = "\n".join(line.split("#", 1)[0] for line in text.lower().splitlines())
+    tokens = [token for token in PGN_NOISE.sub(" ", text).replace("-", " ").split() if token != "do"]
+    if tokens and all(UCI_PATTERN.match(token) for token in tokens):
+        return game_to_do_moves(tokens, pick_slot)
+    for token in tokens:
+        if not LOCATION_PATTERN.match(token):
+            raise ValueError(f"'{token}' is neither a location (e2, capt3) nor a UCI move (e2e4)")
+    if len(tokens) % 2:
+        raise ValueError(f"'{tokens[-1]}' has no destination")
+    return list(zip(tokens[0::2], tokens[1::2]))
+
+def load_move_list(path, pick_slot=None):
+    with open(path, "r") as f:
+        return parse_move_list(f.read(), pick_slot)
+
+
+class MoveSequenceRunner:
+    """Runs a move list through send_async (SerialHandler.send_command_async), without blocking."""
+
+    def __init__(self, send_async):
+        self.send_async = send_async
+        self.running = False   # Until the last move sent has finished
+        self.aborting = False
+        self.load([])
+
+    def load(self, moves, passes=1):
+        """New move list, run `passes` times over (0: until aborted). Resets the progress."""
+        self.moves = list(moves)
+        self.passes = passes
+        self.index = 0      # Next move to send
+        self.pass_index = 0 # Passes already completed
+        self.completed = 0  # Moves completed, over all passes
+        self.failed = 0
+        self.total_s = 0.0  # Robot time of the completed moves
+
+    def can_resume(self):
+        return not self.running and bool(self.moves) and not self.finished()
+
+    def finished(self):
+        return self.passes and self.pass_index >= self.passes
+
+    def start(self, on_move_done=None, on_finished=None):
+        """
+        Sends moves from where the last run stopped. on_move_done(timing, index, pass_index)
+        after each move; on_finished(reason) when the run ends.
+        """
+        self._on_move_done, self._on_finished = on_move_done, on_finished
+        self.running, self.aborting = True, False
+        self._send_next()
+
+    def abort(self):
+        """Stops after the move in progress; start() resumes with the next one."""
+        self.aborting = True
+
+    def skip(self):
+        """Moves past the next move (e.g. one that failed and was done by hand)."""
+        if not self.running and self.moves:
+            self._advance()
+
+    def _advance(self):
+        self.index += 1
+        if self.index == len(self.moves):
+            self.index = 0
+            self.pass_index += 1
+
+    def _send_next(self):
+        if self.finished():
+            self._finish("completed")
+        elif self.aborting:
+            self._finish("aborted")
+        elif not self.moves:
+            self._finish("nothing to run")
+        else:
+            index, pass_index = self.index, self.pass_index
+            from_loc, to_loc = self.moves[index]
+            self.send_async(f"do {from_loc} {to_loc}").add_done_callback(
+                lambda future: self._on_done(MoveTiming(from_loc, to_loc, future), index, pass_index))
+
+    def _on_done(self, timing, index, pass_index):
+        if timing.ok:
+            self.completed += 1
+            self.total_s += timing.total_s or 0.0
+            self._advance()
+        else:
+            self.failed += 1
+        if self._on_move_done:
+            self._on_move_done(timing, index, pass_index)
+        if not timing.ok:
+            self._finish(f"move {index + 1} failed: {timing.error}") # Resuming retries it
+            return
+        self._send_next()
+
+    def _finish(self, reason):
+        self.running = self.aborting = False
+        if self._on_finished:
+            self._on_finished(reason)
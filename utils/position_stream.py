@@ -0,0 +1,119 @@
+from utils.message_bus import Pos
+
+# --- Push-mode position stream ---
+# After 'stream <hz>' the firmware sends frames on its own:
+#   PS:<seq>[K] c<cartPos> o<orbPos> p<captPos> r<rotServo> g<gripServo> a<actuatorSensor>
+# A keyframe (seq suffixed with 'K') carries every field and goes out at least every
+# STREAM_KEYFRAME_INTERVAL_MS; other frames carry only the fields that changed, and
+# nothing is sent while nothing changes. <seq> counts sent frames modulo 65536.
+
+STREAM_PREFIX = "PS:"
+STREAM_KEYFRAME_INTERVAL_MS = 1000 # Must match the firmware
+STREAM_MAX_HZ = 50
+
+# Frame tag -> Pos field, in the order the firmware writes them
+STREAM_FIELD_TAGS = {
+    "c": "cart_pos", "o": "orb_pos", "p": "capt_pos",
+    "r": "rot_servo", "g": "grip_servo", "a": "actuator_sensor",
+}
+
+
+class PositionStreamDecoder:
+    """Rebuilds the full position state from keyframes and delta frames."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.state = {}
+        self.expected_seq = None
+        self.synced = False # False until a keyframe arrives, and again after a lost delta
+        self.lost_frames = 0
+
+    def feed(self, line):
+        """Applies one 'PS:' frame; returns the full Pos, or None while not in sync."""
+        tokens = line[len(STREAM_PREFIX):].split()
+        if not tokens:
+            return None
+        head = tokens[0]
+        is_keyframe = head.endswith("K")
+        try:
+            seq = int(head[:-1] if is_keyframe else head)
+            fields = {STREAM_FIELD_TAGS[token[0]]: int(token[1:]) for token in tokens[1:]}
+        except (ValueError, KeyError, IndexError):
+            print(f"PositionStream: Malformed frame: {line}")
+            return None
+
+        if self.expected_seq is not None and seq != self.expected_seq:
+            self.lost_frames += (seq - self.expected_seq) & 0xFFFF
+            self.synced = False # A lost delta may hold a change we'll never see again
+        self.expected_seq = (seq + 1) & 0xFFFF
+
+        if is_keyframe:
+            self.state = fields
+            self.synced = True
+        else:
+            self.state.update(fields)
+        return Pos(**self.state) if self.synced else None
+
+
+class PositionStreamEncoder:
+    """Host-side copy of the firmware's frame builder (serviceStream)."""
+
+    def __init__(self):
+        self.seq = 0
+        self.last_sent = {}
+        self.last_keyframe_ms = None
+
+    def encode(self, values, now_ms):
+        """values: dict of Pos field -> int. Returns the frame line, or None if nothing changed."""
+        is_keyframe = self.last_keyframe_ms is None or now_ms - self.last_keyframe_ms >= STREAM_KEYFRAME_INTERVAL_MS
+        parts = [f"{STREAM_PREFIX}{self.seq}{'K' if is_keyframe else ''}"]
+        for tag, field in STREAM_FIELD_TAGS.items():
+            value = values[field]
+            if is_keyframe or self.last_sent.get(field) != value:
+                parts.append(f"{tag}{value}")
+                self.last_sent[field] = value
+        if len(parts) == 1:
+            return None
+        if is_keyframe:
+            self.last_keyframe_ms = now_ms
+        self.seq = (self.seq + 1) & 0xFFFF
+        return " ".join(parts)
+
+
+class PositionStreamEmulator:
+    """
+    Stand-in for a streaming ESP32: holds a position state, and tick() returns the
+    frames the firmware would send for it at the configured rate. Lets the decoder and
+    the GUI be exercised without hardware.
+    """
+
+    def __init__(self, hz=25, **initial_state):
+        self.interval_ms = 1000 / max(1, min(STREAM_MAX_HZ, hz))
+        self.state = {field: 0 for field in STREAM_FIELD_TAGS.values()}
+        self.state.update(initial_state)
+        self.encoder = PositionStreamEncoder()
+        self.next_frame_ms = 0.0
+
+    def set_state(self, **fields):
+        self.state.update(fields)
+
+    def tick(self, now_ms):
+        if now_ms < self.next_frame_ms:
+            return None
+        self.next_frame_ms = now_ms + self.interval_ms
+        return self.encoder.encode(self.state, now_ms)
+
+    def emulate_move(self, field, start, end, speed_steps_per_s, duration_ms=None):
+        """Yields (time_ms, frame) for a constant-speed move of one field, then a settle keyframe."""
+        travel_ms = abs(end - start) / speed_steps_per_s * 1000.0
+        duration_ms = duration_ms if duration_ms is not None else travel_ms + STREAM_KEYFRAME_INTERVAL_MS
+        now_ms = 0.0
+        while now_ms <= duration_ms:
+            progress = min(1.0, now_ms / travel_ms) if travel_ms > 0 else 1.0
+            self.state[field] = round(start + (end - start) * progress)
+            frame = self.tick(now_ms)
+            if frame:
+                yield now_ms, frame
+            now_ms += self.interval_ms
@@ -0,0 +1,308 @@
+import argparse
+import contextlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+# --- Host stack benchmark ---
+# Drives the real MainWindow/SerialHandler (every tab subscribed, Qt offscreen) against
+#   * a loopback pty fed with a pre-generated line mix at a ladder of rates, for RX
+#     throughput, CPU per line and the highest rate handled without coalescing/drops
+#   * the firmware simulator (utils.firmware_sim, own process), for command round trips
+# while a 1 ms timer measures how long the GUI event loop is blocked. Results go to JSON.
+#
+#   python -m utils.serial_bench --output bench.json
+
+RATE_LADDER = (1000, 2000, 5000, 10000, 20000, 50000, None) # lines/s; None = as fast as possible
+STEP_SECONDS = 1.0
+MAX_STEP_LINES = 20000
+LATENCY_ROUNDS = 200
+STALL_PROBE_INTERVAL_MS = 1
+PHASE_TIMEOUT_S = 60.0
+SENTINEL_LINE = "ACK: bench done"
+
+# Line mix written by the loopback source (cycled); PS frames are numbered on the fly
+LINE_MIX = (
+    'POS: {{"cartPos":{n},"orbPos":{m},"captPos":0,"rotServo":180,"gripServo":160,"actuatorSensor":1}}',
+    "PS:{seq} c{n} o{m}",
+    "SPOS: cart {n}",
+    "PS:{seq} c{n}",
+    "ACK: Stepper moving to {n}",
+    "PS:{seq} o{m}",
+)
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(fraction * (len(ordered) - 1)))))
+    return ordered[index]
+
+@contextlib.contextmanager
+def logged_message_boxes():
+    """A modal dialog would block the run; QMessageBox helpers log to stderr instead while active."""
+    from PyQt5.QtWidgets import QMessageBox
+    names = ("information", "warning", "critical")
+    originals = {name: QMessageBox.__dict__[name] for name in names}
+    for name in names:
+        setattr(QMessageBox, name, staticmethod(lambda *args, _n=name, **kwargs: print(f"[{_n}] {args[1:]}", file=sys.stderr)))
+    try:
+        yield
+    finally:
+        for name, original in originals.items():
+            setattr(QMessageBox, name, original)
+
+def summarize_ms(samples_s):
+    samples_ms = [s * 1000.0 for s in samples_s]
+    return {
+        "n": len(samples_ms),
+        "p50_ms": percentile(samples_ms, 0.50),
+        "p90_ms": percentile(samples_ms, 0.90),
+        "p99_ms": percentile(samples_ms, 0.99),
+        "max_ms": max(samples_ms) if samples_ms else None,
+    }
+
+
+class StallProbe:
+    """A 1 ms timer on the GUI thread; each late tick is time the event loop was blocked."""
+
+    def __init__(self):
+        from PyQt5.QtCore import QTimer, Qt
+        self.timer = QTimer()
+        self.timer.setTimerType(Qt.PreciseTimer)
+        self.timer.timeout.connect(self._tick)
+        self.stalls_s = []
+        self._last = None
+
+    def start(self):
+        self.stalls_s = []
+        self._last = time.perf_counter()
+        self.timer.start(STALL_PROBE_INTERVAL_MS)
+
+    def stop(self):
+        self.timer.stop()
+        result = summarize_ms(self.stalls_s)
+        result["over_16ms"] = sum(1 for s in self.stalls_s if s > 0.016)
+        result["over_50ms"] = sum(1 for s in self.stalls_s if s > 0.050)
+        return result
+
+    def _tick(self):
+        now = time.perf_counter()
+        self.stalls_s.append(max(0.0, now - self._last - STALL_PROBE_INTERVAL_MS / 1000.0))
+        self._last = now
+
+
+class LoopbackSource(threading.Thread):
+    """Writes `count` lines of LINE_MIX into a pty at `rate` lines/s (None = unpaced)."""
+
+    def __init__(self, count, rate=None):
+        super().__init__(daemon=True)
+        import tty # Unix only
+        self.count = count
+        self.rate = rate
+        self.master_fd, self.slave_fd = os.openpty()
+        tty.setraw(self.slave_fd)
+        self.port_name = os.ttyname(self.slave_fd)
+        self.go = threading.Event()
+        self.cpu_s = 0.0
+        self.started_at = None
+
+    def _payload(self):
+        lines = []
+        seq = 0
+        for i in range(self.count):
+            template = LINE_MIX[i % len(LINE_MIX)]
+            if template.startswith("PS:") and seq == 0:
+                template = "PS:{seq}K c{n} o{m} p0 r180 g160 a1" # Decoder needs a keyframe first
+            lines.append(template.format(n=i % 4400, m=(i * 7) % 6000, seq=seq))
+            if template.startswith("PS:"):
+                seq = (seq + 1) & 0xFFFF
+        lines.append(SENTINEL_LINE)
+        return [(line + "\r\n").encode("ascii") for line in lines]
+
+    def run(self):
+        lines = self._payload()
+        self.go.wait()
+        cpu_start = time.thread_time()
+        self.started_at = time.perf_counter()
+        sent = 0
+        while sent < len(lines):
+            due = len(lines) if self.rate is None else int((time.perf_counter() - self.started_at) * self.rate) + 1
+            if due > sent:
+                batch = lines[sent:min(due, len(lines))]
+                self._write_all(b"".join(batch))
+                sent += len(batch)
+            else:
+                time.sleep(0.0005)
+            self._drain_input()
+        self.cpu_s = time.thread_time() - cpu_start
+
+    def _write_all(self, data):
+        data = memoryview(data)
+        while data:
+            data = data[os.write(self.master_fd, data[:4096]):]
+
+    def _drain_input(self):
+        # Discard whatever the app writes (telemetry polls) so its writes never block
+        import select
+        while select.select([self.master_fd], [], [], 0)[0]:
+            if not os.read(self.master_fd, 4096):
+                break
+
+    def close(self):
+        for fd in (self.master_fd, self.slave_fd):
+            with contextlib.suppress(OSError):
+                os.close(fd)
+
+
+class Benchmark:
+    def __init__(self, latency_rounds, parse_cache_file):
+        from PyQt5.QtWidgets import QApplication
+        self.app = QApplication.instance() or QApplication([sys.argv[0]])
+        import main_app
+        self.window = main_app.MainWindow(parse_cache_file) # Not the user's cache in $HOME
+        self.window.build_all_tabs() # Tabs are built on first show; the benchmark wants them all subscribed
+        self.handler = self.window.serial_handler
+        self.latency_rounds = latency_rounds
+        self.probe = StallProbe()
+
+    def wait_until(self, predicate, timeout_s=PHASE_TIMEOUT_S):
+        """Runs the event loop (sleeping between events, so idle time costs no CPU) until predicate()."""
+        from PyQt5.QtCore import QEventLoop, QTimer
+        wakeup = QTimer()
+        wakeup.start(10) # Re-check the predicate at least this often
+        deadline = time.monotonic() + timeout_s
+        try:
+            while not predicate():
+                if time.monotonic() > deadline:
+                    raise TimeoutError("benchmark phase timed out")
+                self.app.processEvents(QEventLoop.AllEvents | QEventLoop.WaitForMoreEvents)
+        finally:
+            wakeup.stop()
+
+    def connect(self, port_name, description):
+        self.handler.add_extra_port(port_name, description)
+        self.handler.connect_serial()
+        self.wait_until(lambda: self.handler.reader_thread is not None, 5.0)
+
+    def disconnect(self):
+        self.handler.disconnect_serial()
+
+    # --- Phases ---
+    def run_throughput(self):
+        steps = [self.run_rate_step(rate) for rate in RATE_LADDER]
+        clean = [step for step in steps if step["target_lines_per_s"] and step["lines_coalesced_or_dropped"] == 0]
+        best = max(clean, key=lambda step: step["target_lines_per_s"]) if clean else steps[0]
+        return {
+            "sustained_lines_per_s": best["target_lines_per_s"] if clean else 0,
+            "burst_lines_per_s": steps[-1]["handled_lines_per_s"],
+            "burst_written_lines_per_s": steps[-1]["written_lines_per_s"], # Includes coalesced/dropped lines
+            "cpu_us_per_line": best["cpu_us_per_line"], # Every line fully handled, no coalescing shortcuts
+            "steps": steps,
+        }
+
+    def run_rate_step(self, rate):
+        count = MAX_STEP_LINES if rate is None else min(MAX_STEP_LINES, int(rate * STEP_SECONDS))
+        source = LoopbackSource(count, rate)
+        source.start()
+        self.connect(source.port_name, "Benchmark loopback")
+        seen = []
+        on_line = lambda line: seen.append(True) if line == SENTINEL_LINE else None
+        self.handler.data_received.connect(on_line)
+        handled_before = self.handler.lines_handled
+
+        self.probe.start()
+        cpu_start = time.process_time()
+        source.go.set()
+        self.wait_until(lambda: seen)
+        elapsed = time.perf_counter() - source.started_at
+        cpu = time.process_time() - cpu_start - source.cpu_s
+        stalls = self.probe.stop()
+
+        self.handler.data_received.disconnect(on_line)
+        dropped = self.handler.reader_thread.dropped_lines
+        handled = self.handler.lines_handled - handled_before
+        self.disconnect()
+        source.close()
+        total = count + 1
+        return {
+            "target_lines_per_s": rate,
+            "lines_written": total,
+            "lines_handled": handled,
+            "lines_coalesced_or_dropped": dropped,
+            "seconds": elapsed,
+            "written_lines_per_s": total / elapsed,
+            "handled_lines_per_s": handled / elapsed, # Delivered to the message bus
+            "cpu_us_per_line": cpu / total * 1e6,
+            "event_loop_stalls": stalls,
+        }
+
+    def run_latency(self):
+        simulator = subprocess.Popen([sys.executable, "-u", "-m", "utils.firmware_sim"],
+                                     cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                     stdout=subprocess.PIPE, text=True)
+        try:
+            port_name = simulator.stdout.readline().split(" on ", 1)[1].split(" ")[0]
+            self.connect(port_name, "Firmware simulator")
+            self.wait_until(lambda: self.handler.command_tracker.sequence_ids is not None, 5.0)
+            self.handler.telemetry_poller.stop() # Keep background polls out of the timings
+            results = {"sequence_ids": bool(self.handler.command_tracker.sequence_ids)}
+            self.probe.start()
+            for name, command in (("ping", "ping"), ("setconfig", "setconfig stepper_speed 4000")):
+                latencies = []
+                for _ in range(self.latency_rounds):
+                    future = self.handler.send_command_async(command)
+                    self.wait_until(lambda: future.done)
+                    if future.ok:
+                        latencies.append(future.latency_s)
+                results[name] = summarize_ms(latencies)
+                results[name]["failed"] = self.latency_rounds - len(latencies)
+            results["event_loop_stalls"] = self.probe.stop()
+            self.disconnect()
+            return results
+        finally:
+            simulator.terminate()
+            simulator.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the serial host stack (Linux/macOS).")
+    parser.add_argument("--output", default="bench_results.json", help="Where to write the JSON results")
+    parser.add_argument("--rounds", type=int, default=LATENCY_ROUNDS, help="Round trips per command")
+    options = parser.parse_args()
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+    with tempfile.TemporaryDirectory() as cache_dir, logged_message_boxes(), \
+         open(os.devnull, "w") as quiet, contextlib.redirect_stdout(quiet): # The app logs every line
+        bench = Benchmark(options.rounds, os.path.join(cache_dir, "config_parse_cache.json"))
+        throughput = bench.run_throughput()
+        latency = bench.run_latency()
+    results = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "throughput": throughput,
+        "latency": latency,
+    }
+    with open(options.output, "w") as f:
+        json.dump(results, f, indent=2)
+
+    for step in throughput["steps"]:
+        target = f"{step['target_lines_per_s']}/s" if step["target_lines_per_s"] else "burst"
+        print(f"RX {target:>8}: {step['handled_lines_per_s']:8.0f} lines/s handled, "
+              f"{step['lines_coalesced_or_dropped']} coalesced/dropped, worst stall {step['event_loop_stalls']['max_ms']:.1f} ms")
+    print(f"Sustained without loss: {throughput['sustained_lines_per_s']} lines/s, "
+          f"{throughput['cpu_us_per_line']:.1f} us CPU/line")
+    for name in ("ping", "setconfig"):
+        print(f"{name}: p50 {latency[name]['p50_ms']:.2f} ms, p99 {latency[name]['p99_ms']:.2f} ms")
+    print(f"Results written to {options.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,131 @@
 import serial
-import serial.tools.list_ports
-from PyQt5.QtCore import QObject, pyqtSignal, QTimer, QMutex, QMutexLocker
+from PyQt5.QtCore import QObject, QThread, pyqtSignal, QTimer, QMutex, QMutexLocker
 from PyQt5.QtWidgets import QGroupBox, QHBoxLayout, QLabel, QComboBox, QPushButton, QMessageBox
-import json
+import collections
+import time
+
+from utils.command_futures import CommandFuture, CommandTracker
+from utils.config_sync import DeviceConfigSync
+from utils.message_bus import MessageBus, Pos, SPos
+from utils.position_stream import PositionStreamDecoder, STREAM_PREFIX
+from utils.telemetry_poller import TelemetryPoller
+from utils.telemetry_recorder import TelemetryRecorder
 
 # Constants
-SERIAL_TIMEOUT = 0.1  # Timeout for readline() in seconds
+SERIAL_TIMEOUT = 0.1  # Timeout for blocking reads in the reader thread, in seconds
 SERIAL_BAUDRATE = 115200
-READ_TIMER_INTERVAL_MS = 50 # How often to check for incoming serial data
+LINE_QUEUE_MAX = 1000 # Hard cap on complete lines waiting for the GUI thread
+POS_COALESCE_THRESHOLD = 50 # Above this backlog, queued POS telemetry is coalesced to the latest line
+MAX_PARTIAL_LINE_BYTES = 4096 # A "line" longer than this without a newline is garbage, drop it
+COMMAND_TIMEOUT_CHECK_MS = 100 # How often pending command futures are checked for timeouts
+
+_COALESCED_POS = object() # Queue placeholder for the latest coalesced POS line
+
+
+class SerialReaderThread(QThread):
+    """
+    Reads the serial port off the GUI thread. Bytes are read in bulk chunks,
+    framed into lines and pushed into a bounded queue; the GUI thread is
+    notified once per batch and drains everything that has accumulated.
+    """
+    lines_available = pyqtSignal()
+    read_error = pyqtSignal(str)
+
+    def __init__(self, serial_connection, parent=None):
+        super().__init__(parent)
+        self.serial_connection = serial_connection
+        self.running = True
+        self.dropped_lines = 0 # Lines lost to backpressure (coalesced or evicted)
+
+        self._partial = bytearray()
+        self._queue = collections.deque()
+        self._queue_mutex = QMutex()
+        self._latest_pos = None
+        self._notify_pending = False
+
+    def stop(self):
+        """Asks the thread to exit; returns once it has finished (at most one read timeout)."""
+        self.running = False
+        self.wait()
+
+    def run(self):
+        while self.running:
+            try:
+                waiting = self.serial_connection.in_waiting
+                # Block for at most SERIAL_TIMEOUT when idle, otherwise take everything buffered
+                chunk = self.serial_connection.read(waiting if waiting > 0 else 1)
+            except Exception as e:
+                # This often happens if the USB cable is unplugged
+                if self.running:
+                    self.read_error.emit(str(e))
+                return
+            if chunk:
+                self._frame_lines(chunk)
+
+    def _frame_lines(self, chunk):
+        self._partial += chunk.replace(b"\r", b"\n")
+        if b"\n" not in self._partial:
+            if len(self._partial) > MAX_PARTIAL_LINE_BYTES:
+                self._partial.clear()
+            return
+        *complete, rest = self._partial.split(b"\n")
+        self._partial = bytearray(rest)
+        lines = [raw.decode('utf-8', errors='ignore').strip() for raw in complete]
+        self._enqueue([line for line in lines if line])
+
+    def _enqueue(self, lines):
+        if not lines:
+            return
+        with QMutexLocker(self._queue_mutex):
+            for line in lines:
+                if line.startswith("POS:") and len(self._queue) >= POS_COALESCE_THRESHOLD:
+                    # Overloaded: keep a single slot for the newest position snapshot
+                    if self._latest_pos is None:
+                        self._queue.append(_COALESCED_POS)
+                    else:
+                        self.dropped_lines += 1
+                    self._latest_pos = line
+                    continue
+                if len(self._queue) >= LINE_QUEUE_MAX:
+                    if self._queue.popleft() is _COALESCED_POS:
+                        self._latest_pos = None
+                    self.dropped_lines += 1
+                self._queue.append(line)
+            notify = not self._notify_pending
+            self._notify_pending = True
+        if notify:
+            self.lines_available.emit()
+
+    def take_lines(self):
+        """Called from the GUI thread: returns every queued line, oldest first."""
+        with QMutexLocker(self._queue_mutex):
+            queued = self._queue
+            latest_pos = self._latest_pos
+            self._queue = collections.deque()
+            self._latest_pos = None
+            self._notify_pending = False
+        return [latest_pos if line is _COALESCED_POS else line for line in queued]
+
+
+class PortScanThread(QThread):
+    """Enumerates serial ports off the GUI thread (this can take a while on Windows)."""
+    ports_found = pyqtSignal(list) # [(device, description)] of likely ESP32 adapters
+
+    def run(self):
+        import serial.tools.list_ports
+        ports = []
+        for port_info in sorted(serial.tools.list_ports.comports()):
+            # Filter for common USB-to-Serial chip descriptions
+            if "USB" in port_info.description or "CH340" in port_info.description or \
+               "CP210x" in port_info.description or "uart" in port_info.description.lower():
+                ports.append((port_info.device, port_info.description))
+        self.ports_found.emit(ports)
+
 
 class SerialHandler(QObject):
     # Signals to communicate with the rest of the application
     connection_status_changed = pyqtSignal(bool, str) # connected (bool), port_name/message (str)
-    data_received = pyqtSignal(str) # Raw line received from ESP32
+    data_received = pyqtSignal(str) # Raw line received from ESP32 (typed messages go through message_bus)
 
     def __init__(self, parent_window=None):
         super().__init__()
@@ -20,13 +133,36 @@ class SerialHandler(QObject):
         self.connected_port = None
         self.parent_window = parent_window
         self.is_disconnecting = False # Flag to prevent race conditions on disconnect
+        self.extra_ports = [] # (device, description) not found by port enumeration, e.g. the simulator
+        self.scanned_ports = None # (device, description) from the last port scan; None until it finishes
+        self.port_scan_thread = None
 
 
         self.write_mutex = QMutex()
 
-        # Timer for periodically reading serial data
-        self.serial_read_timer = QTimer(self)
-        self.serial_read_timer.timeout.connect(self._read_serial_data)
+        # Background thread that frames incoming lines; created per connection
+        self.reader_thread = None
+        self.lines_handled = 0 # Lines drained by the GUI thread since startup (for benchmarks)
+
+        # Each line is parsed once here and dispatched to tabs by message type
+        self.message_bus = MessageBus()
+        self.stream_decoder = PositionStreamDecoder() # Rebuilds Pos from pushed 'PS:' frames
+
+        # One adaptive 'getallpos' stream shared by every tab
+        self.telemetry_poller = TelemetryPoller(self)
+
+        # Every position sample, kept (constant memory) for the telemetry plots and export
+        self.telemetry_recorder = TelemetryRecorder()
+        self.message_bus.subscribe(Pos, self.telemetry_recorder.on_pos_message)
+        self.message_bus.subscribe(SPos, self.telemetry_recorder.on_spos_message)
+
+        # Pending send_command_async() futures, matched against replies as they arrive
+        self.command_tracker = CommandTracker()
+        self.command_timeout_timer = QTimer(self)
+        self.command_timeout_timer.timeout.connect(self._expire_pending_commands)
+
+        # Config values last confirmed on the ESP32, so only differences are re-sent
+        self.device_config = DeviceConfigSync(self.send_command_async)
         
         # Initialize the UI components this handler manages
         self._init_ui()
@@ -58,24 +194,35 @@ class SerialHandler(QObject):
         return self.serial_group
 
     def populate_serial_ports(self):
-        """Finds and lists available COM ports."""
+        """Lists the ports known so far and rescans COM ports in the background."""
         if self.is_connected():
             return # Don't refresh while connected
+        self._fill_port_combo_box()
+        if self.port_scan_thread is None or not self.port_scan_thread.isRunning():
+            self.port_scan_thread = PortScanThread(self)
+            self.port_scan_thread.ports_found.connect(self._on_ports_scanned)
+            self.port_scan_thread.start()
+
+    def _on_ports_scanned(self, ports):
+        self.scanned_ports = ports
+        if not self.is_connected():
+            self._fill_port_combo_box()
 
+    def wait_for_port_scan(self):
+        if self.port_scan_thread is not None:
+            self.port_scan_thread.wait()
+
+    def _fill_port_combo_box(self):
         current_selection = self.port_combo_box.currentData()
         self.port_combo_box.clear()
-        
-        ports = sorted(serial.tools.list_ports.comports())
+
         found_ports = False
-        for port_info in ports:
-            # Filter for common USB-to-Serial chip descriptions
-            if "USB" in port_info.description or "CH340" in port_info.description or \
-               "CP210x" in port_info.description or "uart" in port_info.description.lower():
-                self.port_combo_box.addItem(f"{port_info.device} - {port_info.description}", port_info.device)
-                found_ports = True
-        
+        for device, description in self.extra_ports + (self.scanned_ports or []):
+            self.port_combo_box.addItem(f"{device} - {description}", device)
+            found_ports = True
+
         if not found_ports:
-            self.port_combo_box.addItem("No suitable ports found")
+            self.port_combo_box.addItem("Scanning for ports..." if self.scanned_ports is None else "No suitable ports found")
             self.port_combo_box.setEnabled(False)
             self.connect_button.setEnabled(False)
         else:
@@ -86,6 +233,12 @@ class SerialHandler(QObject):
             if index != -1:
                 self.port_combo_box.setCurrentIndex(index)
 
+    def add_extra_port(self, device, description):
+        """Lists and selects a port that enumeration can't see, such as the simulator's pty."""
+        self.extra_ports.append((device, description))
+        self._fill_port_combo_box()
+        self.port_combo_box.setCurrentIndex(self.port_combo_box.findData(device))
+
     def toggle_connection(self):
         if self.is_connected():
             self.disconnect_serial()
@@ -129,10 +282,19 @@ class SerialHandler(QObject):
             self.connect_button.setText("Disconnect")
             self.port_combo_box.setEnabled(False)
             self.refresh_ports_button.setEnabled(False)
-            self.serial_read_timer.start(READ_TIMER_INTERVAL_MS)
+            self.reader_thread = SerialReaderThread(self.serial_connection, self)
+            self.reader_thread.lines_available.connect(self._read_serial_data)
+            self.reader_thread.read_error.connect(self._handle_read_error)
+            self.reader_thread.start()
             self.connection_status_changed.emit(True, self.connected_port)
             print(f"Serial: Connection to {self.connected_port} finalized.")
-            self.send_command("ping") # Test with a ping
+            # Test with a ping, tagged to find out if the firmware echoes sequence IDs
+            probe, wire_text = self.command_tracker.create_probe(time.monotonic())
+            probe.add_done_callback(lambda f: print(f"Serial: Firmware sequence IDs {'supported' if self.command_tracker.sequence_ids else 'not supported'}."))
+            self._send_tracked(probe, wire_text)
+            self.device_config.reset()
+            self.stream_decoder.reset()
+            self.telemetry_poller.start()
         else:
              # The connection might have failed in the short delay
              self.disconnect_serial()
@@ -142,7 +304,14 @@ class SerialHandler(QObject):
         if self.is_disconnecting: return # Prevent re-entry
         self.is_disconnecting = True
 
-        self.serial_read_timer.stop()
+        self.telemetry_poller.stop()
+        self.command_timeout_timer.stop()
+        # Stop the reader before closing the port it is blocked on
+        if self.reader_thread:
+            self.reader_thread.stop()
+            if self.reader_thread.dropped_lines:
+                print(f"Serial: {self.reader_thread.dropped_lines} lines dropped under load.")
+            self.reader_thread = None
         
         old_port = self.connected_port
         
@@ -154,6 +323,8 @@ class SerialHandler(QObject):
         
         self.serial_connection = None
         self.connected_port = None
+        # After the port is gone, so callbacks that send again get 'not sent'
+        self.command_tracker.fail_all("disconnected", time.monotonic())
 
         self.status_label.setText("Not Connected")
         self.status_label.setStyleSheet("color: red; font-weight: bold;")
@@ -169,6 +340,56 @@ class SerialHandler(QObject):
         return self.serial_connection and self.serial_connection.is_open
 
     def send_command(self, command):
+        if not self._write_command(command):
+            return False
+        # Outside the write lock: the poller may send follow-up commands of its own
+        self.telemetry_poller.note_command(command)
+        return True
+
+    def send_command_async(self, command, timeout_s=None):
+        """
+        Sends a command and returns a CommandFuture that resolves on the matching
+        ACK/SPOS/... reply, an ERR line, or after timeout_s (a per-command default if None).
+        """
+        future, wire_text = self.command_tracker.create(command, time.monotonic(), timeout_s)
+        self._send_tracked(future, wire_text)
+        return future
+
+    def push_config(self, config_values, keys=None):
+        """
+        Sends the given config keys (all firmware keys if None) that differ from what the
+        ESP32 last confirmed, as one 'setconfigs' batch. Returns a CommandFuture with
+        `applied`/`rejected` key lists.
+        """
+        if not self.is_connected():
+            result = CommandFuture("setconfigs", 0, time.monotonic())
+            result.applied, result.rejected = [], []
+            result.resolve(True, time.monotonic(), reply="ESP32 not connected")
+            return result
+        return self.device_config.push(config_values, keys, time.monotonic())
+
+    def download_config(self):
+        """Reads all config values and position targets in one exchange; see DeviceConfigSync.download()."""
+        return self.device_config.download(time.monotonic())
+
+    def upload_config(self, config_values):
+        """Writes all config values and position targets in one exchange; see DeviceConfigSync.upload()."""
+        return self.device_config.upload(config_values, time.monotonic())
+
+    def _send_tracked(self, future, wire_text):
+        if not self._write_command(wire_text):
+            self.command_tracker.cancel(future, "not sent", time.monotonic())
+            return
+        self.telemetry_poller.note_command(future.command, future)
+        if not self.command_timeout_timer.isActive():
+            self.command_timeout_timer.start(COMMAND_TIMEOUT_CHECK_MS)
+
+    def _expire_pending_commands(self):
+        self.command_tracker.expire(time.monotonic())
+        if not self.command_tracker.pending:
+            self.command_timeout_timer.stop()
+
+    def _write_command(self, command):
         with QMutexLocker(self.write_mutex): # Protect write access
             if not self.is_connected():
                 print("Serial: Not connected. Command not sent.")
@@ -178,37 +399,45 @@ class SerialHandler(QObject):
             try:
                 command_bytes = (command + "\n").encode('utf-8')
                 self.serial_connection.write(command_bytes)
-                if (command.startswith("getallpos") == False) :
+                if (command.endswith("getallpos") == False) : # Also when sent as '#<id> getallpos'
                     print(f"SERIAL TX: {command}")
                 return True
             except serial.SerialTimeoutException as e:
                 print(f"Serial send timeout error: {e}")
-                QMessageBox.warning(self.parent_window, "Serial Send Error", f"Timeout sending command: {e}")
-                self.disconnect_serial()
+                error_text = f"Timeout sending command: {e}"
             except Exception as e:
                 print(f"Serial send error: {e}")
-                QMessageBox.warning(self.parent_window, "Serial Send Error", f"Error sending command: {e}\nDisconnected.")
-                self.disconnect_serial()
+                error_text = f"Error sending command: {e}\nDisconnected."
+        # Outside the lock: the dialog and the futures failed on disconnect may send commands
+        QMessageBox.warning(self.parent_window, "Serial Send Error", error_text)
+        self.disconnect_serial()
         return False
 
     def _read_serial_data(self):
-        if not self.is_connected():
+        """Drains the reader thread's queue; runs on the GUI thread once per batch."""
+        if not self.reader_thread:
             return
 
-        try:
-            # Read all available lines in buffer to prevent lag
-            while self.serial_connection.in_waiting > 0:
-                line = self.serial_connection.readline().decode('utf-8', errors='ignore').strip()
-                if line :
-           
-                    if (line.startswith("POS") == False) :
-                        print(f"SERIAL RX: {line}")
-                        
-                    self.data_received.emit(line)
-        except serial.SerialException as e:
-            # This often happens if the USB cable is unplugged
-            print(f"Serial read error (port likely lost): {e}")
-            QMessageBox.critical(self.parent_window, "Serial Connection Lost", f"Lost connection to port:\n{e}")
-            self.disconnect_serial()
-        except Exception as e:
-            print(f"Unexpected serial read error: {e}")
\ No newline at end of file
+        now = time.monotonic()
+        lines = self.reader_thread.take_lines()
+        self.lines_handled += len(lines)
+        for line in lines:
+            if line.startswith(STREAM_PREFIX):
+                pos = self.stream_decoder.feed(line)
+                if pos is not None:
+                    self.message_bus.publish(pos)
+                continue
+
+            if self.command_tracker.feed(line, now):
+                continue # Protocol bookkeeping only (BEGIN/DONE #<id>)
+
+            if (line.startswith("POS") == False) :
+                print(f"SERIAL RX: {line}")
+
+            self.data_received.emit(line)
+            self.message_bus.dispatch(line)
+
+    def _handle_read_error(self, message):
+        print(f"Serial read error (port likely lost): {message}")
+        QMessageBox.critical(self.parent_window, "Serial Connection Lost", f"Lost connection to port:\n{message}")
+        self.disconnect_serial()
@@ -0,0 +1,239 @@
+import argparse
+import sys
+
+from utils.config_parser import DEFAULT_CONFIG_VALUES
+from utils.message_bus import HomeCheck, SPos, parse_line
+from utils.motion_estimator import MotionModel, trapezoid_time
+from utils.move_profiler import plan_random_walk
+
+# --- Stepper speed/acceleration tuner ---
+# Looks for the STEPPER_SPEED/STEPPER_ACCEL pair that plays moves fastest without losing
+# steps. Candidates are tried fastest first (by the motion estimator's time for a fixed
+# set of 'do' moves). For each one, every axis is re-homed with 'homecheck', run back and
+# forth between its outermost calibrated targets with goto*/getpos, and re-homed again:
+# the position counted when the endstop triggers is the number of steps lost. The
+# firmware uses one speed and acceleration for all three steppers, so a candidate passes
+# only if every axis holds its position; the first candidate that passes is the result.
+# Candidates at least as fast and as hard as one that failed are skipped untested.
+#
+#   python -m utils.speed_tuner          (against the firmware simulator)
+
+TUNE_SPEEDS = (4000, 5000, 6000, 7000, 8000, 10000)
+TUNE_ACCELS = (5000, 7500, 10000, 12500, 15000, 20000)
+TUNE_CYCLES = 3            # Round trips per axis and candidate
+LOST_STEP_TOLERANCE = 2    # Steps off at the endstop still counted as no loss
+ARRIVAL_MARGIN_S = 0.1     # Added to the predicted travel time before the first getpos
+ARRIVAL_POLL_S = 0.1
+ARRIVAL_TIMEOUT_S = 5.0    # Past the predicted travel time
+
+# (axis, its targets in CONFIG_VALUES); the capture wheel first, the cart can't go low unless it is home
+TUNE_AXES = (("capt", "captureTargets"), ("cart", "cartTargets"), ("orb", "orbTargets"))
+REFERENCE_MOVES = plan_random_walk(200, seed=1) # What "fastest" is measured on
+
+
+def rank_candidates(config_values, speeds=TUNE_SPEEDS, accels=TUNE_ACCELS):
+    """[(predicted seconds for REFERENCE_MOVES, speed, accel)], fastest first."""
+    ranked = []
+    for speed in speeds:
+        for accel in accels:
+            model = MotionModel(dict(config_values, STEPPER_SPEED=speed, STEPPER_ACCEL=accel))
+            ranked.append((model.estimate_sequence(REFERENCE_MOVES)[0], speed, accel))
+    return sorted(ranked)
+
+
+class CandidateResult:
+    """One tested speed/accel pair and the steps each tested axis lost."""
+
+    def __init__(self, speed, accel, predicted_s):
+        self.speed = speed
+        self.accel = accel
+        self.predicted_s = predicted_s
+        self.lost_steps = {} # axis -> position counted at the endstop (0 = nothing lost)
+
+    def passed(self, tolerance=LOST_STEP_TOLERANCE):
+        return len(self.lost_steps) == len(TUNE_AXES) and all(abs(v) <= tolerance for v in self.lost_steps.values())
+
+    def describe(self):
+        lost = ", ".join(f"{axis} {steps:+d}" for axis, steps in self.lost_steps.items())
+        return f"speed {self.speed}, accel {self.accel}: {self.predicted_s:.1f} s predicted, lost steps {lost or '-'}"
+
+
+class SpeedTuner:
+    """
+    Runs the search through send_async (SerialHandler.send_command_async), push_config
+    ({key: value} -> future, e.g. SerialHandler.push_config) and call_later(seconds,
+    callback) (QTimer.singleShot in the app). The robot must be able to move freely.
+    """
+
+    def __init__(self, send_async, push_config, call_later, config_values,
+                 speeds=TUNE_SPEEDS, accels=TUNE_ACCELS, cycles=TUNE_CYCLES, tolerance=LOST_STEP_TOLERANCE):
+        self.send_async = send_async
+        self.push_config = push_config
+        self.call_later = call_later
+        self.config_values = config_values
+        self.speeds, self.accels = speeds, accels
+        self.cycles = cycles
+        self.tolerance = tolerance
+        self.running = False
+        self.results = []
+        self.best = None
+
+    def start(self, on_progress=None, on_finished=None):
+        """on_progress(text) along the way; on_finished(best CandidateResult or None, results, reason)."""
+        self._on_progress, self._on_finished = on_progress, on_finished
+        self.original = {key: self.config_values[key] for key in ("STEPPER_SPEED", "STEPPER_ACCEL")}
+        self.queue = rank_candidates(self.config_values, self.speeds, self.accels)
+        self.results, self.best = [], None
+        self.running = True
+        self._next_candidate()
+
+    def stop(self):
+        """Stops after the command in progress and restores the original speed and acceleration."""
+        self.running = False
+
+    def _progress(self, text):
+        print(f"SpeedTuner: {text}")
+        if self._on_progress:
+            self._on_progress(text)
+
+    def _then(self, future, callback):
+        """callback(future) once it succeeds; ends the run if it fails or the tuner was stopped."""
+        def on_done(f):
+            if not self.running:
+                self._finish("stopped")
+            elif not f.ok:
+                self._finish(f"'{f.command}' failed: {f.error}")
+            else:
+                callback(f)
+        future.add_done_callback(on_done)
+
+    # --- Candidates ---
+    def _dominated(self, speed, accel):
+        return any(speed >= r.speed and accel >= r.accel for r in self.results if not r.passed(self.tolerance))
+
+    def _next_candidate(self):
+        while self.queue:
+            predicted_s, speed, accel = self.queue.pop(0)
+            if not self._dominated(speed, accel):
+                break
+        else:
+            self._finish("no reliable candidate" if self.best is None else "done")
+            return
+        self.current = CandidateResult(speed, accel, predicted_s)
+        self.results.append(self.current)
+        self._progress(f"Testing speed {speed}, accel {accel} ({predicted_s:.1f} s predicted)...")
+        self._then(self.push_config({"STEPPER_SPEED": speed, "STEPPER_ACCEL": accel}), lambda f: self._start_axis(0))
+
+    def _candidate_done(self):
+        self._progress(self.current.describe())
+        if self.current.passed(self.tolerance):
+            self.best = self.current # Everything predicted faster failed or was ruled out
+            self._finish("done")
+        else:
+            self._next_candidate()
+
+    # --- One axis: homecheck, round trips, homecheck ---
+    def _start_axis(self, index):
+        if index == len(TUNE_AXES):
+            self._candidate_done()
+            return
+        self.axis_index = index
+        self.axis, targets_key = TUNE_AXES[index]
+        targets = self.config_values[targets_key]
+        self.steps = ["homecheck"] + [max(targets), min(targets)] * self.cycles + ["homecheck"]
+        self._run_step(0)
+
+    def _run_step(self, index):
+        if index == len(self.steps):
+            self._start_axis(self.axis_index + 1)
+        elif self.steps[index] == "homecheck":
+            self._then(self.send_async(f"homecheck {self.axis}"), lambda f: self._on_homecheck(f, index))
+        else:
+            target = self.steps[index]
+            travel_s = trapezoid_time(target - self.position, self.current.speed, self.current.accel)
+            self._then(self.send_async(f"goto{self.axis} {target}"),
+                       lambda f: self.call_later(travel_s + ARRIVAL_MARGIN_S, lambda: self._poll(index, 0)))
+
+    def _on_homecheck(self, future, index):
+        message = parse_line(future.reply)
+        if not isinstance(message, HomeCheck):
+            self._finish(f"unexpected homecheck reply: {future.reply}")
+            return
+        self.position = 0
+        if index == 0:
+            self._run_step(1) # Just re-zeroing after the previous candidate
+            return
+        self.current.lost_steps[self.axis] = message.position
+        if abs(message.position) > self.tolerance:
+            self._candidate_done() # No need to test the other axes
+        else:
+            self._run_step(index + 1)
+
+    def _poll(self, index, polls):
+        if not self.running:
+            self._finish("stopped")
+            return
+        self._then(self.send_async(f"getpos {self.axis}"), lambda f: self._on_position(f, index, polls))
+
+    def _on_position(self, future, index, polls):
+        message = parse_line(future.reply)
+        target = self.steps[index]
+        if isinstance(message, SPos) and message.position == target:
+            self.position = target
+            self._run_step(index + 1)
+        elif polls * ARRIVAL_POLL_S >= ARRIVAL_TIMEOUT_S:
+            self._finish(f"{self.axis} did not reach {target}")
+        else:
+            self.call_later(ARRIVAL_POLL_S, lambda: self._poll(index, polls + 1))
+
+    def _finish(self, reason):
+        self.running = False
+        values = self.original if self.best is None else {"STEPPER_SPEED": self.best.speed, "STEPPER_ACCEL": self.best.accel}
+        self._progress(f"Finished ({reason}); setting speed {values['STEPPER_SPEED']}, accel {values['STEPPER_ACCEL']}.")
+        def report(_future):
+            if self._on_finished:
+                self._on_finished(self.best, self.results, reason)
+        self.push_config(values).add_done_callback(report)
+
+
+def main(argv=None):
+    from utils.config_sync import DeviceConfigSync
+    from utils.firmware_sim import SimulatorLink
+
+    parser = argparse.ArgumentParser(description="Run the speed/acceleration tuner against the firmware simulator.")
+    parser.add_argument("--speeds", default=",".join(map(str, TUNE_SPEEDS)), help="Comma-separated STEPPER_SPEED values")
+    parser.add_argument("--accels", default=",".join(map(str, TUNE_ACCELS)), help="Comma-separated STEPPER_ACCEL values")
+    parser.add_argument("--cycles", type=int, default=TUNE_CYCLES, help="Round trips per axis and candidate")
+    args = parser.parse_args(argv)
+    try:
+        speeds = tuple(int(v) for v in args.speeds.split(","))
+        accels = tuple(int(v) for v in args.accels.split(","))
+    except ValueError:
+        print("Error: --speeds/--accels need comma-separated integers", file=sys.stderr)
+        return 2
+
+    link = SimulatorLink()
+    link.send_command_async("homeall")
+    link.advance(30000)
+    device_config = DeviceConfigSync(link.send_command_async)
+    config_values = {key: list(value) if isinstance(value, list) else value for key, value in DEFAULT_CONFIG_VALUES.items()}
+    outcome = []
+    tuner = SpeedTuner(link.send_command_async, lambda values: device_config.push(values, values.keys()),
+                       link.call_later, config_values, speeds, accels, args.cycles)
+    tuner.start(on_finished=lambda best, results, reason: outcome.append((best, results, reason)))
+    link.run()
+
+    best, results, reason = outcome[0]
+    print(f"\n{len(results)} of {len(speeds) * len(accels)} candidates tested in "
+          f"{link.simulator.now_ms / 60000:.1f} simulated minutes ({reason}):")
+    for result in results:
+        print(("  PASS " if result.passed() else "  FAIL ") + result.describe())
+    if best is None:
+        print("No candidate ran without losing steps.")
+        return 1
+    print(f"Fastest reliable: STEPPER_SPEED={best.speed} STEPPER_ACCEL={best.accel}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
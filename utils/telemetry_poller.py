@@ -0,0 +1,184 @@
+import time
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+
+from utils.message_bus import Pos, Progress
+
+# Constants
+IDLE_POLL_INTERVAL_MS = 2000   # Nothing is moving: a slow heartbeat is enough
+MOTION_POLL_INTERVAL_MS = 250  # A jog or goto is in progress: keep the readouts live
+REPLY_TIMEOUT_S = 1.0          # A getallpos without a POS reply after this long is considered lost
+MOTION_IDLE_AFTER_S = 0.75     # No position change for this long ends the motion phase
+STREAM_MOTION_HZ = 25          # Push-mode rate requested from the firmware during motion
+BLOCKING_SEQUENCE_TIMEOUT_S = 30.0 # Safety net if a blocking sequence never reports completion
+
+# Commands that start motion (by prefix)
+MOTION_COMMANDS = ("goto", "jog ", "homeall", "move ")
+
+# Blocking firmware sequences: the firmware ignores serial input until one of these lines arrives.
+# Firmware that reports 'take'/'release'/'do' progress ('EVT:' lines) keeps answering meanwhile.
+BLOCKING_SEQUENCE_END = {
+    "do": ("Do Sequence Complete",),
+    "take": ("Take Sequence Complete",),
+    "release": ("Release Sequence Complete",),
+    "la_ext_timed": ("Extend (timed) complete",),
+    "la_ret": ("Retract (sensor) complete", "Timed retract, sensor NOT triggered"),
+}
+# Errors that mean the sequence never started (the firmware checks its arguments first).
+# Other ERR lines may belong to earlier commands, or be reported mid-sequence without ending it.
+BLOCKING_SEQUENCE_ERRORS = {
+    "do": ("ERR: Steppers not homed", "ERR: Invalid loc", "ERR: Square fmt", "ERR: Invalid file",
+           "ERR: Invalid rank", "ERR: Invalid slot num", "ERR: Capt num missing"),
+}
+
+
+class TelemetryPoller(QObject):
+    """
+    Single owner of the 'getallpos' request stream. Polls slowly when idle, fast while
+    something is moving, and not at all while a blocking sequence runs on the ESP32
+    (sequences that report progress count as motion: positions stay live throughout).
+    During motion it asks the firmware to push positions ('stream') instead, falling back
+    to fast polling if the firmware does not know the command.
+    The latest POS snapshot is kept in `latest` and published through snapshot_updated.
+    """
+    snapshot_updated = pyqtSignal(object) # Pos
+
+    def __init__(self, serial_handler):
+        super().__init__(serial_handler)
+        self.serial_handler = serial_handler
+        self.latest = None
+
+        self.jog_active = False
+        self.sequence_active = False     # A sequence reporting progress is running
+        self.motion_active = False
+        self.last_change_at = 0.0
+        self.stream_supported = True
+        self.streaming = False
+        self.blocking_end_markers = None # Set while a blocking sequence is running
+        self.blocking_errors = ()
+        self.blocking_future = None      # Its CommandFuture, if it was sent with one
+        self.blocking_started_at = 0.0
+        self.request_sent_at = None      # Time of the unanswered getallpos, if any
+
+        self.poll_timer = QTimer(self)
+        self.poll_timer.timeout.connect(self._poll)
+
+        self.serial_handler.message_bus.subscribe(Pos, self.on_pos_message)
+        self.serial_handler.message_bus.subscribe(Progress, self.on_progress)
+        self.serial_handler.data_received.connect(self.on_line)
+
+    # --- Lifecycle ---
+    def start(self):
+        self.latest = None
+        self.jog_active = False
+        self.sequence_active = False
+        self.blocking_end_markers = None
+        self.blocking_future = None
+        self.request_sent_at = None
+        self.stream_supported = True
+        self.streaming = False
+        self._set_motion_active(False)
+        self.request_now()
+
+    def stop(self):
+        self.poll_timer.stop()
+        self.request_sent_at = None
+        self.streaming = False
+
+    def request_now(self):
+        """Polls immediately (e.g. for a 'Get' button) unless a request is already in flight."""
+        self._poll()
+        if not self.poll_timer.isActive() and self.serial_handler.is_connected():
+            self.poll_timer.start(MOTION_POLL_INTERVAL_MS if self.motion_active else IDLE_POLL_INTERVAL_MS)
+
+    # --- Inputs ---
+    def note_command(self, command, future=None):
+        """Called by SerialHandler for every command it writes (with its future if tracked)."""
+        key = command.split(" ", 1)[0].lower()
+        if key == "getallpos":
+            return
+        if key in BLOCKING_SEQUENCE_END:
+            self.blocking_end_markers = BLOCKING_SEQUENCE_END[key]
+            self.blocking_errors = BLOCKING_SEQUENCE_ERRORS.get(key, ()) + ("ERR: Busy", f"ERR: Unknown command: {key}")
+            self.blocking_future = future
+            self.blocking_started_at = time.monotonic()
+            if future is not None:
+                future.add_done_callback(self._on_blocking_command_done)
+        if key == "jog":
+            self.jog_active = True
+        elif key == "jogstop":
+            self.jog_active = False
+        if key == "jog" or key == "jogstop" or command.lower().startswith(MOTION_COMMANDS):
+            self._set_motion_active(True)
+
+    def on_line(self, line):
+        if self.blocking_end_markers is None:
+            return
+        if any(marker in line for marker in self.blocking_end_markers) or \
+           (self.blocking_future is None and line.startswith(self.blocking_errors)):
+            self._end_blocking()
+
+    def _on_blocking_command_done(self, future):
+        # A timeout only means the reply is late; the markers or the safety net end the wait then
+        if future is self.blocking_future and future.error != "timeout":
+            self._end_blocking()
+
+    def on_progress(self, event):
+        self.blocking_end_markers = None # Not blocking after all
+        self.blocking_future = None
+        self.sequence_active = not event.final()
+        if event.event == "start" or event.final():
+            self._set_motion_active(True)
+
+    def on_pos_message(self, pos):
+        self.request_sent_at = None
+        if pos != self.latest:
+            self.last_change_at = time.monotonic()
+        self.latest = pos
+        self.snapshot_updated.emit(pos)
+
+    # --- Internals ---
+    def _end_blocking(self):
+        self.blocking_end_markers = None
+        self.blocking_future = None
+        self._set_motion_active(True) # Catch the final resting position quickly
+        self._poll()
+
+    def _set_motion_active(self, active):
+        self.motion_active = active
+        self.last_change_at = time.monotonic()
+        if not self.serial_handler.is_connected():
+            return
+        self.poll_timer.start(MOTION_POLL_INTERVAL_MS if active else IDLE_POLL_INTERVAL_MS)
+        if active and self.stream_supported and not self.streaming:
+            # Tracked, so an ERR reply is attributed to this command and not to another pending one
+            future = self.serial_handler.send_command_async(f"stream {STREAM_MOTION_HZ}")
+            self.streaming = future.error != "not sent"
+            future.add_done_callback(self._on_stream_reply)
+        elif not active and self.streaming:
+            self.streaming = False
+            self.serial_handler.send_command_async("stream 0")
+
+    def _on_stream_reply(self, future):
+        if not future.ok and future.error.startswith("Unknown command"):
+            print("TelemetryPoller: Firmware has no 'stream' command, using fast polling during motion.")
+            self.stream_supported = False
+            self.streaming = False
+
+    def _poll(self):
+        if not self.serial_handler.is_connected():
+            return
+        now = time.monotonic()
+        if self.blocking_end_markers is not None:
+            if now - self.blocking_started_at < BLOCKING_SEQUENCE_TIMEOUT_S:
+                return # The ESP32 would only queue the request until the sequence ends
+            print("TelemetryPoller: No completion seen for blocking sequence, resuming polls.")
+            self.blocking_end_markers = None
+            self.blocking_future = None
+        if self.motion_active and not self.jog_active and not self.sequence_active and now - self.last_change_at >= MOTION_IDLE_AFTER_S:
+            self._set_motion_active(False)
+        if self.streaming:
+            return # Positions are being pushed; no request needed
+        if self.request_sent_at is not None and now - self.request_sent_at < REPLY_TIMEOUT_S:
+            return # Previous request still unanswered; don't pile up another
+        if self.serial_handler.send_command_async("getallpos", REPLY_TIMEOUT_S).error != "not sent":
+            self.request_sent_at = now
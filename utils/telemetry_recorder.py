@@ -0,0 +1,182 @@
+import array
+import struct
+import sys
+import time
+
+# --- Telemetry recorder ---
+# Every POS/SPOS sample goes into a fixed-capacity ring of preallocated typed arrays (one
+# per channel), so memory stays constant however long the app runs. A sample carries
+# every channel: values a message doesn't include are carried over from the previous
+# sample. Channels without any value yet hold MISSING.
+
+TELEMETRY_CAPACITY = 65536 # Samples kept; about 20 minutes of a 50 Hz position stream
+MISSING = -2147483648 # Stored for "no value yet" (int32 minimum)
+
+# (name, array typecode) in record order; 't' is seconds since the first sample
+CHANNELS = (
+    ("t", "d"),
+    ("cart_pos", "i"), ("orb_pos", "i"), ("capt_pos", "i"),
+    ("rot_servo", "i"), ("grip_servo", "i"), ("actuator_sensor", "i"),
+)
+VALUE_CHANNELS = tuple(name for name, _ in CHANNELS[1:])
+SPOS_CHANNELS = {"cart": "cart_pos", "orb": "orb_pos", "capt": "capt_pos"} # SPOS id -> channel
+
+BINARY_MAGIC = b"MTLM"
+BINARY_VERSION = 1
+
+
+class TelemetryRecorder:
+    """Ring buffer of timestamped positions, servo angles and the actuator sensor state."""
+
+    def __init__(self, capacity=TELEMETRY_CAPACITY, clock=time.monotonic):
+        self.capacity = capacity
+        self.clock = clock
+        self.arrays = {name: array.array(typecode, [0]) * capacity for name, typecode in CHANNELS}
+        self.clear()
+
+    def clear(self):
+        self.count = 0      # Valid samples, at most capacity
+        self.next_index = 0 # Where the next sample goes
+        self.total = 0      # Samples ever recorded (incl. overwritten), tells viewers something changed
+        self.started_at = None
+        self.last = dict.fromkeys(VALUE_CHANNELS, MISSING)
+
+    # --- Recording ---
+    def record(self, now=None, **values):
+        """Appends one sample; channels not given keep their previous value."""
+        now = self.clock() if now is None else now
+        if self.started_at is None:
+            self.started_at = now
+        last = self.last
+        for name, value in values.items():
+            if value is not None:
+                last[name] = int(value)
+        index = self.next_index
+        self.arrays["t"][index] = now - self.started_at
+        for name in VALUE_CHANNELS:
+            self.arrays[name][index] = last[name]
+        self.next_index = (index + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+        self.total += 1
+
+    def on_pos_message(self, pos):
+        self.record(cart_pos=pos.cart_pos, orb_pos=pos.orb_pos, capt_pos=pos.capt_pos, rot_servo=pos.rot_servo,
+                    grip_servo=pos.grip_servo, actuator_sensor=pos.actuator_sensor)
+
+    def on_spos_message(self, spos):
+        channel = SPOS_CHANNELS.get(spos.stepper_id)
+        if channel:
+            self.record(**{channel: spos.position})
+
+    # --- Reading ---
+    def _ordered(self, name, first, last):
+        """Samples first..last-1 (0 = oldest) of a channel as a list, unwrapping the ring."""
+        start = (self.next_index - self.count) % self.capacity
+        data = self.arrays[name]
+        lo, hi = start + first, start + last
+        if hi <= self.capacity:
+            return data[lo:hi].tolist()
+        if lo >= self.capacity:
+            return data[lo - self.capacity:hi - self.capacity].tolist()
+        return data[lo:].tolist() + data[:hi - self.capacity].tolist()
+
+    def first_index_after(self, t):
+        """Index (0 = oldest) of the first sample at or after t, by bisection on the timestamps."""
+        lo, hi = 0, self.count
+        start = (self.next_index - self.count) % self.capacity
+        times = self.arrays["t"]
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if times[(start + mid) % self.capacity] < t:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def series(self, name, since=None):
+        """(times, values) of one channel, oldest first, optionally only samples at or after `since`."""
+        first = 0 if since is None else self.first_index_after(since)
+        return self._ordered("t", first, self.count), self._ordered(name, first, self.count)
+
+    def latest_time(self):
+        return self.arrays["t"][(self.next_index - 1) % self.capacity] if self.count else 0.0
+
+    # --- Export ---
+    def export_csv(self, path):
+        columns = [self._ordered(name, 0, self.count) for name, _ in CHANNELS]
+        with open(path, "w", newline="") as f:
+            f.write(",".join(name for name, _ in CHANNELS) + "\n")
+            for row in zip(*columns):
+                f.write(f"{row[0]:.6f}," + ",".join("" if v == MISSING else str(v) for v in row[1:]) + "\n")
+
+    def export_binary(self, path):
+        """
+        Little-endian: magic, version, sample count, channel count, then per channel a
+        length-prefixed name, its typecode and item size, followed by the channel's samples
+        (each channel stored contiguously, oldest first).
+        """
+        with open(path, "wb") as f:
+            f.write(BINARY_MAGIC + struct.pack("<HII", BINARY_VERSION, self.count, len(CHANNELS)))
+            for name, typecode in CHANNELS:
+                encoded = name.encode("ascii")
+                f.write(struct.pack("<B", len(encoded)) + encoded + typecode.encode("ascii")
+                        + struct.pack("<B", self.arrays[name].itemsize))
+            for name, typecode in CHANNELS:
+                column = array.array(typecode, self._ordered(name, 0, self.count))
+                if sys.byteorder == "big":
+                    column.byteswap()
+                column.tofile(f)
+
+
+def load_binary(path):
+    """Reads an export_binary() file back into {channel: array}."""
+    with open(path, "rb") as f:
+        if f.read(4) != BINARY_MAGIC:
+            raise ValueError(f"{path} is not a telemetry recording")
+        version, count, channel_count = struct.unpack("<HII", f.read(10))
+        if version != BINARY_VERSION:
+            raise ValueError(f"Unsupported telemetry recording version {version}")
+        layout = []
+        for _ in range(channel_count):
+            name = f.read(f.read(1)[0]).decode("ascii")
+            typecode = f.read(1).decode("ascii")
+            itemsize = f.read(1)[0]
+            layout.append((name, typecode, itemsize))
+        columns = {}
+        for name, typecode, itemsize in layout:
+            column = array.array(typecode)
+            if column.itemsize != itemsize:
+                raise ValueError(f"Channel '{name}' has {itemsize}-byte items, expected {column.itemsize}")
+            column.frombytes(f.read(count * itemsize))
+            if sys.byteorder == "big":
+                column.byteswap()
+            columns[name] = column
+        return columns
+
+
+def decimate_min_max(times, values, buckets, missing=MISSING):
+    """
+    Reduces a series to at most 2 points per bucket (its min and max, in time order), so
+    spikes survive the reduction. Samples equal to `missing` are skipped.
+    """
+    points = [(t, v) for t, v in zip(times, values) if v != missing]
+    if len(points) <= 2 * buckets or buckets <= 0:
+        return points
+    t0, t1 = points[0][0], points[-1][0]
+    span = (t1 - t0) or 1.0
+    reduced = []
+    bucket_lo = bucket_hi = None
+    current = None
+    for point in points:
+        bucket = min(buckets - 1, int((point[0] - t0) / span * buckets))
+        if bucket != current:
+            if current is not None:
+                reduced.extend(sorted({bucket_lo, bucket_hi}))
+            current, bucket_lo, bucket_hi = bucket, point, point
+        else:
+            if point[1] < bucket_lo[1]:
+                bucket_lo = point
+            if point[1] > bucket_hi[1]:
+                bucket_hi = point
+    reduced.extend(sorted({bucket_lo, bucket_hi}))
+    return reduced